@@ -0,0 +1,98 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.api.auth import get_admin_user, revoke_token_id
+from app.api import metrics, profiling, revocation, sdk
+
+admin = APIRouter(dependencies=[Depends(get_admin_user)])
+
+
+@admin.get("/profile/cpu")
+async def profile_cpu(
+    seconds: float = 10, interval_ms: float = 10, format: str = "collapsed"
+):
+    """Sample this worker's stacks for N seconds.
+
+    - format=collapsed returns flamegraph.pl / speedscope compatible text
+    - format=speedscope returns a speedscope.app JSON profile
+    """
+    if not 0 < seconds <= 120:
+        raise HTTPException(status_code=400, detail="seconds must be in (0, 120]")
+    if format not in ("collapsed", "speedscope"):
+        raise HTTPException(status_code=400, detail="format must be collapsed or speedscope")
+
+    profiler = profiling.SamplingProfiler(interval=interval_ms / 1000)
+    try:
+        # Sampling runs off the event loop so the worker keeps serving traffic
+        await asyncio.to_thread(profiler.run, seconds)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    headers = {"X-Worker-PID": str(os.getpid()), "X-Profile-Samples": str(profiler.sample_count)}
+    if format == "speedscope":
+        return JSONResponse(profiler.speedscope(), headers=headers)
+    return PlainTextResponse(profiler.collapsed(), headers=headers)
+
+
+@admin.get("/profile/requests")
+async def list_request_profiles():
+    """Recent per-request profiles captured through the signed header"""
+    return [
+        {key: value for key, value in profile.items() if key != "stats"}
+        for profile in reversed(profiling.request_profiles.values())
+    ]
+
+
+@admin.get("/profile/requests/{profile_id}")
+async def get_request_profile(profile_id: str):
+    profile = profiling.request_profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile["stats"])
+
+
+@admin.post("/profile/memory/start")
+async def start_memory_profile(frames: int = 10):
+    """Start tracemalloc and take the baseline snapshot"""
+    profiling.start_allocation_tracking(frames)
+    return {"tracing": True, "pid": os.getpid()}
+
+
+@admin.get("/profile/memory/diff")
+async def memory_profile_diff(limit: int = 25):
+    """Allocation growth since the baseline, by source line and by route"""
+    return {"pid": os.getpid(), **profiling.allocation_diff(limit)}
+
+
+@admin.post("/profile/memory/stop")
+async def stop_memory_profile():
+    profiling.stop_allocation_tracking()
+    return {"tracing": False, "pid": os.getpid()}
+
+
+@admin.get("/startup")
+async def startup_report():
+    """Time this worker took to become ready, and the cost of each lazy SDK import"""
+    return sdk.startup_report()
+
+
+@admin.get("/metrics")
+async def get_metrics():
+    """This worker's metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@admin.post("/revocations/{token_id}")
+async def revoke_tokens(token_id: str):
+    """Revoke every token issued so far for a tokenId, e.g. after a compromise"""
+    revoke_token_id(token_id)
+    return {"tokenId": token_id, "revoked": True}
+
+
+@admin.get("/revocations")
+async def list_revocations():
+    """Active revocations as seen by this worker"""
+    return revocation.revocations.entries()
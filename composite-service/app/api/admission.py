@@ -0,0 +1,202 @@
+"""Admission control: per-user rate limits and global load shedding.
+
+Runs right after JWT verification and before any route or downstream work.
+
+- Each ``tokenId`` gets a token bucket (refilled at ``RATE_LIMIT_RPS``, up to
+  ``RATE_LIMIT_BURST``). Routes JWTMiddleware skips (GraphQL) are keyed by
+  the bearer token when it verifies; otherwise, and for callers without one,
+  by the client address, which callers behind one NAT or proxy share.
+- A global cap of ``MAX_IN_FLIGHT`` requests per worker is shared by four
+  priority classes. Lower classes are shed first: GraphQL once 70% of the cap
+  is in use, REST reads at 80%, writes at 90%, webhooks only at 100%.
+
+Over a limit, the request is rejected immediately with 429 (rate limit) or 503
+(shed), plus ``Retry-After``. Bookkeeping is O(1) per request: one dict lookup
+and LRU touch, one bucket refill and two counters.
+"""
+
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from starlette.responses import JSONResponse
+
+from app.api import metrics
+from app.api.auth import verify_jwt_token
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "40"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "256"))
+SHED_RETRY_AFTER = int(os.getenv("SHED_RETRY_AFTER", "1"))
+
+# Share of MAX_IN_FLIGHT each class may use and tokens each request costs
+PRIORITY_CLASSES = {
+    "webhook": {"share": 1.0, "cost": 1},
+    "write": {"share": 0.9, "cost": 2},
+    "read": {"share": 0.8, "cost": 1},
+    "graphql": {"share": 0.7, "cost": 2},
+}
+
+requests_total = metrics.counter(
+    "admission_requests_total", "Requests seen by admission control, by class and outcome"
+)
+
+
+def classify(request: Request) -> str:
+    path = request.url.path
+    if path.startswith("/api/v1/graphql"):
+        return "graphql"
+    if path.rstrip("/").endswith("/webhook"):
+        return "webhook"
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        return "read"
+    return "write"
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+    def take(self, cost: float, rate: float, burst: float, now: float) -> float:
+        """Take ``cost`` tokens; return 0 on success, else seconds until possible"""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / rate if rate > 0 else math.inf
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_RPS,
+        burst: float = RATE_LIMIT_BURST,
+        max_keys: int = RATE_LIMIT_MAX_KEYS,
+        max_in_flight: int = MAX_IN_FLIGHT,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.max_in_flight = max_in_flight
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.in_flight = 0
+        self.in_flight_by_class = {name: 0 for name in PRIORITY_CLASSES}
+
+    def check_rate(self, key: str, cost: float, now: Optional[float] = None) -> float:
+        """Seconds the caller must wait, or 0 if the request is admitted"""
+        now = time.monotonic() if now is None else now
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.burst, now)
+            if len(self.buckets) > self.max_keys:
+                # Least recently seen key; an evicted user restarts with a full bucket
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket.take(cost, self.rate, self.burst, now)
+
+    def has_capacity(self, priority: str) -> bool:
+        limit = self.max_in_flight * PRIORITY_CLASSES[priority]["share"]
+        return self.in_flight < limit
+
+    def acquire(self, priority: str):
+        self.in_flight += 1
+        self.in_flight_by_class[priority] += 1
+
+    def release(self, priority: str):
+        self.in_flight -= 1
+        self.in_flight_by_class[priority] -= 1
+
+
+controller = AdmissionController()
+
+metrics.gauge(
+    "admission_in_flight",
+    "Requests currently admitted, by priority class",
+    lambda: {
+        metrics.labels(**{"class": name}): count
+        for name, count in controller.in_flight_by_class.items()
+    },
+)
+metrics.gauge(
+    "admission_tracked_keys",
+    "Rate-limit buckets currently held in memory",
+    lambda: {(): len(controller.buckets)},
+)
+
+
+def client_key(request: Request) -> str:
+    user = getattr(request.state, "user", None)
+    if not user:
+        # Routes outside JWTMiddleware (GraphQL) still get per-token buckets
+        # when the caller sends a valid token
+        user = _bearer_user(request)
+    if user and user.get("tokenId"):
+        return f"user:{user['tokenId']}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def _bearer_user(request: Request) -> Optional[dict]:
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return verify_jwt_token(token)
+    except HTTPException:
+        return None
+
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware: the in-flight slot is released once the app
+    returns, raises or is cancelled, so a streamed body holds it until sent in
+    full and a response that is never sent cannot keep it.
+    """
+
+    def __init__(self, app, excluded_paths: list[str] = None):
+        self.app = app
+        self.excluded_paths = excluded_paths or []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or any(
+            scope["path"].startswith(path) for path in self.excluded_paths
+        ):
+            return await self.app(scope, receive, send)
+
+        request = Request(scope)
+        priority = classify(request)
+
+        # Shed before spending a token so rejected work does not drain buckets
+        if not controller.has_capacity(priority):
+            requests_total.inc(**{"class": priority, "outcome": "shed"})
+            response = _reject(503, "Service is overloaded, retry later", SHED_RETRY_AFTER)
+            return await response(scope, receive, send)
+
+        wait = controller.check_rate(client_key(request), PRIORITY_CLASSES[priority]["cost"])
+        if wait:
+            requests_total.inc(**{"class": priority, "outcome": "rate_limited"})
+            response = _reject(429, "Rate limit exceeded", wait)
+            return await response(scope, receive, send)
+
+        requests_total.inc(**{"class": priority, "outcome": "admitted"})
+        controller.acquire(priority)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(priority)
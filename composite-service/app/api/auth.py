@@ -1,5 +1,8 @@
 # JWT Auth
 
+import hashlib
+import hmac
+import json
 import os
 import jwt
 import time
@@ -8,6 +11,9 @@ from typing import Dict
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import HTTPBearer
 
+from app.api import revocation, shared_cache
+from app.api.cache import LRUCache
+
 auth = APIRouter()
 security = HTTPBearer()
 
@@ -16,6 +22,23 @@ JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
 JWT_REFRESH_SECRET = os.getenv("JWT_REFRESH_SECRET")
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 REFRESH_TOKEN_EXPIRE_DAYS = 30
+# Decoded tokens by hash, per worker and in the host's shared cache; expiry
+# and revocation are still checked on every use
+verified_tokens = LRUCache(int(os.getenv("TOKEN_CACHE_SIZE", "10000")))
+# tokenIds allowed to use the /api/v1/admin routes
+ADMIN_TOKEN_IDS = {
+    token_id.strip()
+    for token_id in os.getenv("ADMIN_TOKEN_IDS", "").split(",")
+    if token_id.strip()
+}
+
+
+def revoke_token_id(token_id: str, revoked_at: float = None):
+    """Invalidate every token issued for ``token_id`` so far"""
+    revoked_at = revoked_at or time.time()
+    # Kept until the longest-lived token it can match has expired
+    expires_at = revoked_at + (REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60)
+    revocation.revocations.revoke(token_id, expires_at, revoked_at)
 
 
 def create_jwt_token(user_data: dict) -> Dict[str, str]:
@@ -47,11 +70,49 @@ def create_jwt_token(user_data: dict) -> Dict[str, str]:
     }
 
 
+def _payload_mac(secret: str, key: str, payload: dict) -> str:
+    """MAC over a decoded payload and the token it came from.
+
+    The shared tier is a file other processes can write to; an entry is only
+    trusted when it was written by someone holding the signing secret.
+    """
+    message = key.encode() + b"\n" + json.dumps(payload, sort_keys=True).encode()
+    return hmac.new(f"token-cache:{secret}".encode(), message, hashlib.sha256).hexdigest()
+
+
+def decode_jwt_token(token: str, is_refresh: bool = False) -> dict:
+    """Signature-checked payload, decoded once per host"""
+    key = f"{'refresh' if is_refresh else 'access'}:{hashlib.sha256(token.encode()).hexdigest()}"
+    entry = verified_tokens.get(key)
+    if entry is not None:
+        return dict(entry.value)
+    secret = JWT_REFRESH_SECRET if is_refresh else JWT_SECRET_KEY
+    found = shared_cache.cache.get("token", key)
+    if (
+        found is not None
+        and isinstance(found[0], dict)
+        and isinstance(found[0].get("payload"), dict)
+        and hmac.compare_digest(
+            str(found[0].get("mac")), _payload_mac(secret, key, found[0]["payload"])
+        )
+    ):
+        payload = found[0]["payload"]
+    else:
+        payload = jwt.decode(token, secret, algorithms=[JWT_ALGORITHM])
+        shared_cache.cache.set(
+            "token",
+            key,
+            {"payload": payload, "mac": _payload_mac(secret, key, payload)},
+            max(0.0, payload.get("exp", 0) - time.time()),
+        )
+    verified_tokens.set(key, payload)
+    return dict(payload)
+
+
 def verify_jwt_token(token: str, is_refresh: bool = False) -> dict:
     """Verify JWT token and return payload"""
     try:
-        secret = JWT_REFRESH_SECRET if is_refresh else JWT_SECRET_KEY
-        payload = jwt.decode(token, secret, algorithms=[JWT_ALGORITHM])
+        payload = decode_jwt_token(token, is_refresh)
 
         # Verify token type
         expected_type = "refresh" if is_refresh else "access"
@@ -61,6 +122,9 @@ def verify_jwt_token(token: str, is_refresh: bool = False) -> dict:
         if payload["exp"] < time.time():
             raise HTTPException(status_code=401, detail="Token has expired")
 
+        if revocation.revocations.is_revoked(payload):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+
         return payload
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -78,6 +142,13 @@ async def get_current_user(token: HTTPBearer = Depends(security)):
         raise e
 
 
+async def get_admin_user(current_user: dict = Depends(get_current_user)):
+    """Dependency that only lets configured admin tokenIds through"""
+    if current_user.get("tokenId") not in ADMIN_TOKEN_IDS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+
 @auth.post("/refresh")
 async def refresh_tokens(request: Request):
     """Endpoint to refresh access token using refresh token"""
@@ -108,6 +179,13 @@ async def refresh_tokens(request: Request):
         raise e
 
 
+@auth.post("/logout")
+async def logout(current_user: dict = Depends(get_current_user)):
+    """Revoke the caller's access and refresh tokens"""
+    revoke_token_id(current_user["tokenId"])
+    return {"message": "Logged out"}
+
+
 @auth.get("/protected")
 async def protected_route(current_user: dict = Depends(get_current_user)):
     return {"message": "This is protected", "user": current_user}
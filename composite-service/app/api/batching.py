@@ -0,0 +1,77 @@
+"""Micro-batching of concurrent single-key lookups."""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class MicroBatcher(Generic[K, V]):
+    """Coalesce ``load(key)`` calls made within ``window`` seconds into one
+    ``fetch_many(keys)`` call.
+
+    ``fetch_many`` returns a mapping of the keys it found; keys it omits
+    resolve to ``None`` and exception values are raised to that key's callers
+    only. A batch is flushed early once it holds ``max_batch`` distinct keys.
+    Duplicate keys in the same window share one result.
+    """
+
+    def __init__(
+        self,
+        fetch_many: Callable[[List[K]], Awaitable[Dict[K, V]]],
+        window: float = 0.005,
+        max_batch: int = 100,
+    ):
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[K, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def load(self, key: K) -> Optional[V]:
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(
+                    self.window, self._flush
+                )
+        # A cancelled caller must not cancel the lookup shared with others
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: List[K]) -> Dict[K, Optional[V]]:
+        values = await asyncio.gather(*(self.load(key) for key in keys))
+        return dict(zip(keys, values))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: Dict[K, asyncio.Future]):
+        try:
+            results = await self.fetch_many(list(batch))
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if future.done():
+                continue
+            value = results.get(key)
+            if isinstance(value, BaseException):
+                future.set_exception(value)
+            else:
+                future.set_result(value)
@@ -0,0 +1,326 @@
+"""Per-dependency bulkheads with adaptive concurrency limits.
+
+Each dependency (breeder, pet and customer over HTTP; pubsub and workflows
+through their async SDK clients; lambda through ``run_blocking``) gets its own
+cap on calls in flight from this worker, so a slow one can only tie up its
+own share of the worker.
+
+The cap moves with what the dependency shows (AIMD):
+
+- A call that errors (timeout, connection failure, 5xx, 429) cuts the limit
+  by ``BULKHEAD_BACKOFF``, as does a success that leaves the recent average
+  latency above ``BULKHEAD_LATENCY_TOLERANCE`` times the baseline. Only calls
+  started after the last cut can cut it again, so one burst of failures is
+  one cut.
+- A call that succeeds while at least half the limit is in use raises it by
+  ``1 / limit``, i.e. about one per limit's worth of calls.
+
+The recent average covers about the last ``BULKHEAD_RECENT_WINDOW``
+successful calls and the baseline about the last ``BULKHEAD_WINDOW``
+(exponentially weighted), so single slow calls in a long tail do not count as
+congestion and the baseline follows a dependency that settles at a new speed.
+Over the limit, a call waits up to ``BULKHEAD_QUEUE_TIMEOUT_MS`` (and
+never past the request deadline) behind at most ``BULKHEAD_QUEUE_SIZE``
+others. HTTP calls that get no slot are answered 503 without being sent; SDK
+calls raise ``BulkheadFull``. Blocking calls take their slot on the event loop
+like any other and only then move to a worker thread, so they queue and adapt
+the same way.
+"""
+
+import asyncio
+import functools
+import inspect
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Optional
+
+import httpx
+
+from app.api import deadline, metrics
+
+BULKHEAD_ENABLED = os.getenv("BULKHEAD_ENABLED", "true").lower() == "true"
+BULKHEAD_INITIAL_LIMIT = float(os.getenv("BULKHEAD_INITIAL_LIMIT", "20"))
+BULKHEAD_MIN_LIMIT = int(os.getenv("BULKHEAD_MIN_LIMIT", "1"))
+BULKHEAD_MAX_LIMIT = int(os.getenv("BULKHEAD_MAX_LIMIT", "100"))
+BULKHEAD_BACKOFF = float(os.getenv("BULKHEAD_BACKOFF", "0.9"))
+BULKHEAD_LATENCY_TOLERANCE = float(os.getenv("BULKHEAD_LATENCY_TOLERANCE", "2"))
+# Latency above the baseline that is never treated as slow, however small
+# the baseline (1ms calls taking 3ms are not congestion)
+BULKHEAD_SLOW_FLOOR_MS = float(os.getenv("BULKHEAD_SLOW_FLOOR_MS", "50"))
+BULKHEAD_WINDOW = int(os.getenv("BULKHEAD_WINDOW", "100"))
+BULKHEAD_RECENT_WINDOW = int(os.getenv("BULKHEAD_RECENT_WINDOW", "10"))
+BULKHEAD_QUEUE_SIZE = int(os.getenv("BULKHEAD_QUEUE_SIZE", "50"))
+BULKHEAD_QUEUE_TIMEOUT_MS = float(os.getenv("BULKHEAD_QUEUE_TIMEOUT_MS", "100"))
+BULKHEAD_RETRY_AFTER = int(os.getenv("BULKHEAD_RETRY_AFTER", "1"))
+
+# Outcomes of a finished call
+OK, DROPPED, IGNORED = "ok", "dropped", "ignored"
+
+requests_total = metrics.counter(
+    "bulkhead_requests_total",
+    "Downstream calls by dependency and outcome (admitted, queued or rejected)",
+)
+
+
+class BulkheadFull(Exception):
+    """No slot came free for a call to ``dependency`` in time"""
+
+    def __init__(self, dependency: str):
+        super().__init__(f"{dependency}: too many calls in flight")
+        self.dependency = dependency
+
+
+class Bulkhead:
+    """Concurrency limit for one dependency; used from the event loop thread"""
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: float = BULKHEAD_INITIAL_LIMIT,
+        min_limit: int = BULKHEAD_MIN_LIMIT,
+        max_limit: int = BULKHEAD_MAX_LIMIT,
+        backoff: float = BULKHEAD_BACKOFF,
+        tolerance: float = BULKHEAD_LATENCY_TOLERANCE,
+        slow_floor: float = BULKHEAD_SLOW_FLOOR_MS / 1000,
+        window: int = BULKHEAD_WINDOW,
+        recent_window: int = BULKHEAD_RECENT_WINDOW,
+        queue_size: int = BULKHEAD_QUEUE_SIZE,
+        queue_timeout: float = BULKHEAD_QUEUE_TIMEOUT_MS / 1000,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = min(max(initial_limit, min_limit), max_limit)
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.slow_floor = slow_floor
+        self.window = window
+        self.recent_window = recent_window
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        # Average latency of successful calls, long and short term
+        self.baseline: Optional[float] = None
+        self.recent: Optional[float] = None
+        self._last_cut = -math.inf
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def slots(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def try_acquire(self) -> bool:
+        # Waiters go first; a newcomer only takes a slot nobody is queued for
+        if self.in_flight < self.slots and not self._waiters:
+            self.in_flight += 1
+            requests_total.inc(dependency=self.name, outcome="admitted")
+            return True
+        return False
+
+    async def acquire(self):
+        """Take a slot, waiting in line for one if needed"""
+        if self.try_acquire():
+            return
+        timeout = deadline.bound(self.queue_timeout)
+        if len(self._waiters) >= self.queue_size or timeout <= 0:
+            requests_total.inc(dependency=self.name, outcome="rejected")
+            raise BulkheadFull(self.name)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we stopped waiting
+                self._release()
+            elif waiter in self._waiters:
+                # (``_wake`` may already have dropped it as cancelled)
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                requests_total.inc(dependency=self.name, outcome="rejected")
+                raise BulkheadFull(self.name) from None
+            raise
+        requests_total.inc(dependency=self.name, outcome="queued")
+
+    def release(self, started: float, outcome: str, now: Optional[float] = None):
+        """Free the slot of a call started at ``started`` and learn from it"""
+        now = time.monotonic() if now is None else now
+        if outcome != IGNORED:
+            self._observe(now - started, started, outcome == OK, now)
+        self._release()
+
+    def _release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.slots:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _observe(self, latency: float, started: float, ok: bool, now: float):
+        if ok:
+            if self.baseline is None:
+                self.baseline = self.recent = latency
+            else:
+                self.baseline += (latency - self.baseline) / self.window
+                self.recent += (latency - self.recent) / self.recent_window
+
+        slow = (
+            ok
+            and self.recent > self.baseline * self.tolerance
+            and self.recent - self.baseline > self.slow_floor
+        )
+        if not ok or slow:
+            if started > self._last_cut:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_cut = now
+        elif self.in_flight * 2 >= self.limit:
+            # in_flight still counts this call
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._wake()
+
+
+bulkheads: Dict[str, Bulkhead] = {}
+
+
+def get(name: str) -> Bulkhead:
+    bulkhead = bulkheads.get(name)
+    if bulkhead is None:
+        max_limit = int(
+            os.getenv(f"{name.upper()}_BULKHEAD_MAX_LIMIT", str(BULKHEAD_MAX_LIMIT))
+        )
+        bulkhead = bulkheads[name] = Bulkhead(name, max_limit=max_limit)
+    return bulkhead
+
+
+def _bulkhead_gauge(name: str, help: str, value: Callable[[Bulkhead], float]):
+    metrics.gauge(
+        name,
+        help,
+        lambda: {
+            metrics.labels(dependency=dependency): value(bulkhead)
+            for dependency, bulkhead in bulkheads.items()
+        },
+    )
+
+
+_bulkhead_gauge(
+    "bulkhead_limit", "Current concurrency limit per dependency", lambda b: b.slots
+)
+_bulkhead_gauge(
+    "bulkhead_in_flight", "Calls in flight per dependency", lambda b: b.in_flight
+)
+_bulkhead_gauge(
+    "bulkhead_queued", "Calls waiting for a slot per dependency", lambda b: b.queued
+)
+
+
+# HTTP
+
+
+def _response_outcome(response: httpx.Response) -> str:
+    return DROPPED if response.status_code >= 500 or response.status_code == 429 else OK
+
+
+class BulkheadTransport(httpx.AsyncBaseTransport):
+    """Holds a slot of the request's dependency until its response headers arrive"""
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        dependency: Callable[[httpx.URL], str],
+    ):
+        self._transport = transport
+        self.dependency = dependency
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        bulkhead = get(self.dependency(request.url))
+        try:
+            await bulkhead.acquire()
+        except BulkheadFull as e:
+            return httpx.Response(
+                503,
+                json={"detail": str(e)},
+                headers={"Retry-After": str(BULKHEAD_RETRY_AFTER), "X-Bulkhead": "rejected"},
+                request=request,
+            )
+
+        started = time.monotonic()
+        outcome = DROPPED
+        try:
+            response = await self._transport.handle_async_request(request)
+            outcome = _response_outcome(response)
+            return response
+        except asyncio.CancelledError:
+            # The caller gave up; says nothing about the dependency
+            outcome = IGNORED
+            raise
+        finally:
+            bulkhead.release(started, outcome)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+# SDK clients
+
+
+async def _call(dependency: str, call: Callable[[], Any]):
+    bulkhead = get(dependency)
+    await bulkhead.acquire()
+    started, outcome = time.monotonic(), DROPPED
+    try:
+        result = await call()
+        outcome = OK
+        return result
+    except asyncio.CancelledError:
+        outcome = IGNORED
+        raise
+    finally:
+        bulkhead.release(started, outcome)
+
+
+class _BulkheadProxy:
+    def __init__(self, target, dependency: str, methods: Iterable[str]):
+        self._target = target
+        self._dependency = dependency
+        self._methods = set(methods)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if name not in self._methods:
+            return attribute
+        if not inspect.iscoroutinefunction(attribute):
+            raise TypeError(
+                f"{name} is not a coroutine function; call it through run_blocking"
+            )
+
+        @functools.wraps(attribute)
+        async def call_async(*args, **kwargs):
+            return await _call(self._dependency, lambda: attribute(*args, **kwargs))
+
+        return call_async
+
+
+def wrap(target, dependency: str, methods: Iterable[str]):
+    """``target`` with calls to its async ``methods`` limited by ``dependency``'s bulkhead"""
+    if not BULKHEAD_ENABLED:
+        return target
+    return _BulkheadProxy(target, dependency, methods)
+
+
+async def run_blocking(dependency: str, func: Callable, *args, **kwargs):
+    """Run blocking ``func`` in a worker thread once ``dependency`` has a slot"""
+    if not BULKHEAD_ENABLED:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return await _call(dependency, lambda: asyncio.to_thread(func, *args, **kwargs))
@@ -0,0 +1,172 @@
+"""In-process caches for downstream data."""
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.api import metrics, shared_cache
+
+logger = logging.getLogger("composite-service")
+
+cache_requests_total = metrics.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit, stale or miss)"
+)
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    stored_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+
+class LRUCache:
+    """Bounded mapping that remembers when each value was stored"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: Hashable, value: Any) -> CacheEntry:
+        entry = self._entries[key] = CacheEntry(value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+    def pop(self, key: Hashable) -> Optional[CacheEntry]:
+        return self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def keys(self) -> List[Hashable]:
+        return list(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SingleFlight:
+    """Run at most one ``loader`` per key at a time; concurrent callers share it.
+
+    The shared work runs in its own task, so a caller that gives up does not
+    cancel it for the others.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(loader())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        return await asyncio.shield(task)
+
+
+class SWRCache:
+    """TTL cache with stale-while-revalidate and deduplicated loads.
+
+    - younger than ``ttl``: served from cache ("hit")
+    - younger than ``ttl + stale_ttl``: served from cache right away while one
+      background refresh runs ("stale")
+    - otherwise loaded, with concurrent misses sharing one load ("miss")
+
+    Only successful loads are cached. A failed background refresh keeps the
+    stale value until it ages out. Background refreshes run detached from the
+    request that triggered them: no deadline, no parent span.
+
+    With ``shared``, local misses are looked up in the host's shared cache
+    tier and loads are written to it, keeping the age they were loaded at.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float,
+        maxsize: int = 1024,
+        shared: bool = False,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.shared = shared
+        self.entries = LRUCache(maxsize)
+        self.flights = SingleFlight()
+
+    async def get(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, str]:
+        """Return ``(value, "hit" | "stale" | "miss")``"""
+        entry = self.entries.get(key)
+        if entry is None and self.shared:
+            entry = self._from_shared(key)
+        if entry is not None and entry.age <= self.ttl:
+            result = "hit"
+        elif entry is not None and entry.age <= self.ttl + self.stale_ttl:
+            result = "stale"
+            if not self.flights.in_flight(key):
+                asyncio.get_running_loop().create_task(
+                    self._refresh(key, loader), context=contextvars.Context()
+                )
+        else:
+            result = "miss"
+
+        cache_requests_total.inc(cache=self.name, result=result)
+        if result != "miss":
+            return entry.value, result
+        return await self.flights.do(key, lambda: self._load(key, loader)), result
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        value = await loader()
+        self.entries.set(key, value)
+        if self.shared:
+            shared_cache.cache.set(self.name, key, value, self.ttl + self.stale_ttl)
+        return value
+
+    def _from_shared(self, key: Hashable) -> Optional[CacheEntry]:
+        found = shared_cache.cache.get(self.name, key)
+        if found is None:
+            return None
+        value, stored_at = found
+        entry = self.entries.set(key, value)
+        entry.stored_at = time.monotonic() - max(0.0, time.time() - stored_at)
+        return entry
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        try:
+            await self.flights.do(key, lambda: self._load(key, loader))
+        except Exception as e:
+            logger.warning(f"Background refresh of {self.name} {key} failed: {e}")
+
+    def invalidate(self, key: Hashable):
+        self.entries.pop(key)
+        if self.shared:
+            shared_cache.cache.delete(self.name, key)
+
+    def invalidate_group(self, group: Hashable):
+        """Drop every ``(group, ...)`` key, e.g. one entity cached per caller"""
+        for key in self.entries.keys():
+            if isinstance(key, tuple) and key and key[0] == group:
+                self.entries.pop(key)
+        if self.shared:
+            shared_cache.cache.delete_group(self.name, group)
@@ -0,0 +1,275 @@
+"""Columnar snapshot of the breeder and pet catalog for faceted search.
+
+Every ``CATALOG_REFRESH_INTERVAL`` seconds both services are paged through
+once and turned into NumPy columns: categorical fields (city, country, price
+level, pet type) as integer codes into a sorted category list, prices as
+floats and each pet's breeder as a row index. Searches filter and aggregate
+those arrays without touching the services. A refresh builds a new snapshot
+and swaps it in with one assignment, so a search always sees a whole
+snapshot, never a half-built one.
+
+Facet counts leave out the facet's own filter, so a selected city still
+shows the other cities with their counts. Off unless ``CATALOG_ENABLED`` is
+set; NumPy is only imported once the first snapshot is built.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from app.api import metrics
+from app.api.auth import create_jwt_token
+from app.api.replica import fetch_all
+from app.api.service import BREEDER_SERVICE_URL, PET_SERVICE_URL
+from app.api.tracing import start_span
+
+# Imported with the first snapshot: only the catalog needs it, and it is
+# slow to import at worker start
+np = None
+
+logger = logging.getLogger("composite-service")
+
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "false").lower() == "true"
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "60"))
+
+BREEDER_FACETS = ("breeder_city", "breeder_country", "price_level")
+PET_FACETS = ("type",)
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class Column:
+    """Categorical column: ``categories[codes[i]]`` is row i's value"""
+
+    codes: "np.ndarray"
+    categories: List[str]
+
+    @classmethod
+    def encode(cls, values: Sequence[Optional[str]]) -> "Column":
+        # Missing values become "", which is never reported as a facet value
+        raw = np.array(["" if v is None else str(v) for v in values], dtype=str)
+        categories, codes = np.unique(raw, return_inverse=True)
+        return cls(codes.astype(np.int32), categories.tolist())
+
+    def isin(self, values: Sequence[str]) -> "np.ndarray":
+        # One lookup per row into a per-category table
+        table = np.array([category in values for category in self.categories], dtype=bool)
+        return table[self.codes]
+
+    def counts(self, mask: "np.ndarray") -> Dict[str, int]:
+        counts = np.bincount(self.codes[mask], minlength=len(self.categories))
+        order = np.argsort(-counts, kind="stable")
+        return {
+            self.categories[i]: int(counts[i])
+            for i in order
+            if counts[i] and self.categories[i]
+        }
+
+
+def _import_numpy():
+    global np
+    if np is None:
+        import numpy
+
+        np = numpy
+
+
+class CatalogSnapshot:
+    def __init__(self, breeders: List[dict], pets: List[dict]):
+        _import_numpy()
+        self.built_at = time.time()
+        self.breeder_count = len(breeders)
+        self.pet_count = len(pets)
+        self.breeder_columns = {
+            name: Column.encode([b.get(name) for b in breeders]) for name in BREEDER_FACETS
+        }
+        # Pets are stored by ascending price (missing prices last), so the
+        # prices of any subset come out sorted for percentiles and histograms
+        prices = np.array([_price(p.get("price")) for p in pets], dtype=np.float64)
+        order = np.argsort(prices, kind="stable")
+        pets = [pets[i] for i in order]
+        self.prices = prices[order]
+        self.pet_columns = {
+            name: Column.encode([p.get(name) for p in pets]) for name in PET_FACETS
+        }
+        rows = {str(b.get("id")): i for i, b in enumerate(breeders)}
+        # Pets whose breeder is not in the snapshot point at an extra row
+        # past the end, which never matches a breeder filter
+        self.pet_breeder = np.array(
+            [rows.get(str(p.get("breeder_id")), self.breeder_count) for p in pets],
+            dtype=np.int64,
+        )
+
+    def age(self) -> float:
+        return time.time() - self.built_at
+
+    def search(
+        self,
+        filters: Dict[str, List[str]],
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        bins: int = 10,
+    ) -> dict:
+        """Facet counts and price statistics for the matching breeders and pets"""
+        breeder_masks = {
+            name: column.isin(filters[name])
+            for name, column in self.breeder_columns.items()
+            if filters.get(name)
+        }
+        pet_masks = {
+            name: column.isin(filters[name])
+            for name, column in self.pet_columns.items()
+            if filters.get(name)
+        }
+        if min_price is not None or max_price is not None:
+            low = -np.inf if min_price is None else min_price
+            high = np.inf if max_price is None else max_price
+            # NaN prices fail both comparisons
+            pet_masks["price"] = (self.prices >= low) & (self.prices <= high)
+
+        def all_of(masks: dict, size: int, skip: Optional[str] = None):
+            mask = np.ones(size, dtype=bool)
+            for name, m in masks.items():
+                if name != skip:
+                    mask &= m
+            return mask
+
+        # Pets only match through a breeder that matches, and breeders only
+        # match with at least one pet that matches the pet filters
+        of_matching_breeders = (
+            self._of_breeders(all_of(breeder_masks, self.breeder_count))
+            if breeder_masks
+            else np.ones(self.pet_count, dtype=bool)
+        )
+        with_matching_pet = (
+            self._has_pet(all_of(pet_masks, self.pet_count))
+            if pet_masks
+            else np.ones(self.breeder_count, dtype=bool)
+        )
+
+        def breeders_matching(skip: Optional[str] = None):
+            return all_of(breeder_masks, self.breeder_count, skip) & with_matching_pet
+
+        def pets_matching(skip: Optional[str] = None):
+            return all_of(pet_masks, self.pet_count, skip) & of_matching_breeders
+
+        pets = pets_matching()
+        breeders = breeders_matching()
+        prices = self.prices[pets]
+        prices = prices[~np.isnan(prices)]
+        return {
+            "breeders": {
+                "count": int(breeders.sum()),
+                "facets": {
+                    name: column.counts(breeders_matching(skip=name))
+                    for name, column in self.breeder_columns.items()
+                },
+            },
+            "pets": {
+                "count": int(pets.sum()),
+                "facets": {
+                    name: column.counts(pets_matching(skip=name))
+                    for name, column in self.pet_columns.items()
+                },
+                "price": price_stats(prices, bins),
+            },
+        }
+
+    def _has_pet(self, pet_mask: "np.ndarray") -> "np.ndarray":
+        owners = np.zeros(self.breeder_count + 1, dtype=bool)
+        owners[self.pet_breeder[pet_mask]] = True
+        return owners[:-1]
+
+    def _of_breeders(self, breeder_mask: "np.ndarray") -> "np.ndarray":
+        return np.append(breeder_mask, False)[self.pet_breeder]
+
+
+def _price(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def price_stats(prices: "np.ndarray", bins: int) -> dict:
+    """Summary of ``prices``, which must be sorted"""
+    if prices.size == 0:
+        return {"count": 0}
+    low, high = float(prices[0]), float(prices[-1])
+    edges = np.linspace(low, high, bins + 1) if high > low else np.array([low - 0.5, low + 0.5])
+    # Bins are half-open except the last, as in np.histogram
+    bounds = np.searchsorted(prices, edges, side="left")
+    bounds[-1] = prices.size
+    return {
+        "count": int(prices.size),
+        "min": low,
+        "max": high,
+        "mean": float(prices.mean()),
+        **{f"p{q}": _percentile(prices, q) for q in PERCENTILES},
+        "histogram": {"edges": edges.tolist(), "counts": np.diff(bounds).tolist()},
+    }
+
+
+def _percentile(prices: "np.ndarray", q: float) -> float:
+    """Linearly interpolated percentile of sorted ``prices``"""
+    position = q / 100 * (prices.size - 1)
+    below = int(position)
+    above = min(below + 1, prices.size - 1)
+    return float(prices[below] + (prices[above] - prices[below]) * (position - below))
+
+
+class Catalog:
+    """Holds the current snapshot and refreshes it in the background"""
+
+    def __init__(self, refresh_interval: float = CATALOG_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self):
+        with start_span("catalog.refresh"):
+            headers = {
+                "Authorization": "Bearer "
+                + create_jwt_token({"tokenId": "composite-catalog"})["access_token"]
+            }
+            breeders, pets = await asyncio.gather(
+                fetch_all(f"{BREEDER_SERVICE_URL}/", headers),
+                fetch_all(f"{PET_SERVICE_URL}/", headers),
+            )
+            # Encoding 100k+ rows takes a while; keep it off the event loop
+            snapshot = await asyncio.to_thread(CatalogSnapshot, breeders, pets)
+        self.snapshot = snapshot
+        logger.info(
+            f"Catalog snapshot built: {snapshot.breeder_count} breeders, "
+            f"{snapshot.pet_count} pets"
+        )
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep serving the previous snapshot; its age shows the lag
+                logger.error(f"Catalog refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+catalog = Catalog()
+
+metrics.gauge(
+    "catalog_snapshot_age_seconds",
+    "Seconds since the catalog search snapshot was built",
+    lambda: {(): catalog.snapshot.age()} if catalog.snapshot else {},
+)
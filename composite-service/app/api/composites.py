@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from fastapi import (
     APIRouter,
     HTTPException,
@@ -6,8 +6,12 @@ from fastapi import (
     BackgroundTasks,
     Response,
     Request,
+    Query,
 )
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer
+from pydantic import ValidationError
 from app.api.models import (
     BreederIn,
     BreederOut,
@@ -20,40 +24,156 @@ from app.api.models import (
     PetListResponse,
     Link,
     CompositeUpdateBoth,
+    PartialCompositeOut,
+    SectionStatus,
+    BreederCompositeOut,
 )
+from app.api.cache import LRUCache, SWRCache
 from app.api import db_manager
+from app.api.replica import get_replica
 from app.api.service import (
     is_breeder_route_present,
     is_pet_route_present,
     BREEDER_SERVICE_URL,
     PET_SERVICE_URL,
     CUSTOMER_SERVICE_URL,
+    get_http_client,
+    warm_up,
 )
 
 # from app.api.pubsub_manager import PubSubManager
-from google.cloud import workflows_v1
-from google.cloud.workflows import executions_v1
-from google.cloud.workflows.executions_v1 import Execution
-from google.cloud.workflows.executions_v1.types import executions
-from google.oauth2 import service_account
-from google.cloud.pubsub_v1 import PublisherClient, SubscriberClient
-
+# Google Cloud and AWS SDKs are imported lazily through app.api.sdk
+from app.api import bulkhead, catalog, deadline, downstream, faults, notifications, sdk
+from app.api.pubsub import ReplyTimeout, get_breeder_lookup
 
 from app.api.auth import get_current_user
 from app.api.middleware import get_correlation_id
+from app.api.tracing import propagation_headers, start_span
 import httpx
 import os
 import logging
 import asyncio
+import contextlib
+import hashlib
 import json
-import uuid
 import time
-import boto3
+from urllib.parse import quote
 
 
 composites = APIRouter()
 
 URL_PREFIX = os.getenv("URL_PREFIX")
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "16"))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+
+PUBSUB_MAX_IDS = int(os.getenv("PUBSUB_MAX_IDS", "500"))
+
+# Workflows customer lookups: fresh for CUSTOMER_CACHE_TTL, then served stale
+# for up to CUSTOMER_CACHE_STALE_TTL while refreshed in the background. This and
+# the entity caches below are shared by the workers on the host
+customer_cache = SWRCache(
+    "customer",
+    ttl=float(os.getenv("CUSTOMER_CACHE_TTL", "60")),
+    stale_ttl=float(os.getenv("CUSTOMER_CACHE_STALE_TTL", "600")),
+    maxsize=int(os.getenv("CUSTOMER_CACHE_SIZE", "10000")),
+    shared=True,
+)
+
+# Entities behind GET /composites/{breeder_id}/, dropped when this service
+# updates them. Loaded with the caller's token, so keyed by (breeder_id,
+# tokenId): the services decide what each caller may see
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", "30"))
+ENTITY_CACHE_STALE_TTL = float(os.getenv("ENTITY_CACHE_STALE_TTL", "300"))
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+breeder_cache = SWRCache(
+    "breeder", ENTITY_CACHE_TTL, ENTITY_CACHE_STALE_TTL, ENTITY_CACHE_SIZE, shared=True
+)
+breeder_pets_cache = SWRCache(
+    "breeder_pets", ENTITY_CACHE_TTL, ENTITY_CACHE_STALE_TTL, ENTITY_CACHE_SIZE, shared=True
+)
+# Waitlists change faster; never served stale
+waitlist_cache = SWRCache(
+    "waitlist",
+    ttl=float(os.getenv("WAITLIST_CACHE_TTL", "10")),
+    stale_ttl=0,
+    maxsize=ENTITY_CACHE_SIZE,
+    shared=True,
+)
+
+# Degraded composite reads (opt in with X-Allow-Partial: true)
+PARTIAL_HEADER = "X-Allow-Partial"
+COMPOSITE_SECTION_BUDGET_MS = int(os.getenv("COMPOSITE_SECTION_BUDGET_MS", "1500"))
+COMPOSITE_STALE_MAX_AGE = float(os.getenv("COMPOSITE_STALE_MAX_AGE", "300"))
+# Last good breeders/pets section per query, served when a live fetch fails
+section_cache = LRUCache(int(os.getenv("COMPOSITE_STALE_CACHE_SIZE", "1024")))
+
+
+class PartialComposite(Exception):
+    """The breeder was created but some of its pets were not"""
+
+    def __init__(self, breeder_json: dict, pet_responses: List[dict], error: Exception):
+        super().__init__(str(error))
+        self.breeder_id = str(breeder_json.get("id"))
+        self.pet_ids = [str(pet.get("id")) for pet in pet_responses]
+        self.error = error
+
+    @property
+    def status_code(self) -> int:
+        if isinstance(self.error, httpx.HTTPStatusError):
+            return self.error.response.status_code
+        return 502
+
+    def describe(self) -> dict:
+        return {
+            "message": f"Breeder {self.breeder_id} was created, but not all of "
+            f"its pets: {self}",
+            "breeder_id": self.breeder_id,
+            "pet_ids": self.pet_ids,
+            "location": f"{URL_PREFIX}/composites/{self.breeder_id}/",
+        }
+
+
+async def post_composite(
+    client: httpx.AsyncClient,
+    headers: dict,
+    payload_dump: dict,
+    limiter: Optional[asyncio.Semaphore] = None,
+):
+    """Create a breeder, then post its pets concurrently.
+
+    ``limiter`` bounds the number of in-flight downstream calls when several
+    composites are created at once. When a pet cannot be created, raises
+    ``PartialComposite`` with the ids that were, so the caller can finish or
+    clean up the breeder.
+    """
+    limiter = limiter or contextlib.nullcontext()
+
+    async with limiter:
+        breeder_response = await client.post(
+            f"{BREEDER_SERVICE_URL}/", json=payload_dump["breeder"], headers=headers
+        )
+    breeder_response.raise_for_status()
+    breeder_json = breeder_response.json()
+    breeder_id = str(breeder_json.get("id"))
+
+    async def post_pet(pet: dict):
+        # Add breeder_id to the pet data
+        pet = {**pet, "breeder_id": breeder_id}
+        async with limiter:
+            pet_response = await client.post(
+                f"{PET_SERVICE_URL}/", json=pet, headers=headers
+            )
+        pet_response.raise_for_status()
+        return pet_response.json()
+
+    pet_responses = await asyncio.gather(
+        *(post_pet(pet) for pet in payload_dump["pets"]), return_exceptions=True
+    )
+    errors = [r for r in pet_responses if isinstance(r, Exception)]
+    if errors:
+        created = [r for r in pet_responses if not isinstance(r, Exception)]
+        raise PartialComposite(breeder_json, created, errors[0])
+    return breeder_json, list(pet_responses)
 
 
 @composites.post("/", response_model=CompositeOut, status_code=201)
@@ -81,26 +201,27 @@ async def create_composite(
 
     payload_dump = payload.model_dump()
 
-    # Create a breeder record
-    async with httpx.AsyncClient() as client:
-        headers = {
-            "X-Correlation-ID": get_correlation_id(),
-            "Authorization": f"{request.headers.get('Authorization')}",
-        }
-        breeder_response = await client.post(
-            f"{BREEDER_SERVICE_URL}/", json=payload_dump["breeder"], headers=headers
+    # Create a breeder record, then its pets
+    headers = {
+        "X-Correlation-ID": get_correlation_id(),
+        "Authorization": f"{request.headers.get('Authorization')}",
+    }
+    try:
+        breeder_response_json, pet_responses = await post_composite(
+            get_http_client(), headers, payload_dump
         )
-        breeder_id = str(breeder_response.json().get("id"))
-
-        pet_responses = []
-        for pet in payload_dump["pets"]:
-            # Add breeder_id to the pet data
-            pet["breeder_id"] = breeder_id
-
-            pet_response = await client.post(
-                f"{PET_SERVICE_URL}/", json=pet, headers=headers
-            )
-            pet_responses.append(pet_response.json())
+    except PartialComposite as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.describe(),
+            headers={"Location": e.describe()["location"]},
+        )
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=e.response.status_code,
+            detail=f"Service returned an error: {str(e)}",
+        )
+    breeder_id = str(breeder_response_json.get("id"))
 
     # Include Location header for the created resource
     composite_url = f"{URL_PREFIX}/composites/{breeder_id}/"
@@ -111,8 +232,6 @@ async def create_composite(
         f'<{composite_url}>; rel="self", <{URL_PREFIX}/composites/>; rel="collection"'
     )
 
-    breeder_response_json = breeder_response.json()
-
     # Include link sections in the response body
     response_data = CompositeOut(
         breeders=BreederListResponse(
@@ -159,14 +278,344 @@ async def create_composite(
     return response_data
 
 
+async def read_bulk_items(request: Request) -> AsyncIterator:
+    """Yield raw composite items from a JSON array or an NDJSON stream.
+
+    A JSON array longer than ``BULK_MAX_ITEMS`` is rejected before any item
+    is yielded; a stream is only known to be too long once it is.
+    """
+    content_type = request.headers.get("Content-Type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+        return
+
+    try:
+        items = json.loads(await request.body())
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if isinstance(items, dict):
+        items = items.get("items")
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=400, detail="Expected a JSON array of composites"
+        )
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Bulk requests are limited to {BULK_MAX_ITEMS} items",
+        )
+    for item in items:
+        yield item
+
+
+async def create_bulk_item(
+    client: httpx.AsyncClient,
+    headers: dict,
+    limiter: asyncio.Semaphore,
+    index: int,
+    raw,
+) -> dict:
+    """Create one composite of a bulk request and describe the outcome."""
+    try:
+        if isinstance(raw, (bytes, str)):
+            payload = CompositeIn.model_validate_json(raw)
+        else:
+            payload = CompositeIn.model_validate(raw)
+    except ValidationError as e:
+        return {"index": index, "status": 422, "error": e.errors(include_url=False)}
+
+    try:
+        breeder_json, pet_responses = await post_composite(
+            client, headers, payload.model_dump(), limiter
+        )
+    except PartialComposite as e:
+        details = e.describe()
+        return {
+            "index": index,
+            "status": e.status_code,
+            "breeder_id": e.breeder_id,
+            "pet_ids": e.pet_ids,
+            "location": details["location"],
+            "error": details["message"],
+        }
+    except httpx.HTTPStatusError as e:
+        return {
+            "index": index,
+            "status": e.response.status_code,
+            "error": f"Service returned an error: {str(e)}",
+        }
+    except httpx.HTTPError as e:
+        return {
+            "index": index,
+            "status": 502,
+            "error": f"Error reaching downstream service: {str(e)}",
+        }
+    except Exception as e:
+        return {"index": index, "status": 500, "error": f"Unexpected error: {str(e)}"}
+
+    breeder_id = str(breeder_json.get("id"))
+    return {
+        "index": index,
+        "status": 201,
+        "breeder_id": breeder_id,
+        "pet_ids": [str(pet.get("id")) for pet in pet_responses],
+        "location": f"{URL_PREFIX}/composites/{breeder_id}/",
+        "error": None,
+    }
+
+
+@composites.post("/bulk", status_code=200)
+async def bulk_create_composites(
+    request: Request, current_user: dict = Depends(get_current_user)
+):
+    """Create many composites in one call.
+
+    Accepts a JSON array of ``CompositeIn`` or an NDJSON stream
+    (``Content-Type: application/x-ndjson``) and returns one NDJSON result line
+    per item, in completion order, with its index, status and any error.
+    Authorization, the pooled connections and the downstream warm-up are
+    shared by the whole batch; downstream calls are bounded by
+    ``BULK_MAX_CONCURRENCY``.
+
+    A JSON array of more than ``BULK_MAX_ITEMS`` is rejected with 413 before
+    anything is created. A longer stream has its first ``BULK_MAX_ITEMS``
+    processed and reported, then one last line with status 413.
+    """
+    client = get_http_client()
+    headers = {
+        "X-Correlation-ID": get_correlation_id(),
+        "Authorization": f"{request.headers.get('Authorization')}",
+    }
+
+    unavailable = await warm_up(client, [BREEDER_SERVICE_URL, PET_SERVICE_URL], headers)
+    if unavailable:
+        raise HTTPException(
+            status_code=503, detail=f"Downstream services unavailable: {unavailable}"
+        )
+
+    limiter = asyncio.Semaphore(BULK_MAX_CONCURRENCY)
+    items: asyncio.Queue = asyncio.Queue(maxsize=BULK_MAX_CONCURRENCY * 2)
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        while True:
+            index, raw = await items.get()
+            try:
+                await results.put(
+                    await create_bulk_item(client, headers, limiter, index, raw)
+                )
+            finally:
+                items.task_done()
+
+    # Items are processed while the body is still being received
+    workers = [asyncio.create_task(worker()) for _ in range(BULK_MAX_CONCURRENCY)]
+    count = 0
+    truncated = False
+    try:
+        async for raw in read_bulk_items(request):
+            if count >= BULK_MAX_ITEMS:
+                # Earlier items may already be created; report them, then this
+                truncated = True
+                break
+            await items.put((count, raw))
+            count += 1
+    except BaseException:
+        for task in workers:
+            task.cancel()
+        raise
+
+    async def stream_results():
+        try:
+            for _ in range(count):
+                yield json.dumps(await results.get()) + "\n"
+            if truncated:
+                yield json.dumps(
+                    {
+                        "index": count,
+                        "status": 413,
+                        "error": f"Bulk requests are limited to {BULK_MAX_ITEMS} "
+                        "items; this item and the rest were not processed",
+                    }
+                ) + "\n"
+        finally:
+            for task in workers:
+                task.cancel()
+
+    return StreamingResponse(
+        stream_results(),
+        media_type="application/x-ndjson",
+        headers={"X-Bulk-Items": str(count)},
+    )
+
+
+async def get_local_composites(params: CompositeFilterParams) -> dict:
+    """Serve the composite listing from the local read replica."""
+    breeder_rows = await db_manager.get_all_breeders(
+        params.breeder_city, params.breeder_limit, params.breeder_offset
+    )
+    pet_rows = await db_manager.get_all_pets(
+        params.type, params.pet_limit, params.pet_offset
+    )
+
+    return {
+        "breeders": {"data": [dict(row._mapping) for row in breeder_rows]},
+        "pets": {"data": [dict(row._mapping) for row in pet_rows]},
+        "links": [
+            Link(rel="self", href=f"{URL_PREFIX}/composites/"),
+            Link(rel="collection", href=f"{URL_PREFIX}/composites/"),
+        ],
+    }
+
+
+def composite_sections(params: CompositeFilterParams) -> Dict[str, tuple]:
+    """URL, query and response model of each section of a composite read"""
+    breeder_query = {
+        "limit": params.breeder_limit,
+        "offset": params.breeder_offset,
+        "breeder_city": params.breeder_city,
+    }
+    pet_query = {
+        "limit": params.pet_limit,
+        "offset": params.pet_offset,
+        "type": params.type,
+    }
+    return {
+        "breeders": (
+            f"{BREEDER_SERVICE_URL}/",
+            {k: v for k, v in breeder_query.items() if v},
+            BreederListResponse,
+        ),
+        "pets": (
+            f"{PET_SERVICE_URL}/",
+            {k: v for k, v in pet_query.items() if v},
+            PetListResponse,
+        ),
+    }
+
+
+def _section_key(name: str, url: str, query: dict, scope: str) -> tuple:
+    """Sections are cached per caller, like the entity caches"""
+    return (name, url, tuple(sorted(query.items())), scope)
+
+
+async def fetch_section(
+    client: httpx.AsyncClient,
+    name: str,
+    url: str,
+    query: dict,
+    model,
+    headers: dict,
+    budget: float,
+    scope: str,
+):
+    """Fetch one section within ``budget`` seconds, falling back to stale data"""
+    key = _section_key(name, url, query, scope)
+    started = time.perf_counter()
+    try:
+        section_response = await asyncio.wait_for(
+            client.get(url, params=query, headers=headers), timeout=budget
+        )
+        section_response.raise_for_status()
+        data = model.model_validate(section_response.json())
+        section_cache.set(key, data)
+        return data, SectionStatus(
+            status="ok", elapsed_ms=(time.perf_counter() - started) * 1000
+        )
+    except (asyncio.TimeoutError, httpx.TimeoutException):
+        status, error = "timeout", f"No response within {budget * 1000:.0f}ms"
+    except (httpx.HTTPError, ValueError) as e:
+        # ValueError covers undecodable JSON and model validation failures
+        status, error = "error", str(e)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    entry = section_cache.get(key)
+    if entry is not None and entry.age <= COMPOSITE_STALE_MAX_AGE:
+        return entry.value, SectionStatus(
+            status=status,
+            stale=True,
+            age_seconds=entry.age,
+            elapsed_ms=elapsed_ms,
+            error=error,
+        )
+    return None, SectionStatus(status=status, elapsed_ms=elapsed_ms, error=error)
+
+
+async def get_partial_composites(
+    request: Request, params: CompositeFilterParams
+) -> JSONResponse:
+    """Fetch every section concurrently under its own latency budget.
+
+    Sections that fail or time out are returned as null (or as stale cached
+    data), with a per-section status, instead of failing the whole read.
+    """
+    headers = {
+        "X-Correlation-ID": get_correlation_id(),
+        "Authorization": f"{request.headers.get('Authorization')}",
+    }
+    budget = deadline.bound(COMPOSITE_SECTION_BUDGET_MS / 1000)
+    client = get_http_client()
+    sections = composite_sections(params)
+    scope = cache_scope(request)
+    results = await asyncio.gather(
+        *(
+            fetch_section(client, name, url, query, model, headers, budget, scope)
+            for name, (url, query, model) in sections.items()
+        )
+    )
+    data = {name: result[0] for name, result in zip(sections, results)}
+    statuses = {name: result[1] for name, result in zip(sections, results)}
+    partial = any(status.status != "ok" for status in statuses.values())
+
+    body = PartialCompositeOut(
+        **data,
+        links=[
+            Link(rel="self", href=f"{URL_PREFIX}/composites/"),
+            Link(rel="collection", href=f"{URL_PREFIX}/composites/"),
+        ],
+        partial=partial,
+        sections=statuses,
+    )
+    # Nothing to show at all is still a failure
+    status_code = 502 if all(value is None for value in data.values()) else 200
+    return JSONResponse(
+        status_code=status_code,
+        content=jsonable_encoder(body),
+        headers={
+            "X-Composite-Source": "live",
+            "X-Composite-Partial": "true" if partial else "false",
+        },
+    )
+
+
 @composites.get("/", response_model=CompositeOut)
-async def get_composites(request: Request, params: CompositeFilterParams = Depends()):
+async def get_composites(
+    request: Request, response: Response, params: CompositeFilterParams = Depends()
+):
     """GET is implemented synchronously.
 
     - support operations on the sub-resources (GET)
     - support navigation paths, including query parameters.
+    - served from the local read replica while it is fresh.
+    - degraded partial responses with the X-Allow-Partial: true header.
     """
 
+    replica = get_replica()
+    if replica is not None and replica.is_fresh():
+        response.headers["X-Composite-Source"] = "replica"
+        return await get_local_composites(params)
+
+    if request.headers.get(PARTIAL_HEADER, "").lower() in ("1", "true", "yes"):
+        return await get_partial_composites(request, params)
+    response.headers["X-Composite-Source"] = "live"
+
     if not is_breeder_route_present:
         raise HTTPException(status_code=404, detail=f"Breeder service not found")
 
@@ -174,48 +623,29 @@ async def get_composites(request: Request, params: CompositeFilterParams = Depen
         raise HTTPException(status_code=404, detail=f"Pet service not found")
 
     try:
-        breeder_url = f"{BREEDER_SERVICE_URL}/"
-
-        breeder_params = []
-
-        if params.breeder_limit:
-            breeder_params.append(f"limit={params.breeder_limit}")
-        if params.breeder_offset:
-            breeder_params.append(f"offset={params.breeder_offset}")
-        if params.breeder_city:
-            breeder_params.append(f"breeder_city={params.breeder_city}")
-
-        # If any query parameters exist, join them with "&" and append to the URL
-        if breeder_params:
-            breeder_url += "?" + "&".join(breeder_params)
-
         headers = {
             "X-Correlation-ID": get_correlation_id(),
             "Authorization": f"{request.headers.get('Authorization')}",
         }
-        breeder_response = httpx.get(breeder_url, headers=headers)
+        sections = composite_sections(params)
+        breeder_response = await downstream.breeders().list(sections["breeders"][1], headers)
         breeder_data = breeder_response.json()
 
         ##### PET SERVICE #####
 
-        pet_url = f"{PET_SERVICE_URL}/"
-
-        pet_params = []
-
-        if params.pet_limit:
-            pet_params.append(f"limit={params.pet_limit}")
-        if params.pet_offset:
-            pet_params.append(f"offset={params.pet_offset}")
-        if params.type:
-            pet_params.append(f"type={params.type}")
-
-        # If any query parameters exist, join them with "&" and append to the URL
-        if pet_params:
-            pet_url += "?" + "&".join(pet_params)
-
-        pet_response = httpx.get(pet_url, headers=headers)
+        pet_response = await downstream.pets().list(sections["pets"][1], headers)
         pet_data = pet_response.json()
 
+        # Keep the last good sections for degraded reads
+        scope = cache_scope(request)
+        for name, section_response, section_data in (
+            ("breeders", breeder_response, breeder_data),
+            ("pets", pet_response, pet_data),
+        ):
+            if section_response.is_success:
+                url, query, _ = sections[name]
+                section_cache.set(_section_key(name, url, query, scope), section_data)
+
         return {
             "breeders": breeder_data,
             "pets": pet_data,
@@ -228,106 +658,231 @@ async def get_composites(request: Request, params: CompositeFilterParams = Depen
         raise HTTPException(status_code=500, detail={"error": str(e)})
 
 
-@composites.get("/breeders/id/{id}/")
-async def composite_get_breeder(id: str):
-    """Pub/Sub implementation for composite service"""
+@composites.get("/search")
+async def search_catalog(
+    breeder_city: Optional[str] = None,
+    breeder_country: Optional[str] = None,
+    price_level: Optional[str] = None,
+    type: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    bins: int = Query(10, ge=1, le=100),
+):
+    """Facet counts and price statistics over the catalog snapshot.
 
-    pubsub_credentials = service_account.Credentials.from_service_account_file(
-        os.getenv("GOOGLE_APPLICATION_CREDENTIALS_PUBSUB"),
-        scopes=["https://www.googleapis.com/auth/pubsub"],
+    - filters take comma-separated values, e.g. ?breeder_city=Paris,Berlin
+    - the snapshot is refreshed in the background; X-Catalog-Age is its age
+    """
+    snapshot = catalog.catalog.snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Catalog snapshot is not available")
+
+    filters = {
+        name: [v.strip() for v in value.split(",") if v.strip()]
+        for name, value in (
+            ("breeder_city", breeder_city),
+            ("breeder_country", breeder_country),
+            ("price_level", price_level),
+            ("type", type),
+        )
+        if value
+    }
+    result = snapshot.search(filters, min_price, max_price, bins)
+    age = snapshot.age()
+    return JSONResponse(
+        content={
+            "snapshot": {
+                "built_at": snapshot.built_at,
+                "age_seconds": age,
+                "breeders": snapshot.breeder_count,
+                "pets": snapshot.pet_count,
+            },
+            **result,
+        },
+        headers={"X-Catalog-Age": f"{age:.0f}"},
     )
-    correlation_id = str(uuid.uuid4())
-            
-    try:
-        publisher = PublisherClient(credentials=pubsub_credentials)
-        project_name = os.getenv("GCP_PROJECT_ID")
-        request_topic = os.getenv("REQUEST_TOPIC")
-        topic_name = f"projects/{project_name}/topics/{request_topic}"
-        message_data = {
-            "breeder_id": str(id),
-            "correlation_id": correlation_id,
-        }
-        data = json.dumps(message_data).encode("utf-8")
 
-        # Log for debugging
-        # print(f"Publishing to topic: {topic_name}")
-        # print(f"Message data: {message_data}")
 
-        # Publish and await the result
-        future = publisher.publish(topic_name, data)
-        message_id = future.result()
-        print(f"Message published with ID: {message_id}")
-    except Exception as e:
-        print(f"Error while publishing: {e}")
-        raise HTTPException(status_code=500, detail="Failed to publish message")
-    
+async def load_breeder(breeder_id: str, headers: dict) -> dict:
+    breeder = await downstream.breeders().get(breeder_id, headers)
+    if breeder is None:
+        raise HTTPException(status_code=404, detail="Breeder not found")
+    return breeder
+
+
+async def load_breeder_pets(breeder_id: str, headers: dict) -> List[dict]:
+    response = await downstream.pets().list({"breeder_id": breeder_id}, headers)
+    response.raise_for_status()
+    # Filtered here too, for pet services that ignore the parameter
+    return [
+        pet
+        for pet in response.json().get("data", [])
+        if str(pet.get("breeder_id")) == breeder_id
+    ]
+
+
+async def load_waitlist(breeder_id: str, headers: dict) -> List[dict]:
+    response = await get_http_client().get(
+        f"{CUSTOMER_SERVICE_URL}/breeder/{quote(breeder_id, safe='')}/waitlist",
+        headers=headers,
+        follow_redirects=True,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def cache_scope(request: Request) -> str:
+    """tokenId of the verified caller, whose view of the entities is cached"""
+    token_id = (getattr(request.state, "user", None) or {}).get("tokenId")
+    if token_id is not None:
+        return f"user:{token_id}"
+    # No identity to share under: the token itself is the scope
+    token = request.headers.get("Authorization", "")
+    return "token:" + hashlib.sha256(token.encode()).hexdigest()
+
+
+def composite_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+@composites.get("/{breeder_id}/", response_model=BreederCompositeOut)
+async def get_breeder_composite(
+    breeder_id: str, request: Request, expand: Optional[str] = None
+):
+    """One breeder with its pets; ``?expand=waitlist`` adds its waitlist.
+
+    - the parts are fetched concurrently, from the entity caches when warm
+    - conditional GET: the response has an ETag, and If-None-Match answers 304
+    """
+    headers = {
+        "X-Correlation-ID": get_correlation_id(),
+        "Authorization": f"{request.headers.get('Authorization')}",
+    }
+    key = (breeder_id, cache_scope(request))
+    loads = [
+        breeder_cache.get(key, lambda: load_breeder(breeder_id, headers)),
+        breeder_pets_cache.get(key, lambda: load_breeder_pets(breeder_id, headers)),
+    ]
+    with_waitlist = "waitlist" in (expand or "").split(",")
+    if with_waitlist:
+        loads.append(waitlist_cache.get(key, lambda: load_waitlist(breeder_id, headers)))
     try:
-        print("About to initialize SubscriberClient")
-        # Use SubscriberClient as a synchronous context manager
-        with SubscriberClient(credentials=pubsub_credentials) as subscriber:
-            response_sub = os.getenv("RESPONSE_SUBSCRIPTION_NAME")
-            subscription_name = f"projects/{project_name}/subscriptions/{response_sub}"
-            print(f"Listening to subscription: {subscription_name}")
-
-            timeout = 30  # seconds
-            start_time = asyncio.get_event_loop().time()
-            while (asyncio.get_event_loop().time() - start_time) < timeout:
-                print(f"Polling messages from subscription: {subscription_name}")
-                try:
-                    # Pull messages from the subscription
-                    response = subscriber.pull(
-                        request={"subscription": subscription_name, "max_messages": 10}
-                    )
-                    print(f"Received {len(response.received_messages)} messages")
+        results = await asyncio.gather(*loads)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail={"error": str(e)})
+
+    (breeder, breeder_result), (pets, pets_result) = results[:2]
+    composite_url = f"{URL_PREFIX}/composites/{breeder_id}/"
+    body = BreederCompositeOut(
+        breeder=breeder,
+        pets=pets,
+        waitlist=results[2][0] if with_waitlist else None,
+        links=[
+            Link(rel="self", href=composite_url),
+            Link(rel="collection", href=f"{URL_PREFIX}/composites/"),
+        ],
+    )
+    content = body.model_dump_json(exclude_none=True).encode()
+    cache_results = {result for _, result in results}
+    response_headers = {
+        "ETag": composite_etag(content),
+        "Cache-Control": "private, no-cache",
+        # The least fresh of the parts
+        "X-Cache": next(r for r in ("miss", "stale", "hit") if r in cache_results),
+    }
+    if etag_matches(request.headers.get("If-None-Match"), response_headers["ETag"]):
+        return Response(status_code=304, headers=response_headers)
+    return Response(
+        content=content, media_type="application/json", headers=response_headers
+    )
 
-                    for msg in response.received_messages:
-                        print(f"Raw message: {msg.message.data}")
-                        message_data = json.loads(msg.message.data.decode("utf-8"))
-                        print(f"Decoded message data: {message_data}")
 
-                        # Check for matching correlation_id
-                        if message_data.get("correlation_id") == correlation_id:
-                            print(f"Correlation ID matched: {correlation_id}")
+@composites.get("/breeders/id/{id}/")
+async def composite_get_breeder(id: str):
+    """Pub/Sub implementation for composite service
+
+    Concurrent lookups are micro-batched into one request message.
+    """
+    try:
+        return await get_breeder_lookup().get(id)
+    except ReplyTimeout:
+        raise HTTPException(status_code=504, detail="Response timed out")
+    except Exception as e:
+        logging.error(f"Pub/Sub breeder lookup failed: {e}")
+        raise HTTPException(status_code=500, detail="Failed to publish message")
 
-                            # Acknowledge the message
-                            subscriber.acknowledge(
-                                request={
-                                    "subscription": subscription_name,
-                                    "ack_ids": [msg.ack_id],
-                                }
-                            )
-                            return message_data["breeder_data"]
 
-                except Exception as e:
-                    print(f"Error during message polling: {e}")
+@composites.get("/breeders/ids")
+async def composite_get_breeders(ids: str):
+    """Several breeders over Pub/Sub in one request message.
 
-                await asyncio.sleep(1)
+    - ids is a comma-separated list, e.g. ?ids=a,b,c
+    - ids without data or without a reply in time are listed in "missing"
+    """
+    breeder_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not breeder_ids:
+        raise HTTPException(status_code=400, detail="ids must list at least one id")
+    if len(breeder_ids) > PUBSUB_MAX_IDS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {PUBSUB_MAX_IDS} ids per request"
+        )
 
-            print("Timeout reached while waiting for response")
-            raise HTTPException(status_code=504, detail="Response timed out")
+    try:
+        results = await get_breeder_lookup().get_many(breeder_ids)
     except Exception as e:
-        print(f"Error initializing SubscriberClient or processing messages: {e}")
-        raise
+        logging.error(f"Pub/Sub breeder lookup failed: {e}")
+        raise HTTPException(status_code=500, detail="Failed to publish message")
 
+    found = {
+        breeder_id: data
+        for breeder_id, data in results.items()
+        if data is not None and not isinstance(data, ReplyTimeout)
+    }
+    return {
+        "data": list(found.values()),
+        "missing": [breeder_id for breeder_id in breeder_ids if breeder_id not in found],
+    }
 
 
 @composites.get("/customers/id/{id}/")
-async def composite_get_customer(id: str):
-    """Workflow implementation for composite service"""
+async def composite_get_customer(id: str, response: Response):
+    """Workflow implementation for composite service
+
+    - results are cached per customer and served stale while being refreshed
+    """
+    data, cache_result = await customer_cache.get(id, lambda: run_customer_workflow(id))
+    response.headers["X-Cache"] = cache_result
+    return data
+
+
+async def run_customer_workflow(id: str):
+    """Fetch a customer through a Workflows execution"""
     try:
-        workflow_credentials = service_account.Credentials.from_service_account_file(
-            os.getenv("GOOGLE_APPLICATION_CREDENTIALS_WORKFLOW"),
-            scopes=["https://www.googleapis.com/auth/cloud-platform"],
-        )
+        workflow_credentials = sdk.workflow_credentials()
+        executions_v1 = sdk.executions()
+        Execution = executions_v1.Execution
 
         project_name = os.getenv("GCP_PROJECT_ID")
         location = "us-central1"
         workflow_id = "composite-to-customer"
 
-        execution_client = executions_v1.ExecutionsAsyncClient(
-            credentials=workflow_credentials
+        execution_client = bulkhead.wrap(
+            faults.wrap(
+                executions_v1.ExecutionsAsyncClient(credentials=workflow_credentials),
+                "workflows",
+                ("create_execution", "get_execution"),
+            ),
+            "workflows",
+            ("create_execution", "get_execution"),
         )
-        workflow_client = workflows_v1.WorkflowsClient(credentials=workflow_credentials)
+        workflow_client = sdk.workflows_client()
         parent = workflow_client.workflow_path(project_name, location, workflow_id)
 
         if os.getenv("FASTAPI_ENV") != "production":
@@ -341,32 +896,51 @@ async def composite_get_customer(id: str):
                 "customer_service_url": CUSTOMER_SERVICE_URL,
             }
 
-        execution = await execution_client.create_execution(
-            request={
-                "parent": parent,
-                "execution": {"argument": json.dumps(workflow_args)},
-            }
-        )
-        logging.info(f"Created execution: {execution.name}")
-
-        # Add timeout to prevent infinite loops
-        start_time = time.time()
-        timeout = 30  # 30 seconds timeout
-
-        while True:
-            execution = await execution_client.get_execution(
-                request={"name": execution.name}
+        with start_span(
+            "workflows.execution",
+            kind="client",
+            workflow_id=workflow_id,
+            customer_id=id,
+        ) as span:
+            # Forward the trace so the workflow's own HTTP calls can join it
+            workflow_args.update(propagation_headers(span))
+
+            execution = await execution_client.create_execution(
+                request={
+                    "parent": parent,
+                    "execution": {"argument": json.dumps(workflow_args)},
+                }
             )
+            logging.info(f"Created execution: {execution.name}")
+            span.set_attribute("workflows.execution_name", execution.name)
 
-            if execution.state in [Execution.State.SUCCEEDED, Execution.State.FAILED]:
-                break
+            # Add timeout to prevent infinite loops
+            start_time = time.time()
+            timeout = deadline.bound(30)  # 30 seconds or the request deadline
+            polls = 0
 
-            if time.time() - start_time > timeout:
-                raise HTTPException(
-                    status_code=408, detail="Workflow execution timed out"
+            while True:
+                execution = await execution_client.get_execution(
+                    request={"name": execution.name}
                 )
+                polls += 1
+
+                if execution.state in [
+                    Execution.State.SUCCEEDED,
+                    Execution.State.FAILED,
+                ]:
+                    break
+
+                if time.time() - start_time > timeout:
+                    raise HTTPException(
+                        status_code=408, detail="Workflow execution timed out"
+                    )
+
+                await asyncio.sleep(1)  # Add delay between checks
 
-            await asyncio.sleep(1)  # Add delay between checks
+            span.set_attribute("workflows.polls", polls)
+            if execution.state == Execution.State.FAILED:
+                span.status = "error"
 
         if execution.state == Execution.State.FAILED:
             raise HTTPException(
@@ -393,6 +967,90 @@ async def composite_get_customer(id: str):
         )
 
 
+# (client, id, changes, record before the update)
+Update = Tuple[downstream.DownstreamClient, str, dict, dict]
+
+
+def _downstream_error(error: Exception) -> HTTPException:
+    """A downstream call that got no usable answer: the service's trouble, not ours"""
+    if isinstance(error, httpx.TimeoutException):
+        return HTTPException(status_code=504, detail=f"Downstream service timed out: {error}")
+    if isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 503:
+        return HTTPException(
+            status_code=503, detail=f"Downstream service unavailable: {error}"
+        )
+    return HTTPException(
+        status_code=502, detail=f"Error reaching downstream service: {error}"
+    )
+
+
+def _update_error(client: downstream.DownstreamClient, result) -> HTTPException:
+    name = client.name.capitalize()
+    if isinstance(result, httpx.HTTPError):
+        return _downstream_error(result)
+    if result.status_code == 404:
+        return HTTPException(status_code=404, detail=f"{name} not found")
+    if result.status_code == 412:
+        return HTTPException(
+            status_code=409, detail=f"{name} was modified concurrently"
+        )
+    return HTTPException(
+        status_code=result.status_code,
+        detail=f"{name} service returned an error: {result.text}",
+    )
+
+
+async def update_together(updates: List[Update], headers: dict) -> List[dict]:
+    """PUT every update concurrently, all or nothing.
+
+    When one PUT fails, the records that were updated are put back to their
+    previous values, conditionally on the version the update left them at.
+    """
+
+    async def put(client, id, changes, before):
+        return await client.put(id, changes, headers, version=client.version(before))
+
+    async def roll_back(client, id, changes, before, result):
+        restore = {field: before.get(field) for field in changes}
+        response = await client.put(
+            id, restore, headers, version=client.version(result.json())
+        )
+        response.raise_for_status()
+
+    results = await asyncio.gather(
+        *(put(*update) for update in updates), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException) and not isinstance(result, httpx.HTTPError):
+            raise result
+    succeeded = [
+        not isinstance(result, httpx.HTTPError) and not result.is_error
+        for result in results
+    ]
+    if all(succeeded):
+        return [result.json() for result in results]
+
+    done = [
+        (update, result)
+        for update, result, ok in zip(updates, results, succeeded)
+        if ok
+    ]
+    rollbacks = await asyncio.gather(
+        *(roll_back(*update, result) for update, result in done),
+        return_exceptions=True,
+    )
+    failed = succeeded.index(False)
+    error = _update_error(updates[failed][0], results[failed])
+    stuck = []
+    for (update, _), rollback in zip(done, rollbacks):
+        if isinstance(rollback, Exception):
+            logging.error(f"Rolling back {update[0].name} {update[1]} failed: {str(rollback)}")
+            stuck.append(update[0].name)
+    if stuck:
+        error.detail += f" ({', '.join(stuck)} kept the new values: rollback failed)"
+    raise error
+
+
 @composites.put("/both/{breeder_id}/{pet_id}/", response_model=None)
 async def update_breeder_and_pet(
     breeder_id: str, pet_id: str, payload: CompositeUpdateBoth, request: Request
@@ -401,6 +1059,9 @@ async def update_breeder_and_pet(
 
     - support operations on the sub-resources (PUT)
     - support navigation paths.
+
+    Both records are read, then both updated, concurrently. If one update
+    fails the other is rolled back.
     """
     if not is_breeder_route_present:
         raise HTTPException(status_code=404, detail=f"Breeder service not found")
@@ -409,46 +1070,57 @@ async def update_breeder_and_pet(
     if not is_pet_route_present:
         raise HTTPException(status_code=404, detail=f"Pet service not found")
 
-    # check if breeder and pet exists
-    async with httpx.AsyncClient() as client:
-        headers = {
-            "X-Correlation-ID": get_correlation_id(),
-            "Authorization": f"{request.headers.get('Authorization')}",
-        }
-
-        breeder_exist = await client.get(f"{BREEDER_SERVICE_URL}/{breeder_id}/", headers=headers)
-        if breeder_exist.status_code != 200:
-            raise HTTPException(status_code=404, detail="Breeder not found")
+    headers = {
+        "X-Correlation-ID": get_correlation_id(),
+        "Authorization": f"{request.headers.get('Authorization')}",
+    }
+    breeders, pets = downstream.breeders(), downstream.pets()
 
-        pet_exist = await client.get(f"{PET_SERVICE_URL}/{pet_id}/", headers=headers)
-        if pet_exist.status_code != 200:
-            raise HTTPException(status_code=404, detail="Pet not found")
-
-    # Update breeder
-    async with httpx.AsyncClient() as client:
-        breeder_payload_dump = payload.model_dump(exclude_unset=True)["breeder"]
-        breeder_response = await client.put(
-            f"{BREEDER_SERVICE_URL}/{breeder_id}/", json=breeder_payload_dump, headers=headers
+    # The existence checks double as the snapshot a failed update rolls back
+    # to, and as the version conditional PUTs are made against
+    try:
+        breeder_before, pet_before = await asyncio.gather(
+            breeders.get(breeder_id, headers),
+            pets.get(pet_id, headers),
         )
-        pet_payload_dump = payload.model_dump(exclude_unset=True)["pet"]
-        # Update pet
-        pet_response = await client.put(
-            f"{PET_SERVICE_URL}/{pet_id}/", json=pet_payload_dump, headers=headers
+    except (httpx.HTTPError, ValueError) as e:
+        raise _downstream_error(e)
+    if breeder_before is None:
+        raise HTTPException(status_code=404, detail="Breeder not found")
+    if pet_before is None:
+        raise HTTPException(status_code=404, detail="Pet not found")
+
+    changes = payload.model_dump(exclude_unset=True)
+    updates = [
+        (client, id, changes[key], before)
+        for key, client, id, before in (
+            ("breeder", breeders, breeder_id, breeder_before),
+            ("pet", pets, pet_id, pet_before),
         )
+        if changes.get(key) is not None
+    ]
+    updated = dict(
+        zip((client.name for client, *_ in updates), await update_together(updates, headers))
+    )
+    breeder = updated.get("breeder", breeder_before)
+    pet = updated.get("pet", pet_before)
+    breeder_cache.invalidate_group(breeder_id)
+    for owner in {str(pet_before.get("breeder_id")), str(pet.get("breeder_id"))}:
+        breeder_pets_cache.invalidate_group(owner)
 
     # Include link sections in the response body
     response_data = CompositeOut(
         breeders=BreederListResponse(
             data=[
                 BreederOut(
-                    id=breeder_response.json().get("id"),
-                    name=breeder_response.json().get("name"),
-                    breeder_city=breeder_response.json().get("breeder_city"),
-                    breeder_country=breeder_response.json().get("breeder_country"),
-                    price_level=breeder_response.json().get("price_level"),
-                    breeder_address=breeder_response.json().get("breeder_address"),
-                    email=breeder_response.json().get("email"),
-                    links=breeder_response.json().get("links"),
+                    id=breeder.get("id"),
+                    name=breeder.get("name"),
+                    breeder_city=breeder.get("breeder_city"),
+                    breeder_country=breeder.get("breeder_country"),
+                    price_level=breeder.get("price_level"),
+                    breeder_address=breeder.get("breeder_address"),
+                    email=breeder.get("email"),
+                    links=breeder.get("links"),
                 )
             ],
             links=[
@@ -459,12 +1131,12 @@ async def update_breeder_and_pet(
         pets=PetListResponse(
             data=[
                 PetOut(
-                    id=pet_response.json().get("id"),
-                    name=pet_response.json().get("name"),
-                    type=pet_response.json().get("type"),
-                    price=pet_response.json().get("price"),
-                    breeder_id=pet_response.json().get("breeder_id"),
-                    links=pet_response.json().get("links"),
+                    id=pet.get("id"),
+                    name=pet.get("name"),
+                    type=pet.get("type"),
+                    price=pet.get("price"),
+                    breeder_id=pet.get("breeder_id"),
+                    links=pet.get("links"),
                 )
             ],
         ),
@@ -484,106 +1156,59 @@ async def update_breeder_and_pet(
 # Function to Fetch Information from Individual Services
 async def get_email_data(breeder_id: str, pet_id: str, customer_id: str, auth_header: str):
     """Fetch data from individual services asynchronously to construct the email payload."""
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {}
-            if auth_header:
-                headers["Authorization"] = auth_header  # Pass the auth header
-
-            # Fetch breeder information
-            breeder_url = f"{BREEDER_SERVICE_URL}/{breeder_id}/"
-            breeder_response = await client.get(breeder_url, headers=headers)
-            breeder_response.raise_for_status()
-            breeder_data = breeder_response.json()
-
-            # Fetch pet information
-            pet_url = f"{PET_SERVICE_URL}/{pet_id}/"
-            pet_response = await client.get(pet_url, headers=headers)
-            pet_response.raise_for_status()
-            pet_data = pet_response.json()
-
-            # Fetch customer information
-            customer_url = f"{CUSTOMER_SERVICE_URL}/{customer_id}/"
-            customer_response = await client.get(customer_url, headers=headers)
-            customer_response.raise_for_status()
-            customer_data = customer_response.json()
-
-            # Validate the fetched data
-            breeder_email = breeder_data.get("email")
-            customer_name = customer_data.get("name")
-            customer_email = customer_data.get("email")
-            pet_name = pet_data.get("name")
-
-            if not all([breeder_email, customer_name, customer_email, pet_name]):
-                raise ValueError("Missing required data for email construction")
-
-            # Construct the email data
-            email_data = {
-                "breeder_email": breeder_email,
-                "customer_name": customer_name,
-                "customer_email": customer_email,
-                "pet_name": pet_name,
-                "pet_id": pet_id,
-            }
-            return email_data
-
-        except httpx.RequestError as e:
-            raise HTTPException(
-                status_code=500, detail=f"Error fetching data from services: {str(e)}"
-            )
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(
-                status_code=e.response.status_code,
-                detail=f"Service returned an error: {str(e)}",
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail=f"Unexpected error occurred: {str(e)}"
-            )
-
-
-
-# AWS Lambda settings
-LAMBDA_FUNCTION_NAME = os.getenv("LAMBDA_FUNCTION_NAME", "SendEmailFunction")
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
-
-# Initialize AWS Lambda client
-lambda_client = boto3.client("lambda", region_name=AWS_REGION)
-
-
-def invoke_lambda(email_data: dict):
-    """Trigger the AWS Lambda function with the necessary payload using boto3."""
     try:
-        # Wrap the email_data in a "body" key, as expected by the Lambda handler
-        payload = {"body": json.dumps(email_data)}  # Convert to JSON string
-
-        # Log the payload for debugging
-
-        # Invoke the Lambda function synchronously
-        response = lambda_client.invoke(
-            FunctionName=LAMBDA_FUNCTION_NAME,
-            InvocationType="RequestResponse",
-            Payload=json.dumps(payload),  # Send the wrapped payload
+        headers = {"X-Correlation-ID": get_correlation_id()}
+        if auth_header:
+            headers["Authorization"] = auth_header  # Pass the auth header
+
+        # Looked up together, and batched with concurrent webhooks
+        breeder_data, pet_data, customer_data = await asyncio.gather(
+            downstream.breeders().get(breeder_id, headers),
+            downstream.pets().get(pet_id, headers),
+            downstream.customers().get(customer_id, headers),
         )
+        for name, data in (
+            ("Breeder", breeder_data),
+            ("Pet", pet_data),
+            ("Customer", customer_data),
+        ):
+            if data is None:
+                raise HTTPException(status_code=404, detail=f"{name} not found")
+
+        # Validate the fetched data
+        breeder_email = breeder_data.get("email")
+        customer_name = customer_data.get("name")
+        customer_email = customer_data.get("email")
+        pet_name = pet_data.get("name")
+
+        if not all([breeder_email, customer_name, customer_email, pet_name]):
+            raise ValueError("Missing required data for email construction")
+
+        # Construct the email data
+        email_data = {
+            "breeder_email": breeder_email,
+            "customer_name": customer_name,
+            "customer_email": customer_email,
+            "pet_name": pet_name,
+            "pet_id": pet_id,
+        }
+        return email_data
 
-        # Parse Lambda response
-        response_payload = json.loads(response["Payload"].read())
-
-        # Check for error in Lambda response
-        if response_payload.get("statusCode") != 200:
-            error_message = response_payload.get("body", "Unknown error")
-            return {
-                "status": "failure",
-                "message": "Lambda function invocation failed",
-                "details": error_message,
-            }
-        return response_payload
+    except HTTPException:
+        raise
+    except httpx.RequestError as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching data from services: {str(e)}"
+        )
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=e.response.status_code,
+            detail=f"Service returned an error: {str(e)}",
+        )
     except Exception as e:
-        return {
-            "status": "failure",
-            "message": "Error invoking Lambda function",
-            "details": str(e),
-        }
+        raise HTTPException(
+            status_code=500, detail=f"Unexpected error occurred: {str(e)}"
+        )
 
 
 @composites.post("/webhook", status_code=200)
@@ -625,9 +1250,13 @@ async def handle_webhook(request: Request):
                 detail=f"Invalid email data, missing keys: {missing_keys}",
             )
 
-        # Trigger AWS Lambda function
+        # Send the email through the Lambda, or queue it with the breeder's batch
         try:
-            lambda_response = invoke_lambda(email_data)
+            lambda_response = await notifications.get_notifier().notify(
+                breeder_id, email_data
+            )
+            if lambda_response.get("status") == "queued":
+                return lambda_response
             return {"status": "success", "lambda_response": lambda_response}
         except Exception as e:
             return {
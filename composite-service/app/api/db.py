@@ -1,45 +1,53 @@
-# import os
-
-# from sqlalchemy import (
-#     Column,
-#     DateTime,
-#     Integer,
-#     MetaData,
-#     String,
-#     Table,
-#     create_engine,
-#     ARRAY,
-# )
-
-# from databases import Database
-
-# DATABASE_URI = os.getenv("DATABASE_URI")
-
-# engine = create_engine(DATABASE_URI)
-# metadata = MetaData()
-
-# breeders = Table(
-#     "breeders",
-#     metadata,
-#     Column("id", String(36), primary_key=True),
-#     Column("name", String(50)),
-#     Column("breeder_city", String(100)),
-#     Column("breeder_country", String(100)),
-#     Column("price_level", String(50)),
-#     Column("breeder_address", String(255)),
-# )
-
-
-# # Custom function to configure asyncpg connection options
-# async def configure_connection(connection):
-#     await connection.set_statement_cache_size(0)
-
-
-# # Setup for asyncpg with custom connection configuration
-# database = Database(DATABASE_URI, min_size=1, max_size=10)
-
-
-# # Configure the database connection to disable statement caching
-# async def setup_database():
-#     async with database.connection() as connection:
-#         await configure_connection(connection)
+import os
+
+from sqlalchemy import (
+    Column,
+    Float,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+)
+
+from databases import Database
+
+# Local read replica of the breeder and pet services. SQLite is used for tests
+# and local runs, Postgres (DATABASE_URI) in production.
+DATABASE_URI = os.getenv("DATABASE_URI", "sqlite:///./composite_replica.db")
+REPLICA_ENABLED = os.getenv("REPLICA_ENABLED", "false").lower() == "true"
+
+engine = create_engine(DATABASE_URI)
+metadata = MetaData()
+
+breeders = Table(
+    "breeders",
+    metadata,
+    Column("id", String(36), primary_key=True),
+    Column("name", String(50)),
+    Column("breeder_city", String(100), index=True),
+    Column("breeder_country", String(100)),
+    Column("price_level", String(50)),
+    Column("breeder_address", String(255)),
+    Column("email", String(255)),
+)
+
+pets = Table(
+    "pets",
+    metadata,
+    Column("id", String(36), primary_key=True),
+    Column("name", String(50)),
+    Column("type", String(50), index=True),
+    Column("price", Float),
+    Column("breeder_id", String(36), index=True),
+    Column("image_url", String(1024)),
+)
+
+
+def _database_options(uri: str) -> dict:
+    """Pool sizing only applies to server backends; sqlite passes options to connect()"""
+    if uri.startswith("sqlite"):
+        return {}
+    return {"min_size": 1, "max_size": 10}
+
+
+database = Database(DATABASE_URI, **_database_options(DATABASE_URI))
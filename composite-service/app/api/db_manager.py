@@ -1,46 +1,93 @@
-# from typing import Optional
-# from app.api.models import BreederIn, BreederOut
-# from app.api.db import breeders, database
+from typing import Iterable, Optional
+from app.api import db
 
+BREEDER_COLUMNS = [c.name for c in db.breeders.columns]
+PET_COLUMNS = [c.name for c in db.pets.columns]
 
-# async def add_breeder(payload: BreederIn, breeder_id: str):
-#     query = breeders.insert().values(id=breeder_id, **payload.model_dump())
 
-#     return await database.execute(query=query)
+def _row(data: dict, columns: list) -> dict:
+    return {column: data.get(column) for column in columns}
 
 
-# async def get_all_breeders(
-#     breeder_city: Optional[str], limit: Optional[int], offset: Optional[int]
-# ):
-#     query = breeders.select()
+async def upsert_breeder(data: dict):
+    """Insert or replace a breeder row in the replica"""
+    async with db.database.transaction():
+        await db.database.execute(
+            db.breeders.delete().where(db.breeders.c.id == str(data["id"]))
+        )
+        return await db.database.execute(
+            db.breeders.insert().values(**_row(data, BREEDER_COLUMNS))
+        )
 
-#     if breeder_city:
-#         query = query.where(breeders.c.breeder_city == breeder_city)
 
-#     if limit is not None:
-#         query = query.limit(limit)
+async def upsert_pet(data: dict):
+    """Insert or replace a pet row in the replica"""
+    async with db.database.transaction():
+        await db.database.execute(db.pets.delete().where(db.pets.c.id == str(data["id"])))
+        return await db.database.execute(db.pets.insert().values(**_row(data, PET_COLUMNS)))
 
-#     if offset is not None:
-#         query = query.offset(offset)
 
-#     return await database.fetch_all(query)
+async def delete_breeder(id: str):
+    query = db.breeders.delete().where(db.breeders.c.id == id)
+    return await db.database.execute(query=query)
 
 
-# async def get_breeder(id):
-#     query = breeders.select().where(breeders.c.id == id)
-#     return await database.fetch_one(query=query)
+async def delete_pet(id: str):
+    query = db.pets.delete().where(db.pets.c.id == id)
+    return await db.database.execute(query=query)
 
 
-# async def delete_breeder(id: int):
-#     query = breeders.delete().where(breeders.c.id == id)
-#     return await database.execute(query=query)
+async def replace_all(breeders: Iterable[dict], pets: Iterable[dict]):
+    """Swap the replica contents for a full snapshot in a single transaction"""
+    breeder_rows = [_row(b, BREEDER_COLUMNS) for b in breeders]
+    pet_rows = [_row(p, PET_COLUMNS) for p in pets]
 
+    async with db.database.transaction():
+        await db.database.execute(db.breeders.delete())
+        await db.database.execute(db.pets.delete())
+        if breeder_rows:
+            await db.database.execute_many(db.breeders.insert(), breeder_rows)
+        if pet_rows:
+            await db.database.execute_many(db.pets.insert(), pet_rows)
 
-# async def update_breeder(id: int, payload: BreederIn):
-#     query = breeders.update().where(breeders.c.id == id).values(**payload.model_dump())
-#     return await database.execute(query=query)
 
+async def get_all_breeders(
+    breeder_city: Optional[str], limit: Optional[int], offset: Optional[int]
+):
+    query = db.breeders.select().order_by(db.breeders.c.id)
 
-# async def delete_all_breeders():
-#     query = breeders.delete()  # This will delete all records from the breeders table
-#     return await database.execute(query=query)
+    if breeder_city:
+        query = query.where(db.breeders.c.breeder_city == breeder_city)
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    if offset is not None:
+        query = query.offset(offset)
+
+    return await db.database.fetch_all(query)
+
+
+async def get_all_pets(type: Optional[str], limit: Optional[int], offset: Optional[int]):
+    query = db.pets.select().order_by(db.pets.c.id)
+
+    if type:
+        query = query.where(db.pets.c.type == type)
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    if offset is not None:
+        query = query.offset(offset)
+
+    return await db.database.fetch_all(query)
+
+
+async def get_breeder(id: str):
+    query = db.breeders.select().where(db.breeders.c.id == id)
+    return await db.database.fetch_one(query=query)
+
+
+async def get_pets_by_breeder(breeder_id: str):
+    query = db.pets.select().where(db.pets.c.breeder_id == breeder_id)
+    return await db.database.fetch_all(query=query)
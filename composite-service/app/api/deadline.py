@@ -0,0 +1,173 @@
+"""Per-request deadlines and cancellation on client disconnect.
+
+Every request gets a deadline. It is the route default, shortened by the
+caller's ``X-Request-Timeout-Ms`` header when that is lower. Downstream HTTP
+calls use the remaining time as their timeout and forward it in the same
+header, so the services behind us stop too. When the deadline passes or the
+client disconnects, the request task, and every downstream await under it,
+is cancelled.
+"""
+
+import asyncio
+import math
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import httpx
+from starlette.responses import JSONResponse
+
+from app.api import metrics
+
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+DEFAULT_DEADLINE_MS = int(os.getenv("DEFAULT_DEADLINE_MS", "30000"))
+# Routes whose normal work does not fit the default (path prefix -> ms)
+ROUTE_DEADLINES_MS = {
+    "/api/v1/composites/bulk": int(os.getenv("BULK_DEADLINE_MS", "600000")),
+}
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+cancellations_total = metrics.counter(
+    "deadline_cancellations_total",
+    "Requests cancelled before completion, by reason (deadline or disconnect)",
+)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, or None outside a request"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def bound(timeout: float) -> float:
+    """``timeout`` shortened to the current request's remaining time"""
+    left = remaining()
+    return timeout if left is None else max(0.0, min(timeout, left))
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def clear():
+    """Drop the deadline in this context, for work shared by several requests"""
+    _deadline.set(None)
+
+
+def route_deadline_ms(path: str) -> int:
+    for prefix, ms in ROUTE_DEADLINES_MS.items():
+        if path.startswith(prefix):
+            return ms
+    return DEFAULT_DEADLINE_MS
+
+
+def request_deadline_ms(path: str, header: Optional[str]) -> int:
+    """Route default, shortened (never extended) by the caller's header"""
+    ms = route_deadline_ms(path)
+    try:
+        requested = int(header)
+    except (TypeError, ValueError):
+        return ms
+    return max(1, min(ms, requested))
+
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware: it needs to watch ``receive`` for a disconnect
+    while the route runs, which BaseHTTPMiddleware does not allow.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        header = dict(scope["headers"]).get(DEADLINE_HEADER.lower().encode())
+        timeout = request_deadline_ms(scope["path"], header and header.decode()) / 1000
+        token = _deadline.set(time.monotonic() + timeout)
+
+        # One reader owns the real ``receive``; the app reads from a queue so
+        # a disconnect is seen even while a GET handler never calls receive
+        messages: asyncio.Queue = asyncio.Queue(maxsize=16)
+        disconnected = asyncio.Event()
+        response_started = False
+
+        async def pump():
+            while True:
+                try:
+                    message = await receive()
+                except Exception:
+                    # Treat a broken receive channel as a gone client
+                    message = {"type": "http.disconnect"}
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                await messages.put(message)
+                if disconnected.is_set():
+                    return
+
+        async def app_receive():
+            if disconnected.is_set() and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def app_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        app_task = asyncio.create_task(self.app(scope, app_receive, app_send))
+        pump_task = asyncio.create_task(pump())
+        disconnect_task = asyncio.create_task(disconnected.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {app_task, disconnect_task},
+                timeout=max(0.0, timeout),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if app_task in done:
+                return app_task.result()
+
+            reason = "disconnect" if disconnect_task in done else "deadline"
+            cancellations_total.inc(reason=reason)
+            app_task.cancel()
+            await asyncio.gather(app_task, return_exceptions=True)
+            if reason == "deadline" and not response_started:
+                response = JSONResponse(
+                    status_code=504, content={"detail": "Request deadline exceeded"}
+                )
+                await response(scope, receive, send)
+        finally:
+            for task in (app_task, pump_task, disconnect_task):
+                if not task.done():
+                    task.cancel()
+            _deadline.reset(token)
+
+
+class DeadlineTransport(httpx.AsyncBaseTransport):
+    """Caps each downstream call at the request's remaining time and forwards it"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                raise httpx.TimeoutException("Request deadline exceeded", request=request)
+            timeouts = request.extensions.get("timeout", {})
+            request.extensions["timeout"] = {
+                key: left if timeouts.get(key) is None else min(timeouts[key], left)
+                for key in ("connect", "read", "write", "pool")
+            }
+            request.headers[DEADLINE_HEADER] = str(max(1, math.floor(left * 1000)))
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
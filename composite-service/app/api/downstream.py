@@ -0,0 +1,197 @@
+"""Typed clients for the breeder, pet and customer services.
+
+``get(id)`` lookups made within ``DOWNSTREAM_BATCH_WINDOW_MS`` of each other,
+by any request, are coalesced and fetched together. Services that accept a
+batch read (``<SERVICE>_BATCH_PARAM``, e.g. ``ids`` for
+``GET /?ids=a,b,c``) get one call per batch. Otherwise the batch is sent as
+single GETs, at most ``DOWNSTREAM_FANOUT`` at a time. Lookups with different
+Authorization headers never share a call.
+
+Services that version their records (``<SERVICE>_VERSION_FIELD``, e.g.
+``version``) get conditional PUTs: ``If-Match`` carries the version the caller
+read, and the service answers 412 when the record has changed since.
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from app.api import deadline
+from app.api.batching import MicroBatcher
+from app.api.service import (
+    BREEDER_SERVICE_URL,
+    CUSTOMER_SERVICE_URL,
+    PET_SERVICE_URL,
+    get_http_client,
+)
+from app.api.tracing import start_span
+
+DOWNSTREAM_BATCH_WINDOW_MS = float(os.getenv("DOWNSTREAM_BATCH_WINDOW_MS", "5"))
+DOWNSTREAM_MAX_BATCH = int(os.getenv("DOWNSTREAM_MAX_BATCH", "100"))
+DOWNSTREAM_FANOUT = int(os.getenv("DOWNSTREAM_FANOUT", "10"))
+
+# (Authorization header, id)
+LookupKey = Tuple[str, str]
+
+
+class DownstreamClient:
+    name = "downstream"
+
+    def __init__(
+        self,
+        base_url: str,
+        batch_param: Optional[str] = None,
+        version_field: Optional[str] = None,
+        window: float = DOWNSTREAM_BATCH_WINDOW_MS / 1000,
+        max_batch: int = DOWNSTREAM_MAX_BATCH,
+        fanout: int = DOWNSTREAM_FANOUT,
+    ):
+        self.base_url = base_url
+        self.batch_param = batch_param
+        self.version_field = version_field
+        self.fanout = fanout
+        self.batcher = MicroBatcher(self.fetch_many, window=window, max_batch=max_batch)
+
+    def url(self, id: str) -> str:
+        return f"{self.base_url}/{quote(str(id), safe='')}/"
+
+    async def get(self, id: str, headers: dict) -> Optional[dict]:
+        """One record, or None when the service does not have it"""
+        return await self.batcher.load((headers.get("Authorization", ""), id))
+
+    async def get_many(self, ids: List[str], headers: dict) -> Dict[str, Optional[dict]]:
+        auth = headers.get("Authorization", "")
+        results = await self.batcher.load_many([(auth, id) for id in ids])
+        return {id: results[(auth, id)] for id in ids}
+
+    async def list(self, query: dict, headers: dict) -> httpx.Response:
+        """The service's collection, filtered by ``query`` (URL-encoded)"""
+        return await get_http_client().get(
+            f"{self.base_url}/", params=query, headers=headers
+        )
+
+    async def put(
+        self, id: str, body: dict, headers: dict, version: Optional[object] = None
+    ) -> httpx.Response:
+        """Update ``id``; with ``version``, only if the record is still at it"""
+        if version is not None:
+            headers = {**headers, "If-Match": f'"{version}"'}
+        return await get_http_client().put(self.url(id), json=body, headers=headers)
+
+    def version(self, record: Optional[dict]) -> Optional[object]:
+        """Version to make a PUT conditional on, when the service has one"""
+        if self.version_field and record:
+            return record.get(self.version_field)
+        return None
+
+    async def fetch_many(self, keys: List[LookupKey]) -> Dict[LookupKey, object]:
+        # Shared by every caller in the batch, so no single request's deadline
+        # applies; each caller still stops waiting at its own
+        deadline.clear()
+        by_auth: Dict[str, List[str]] = {}
+        for auth, id in keys:
+            by_auth.setdefault(auth, []).append(id)
+
+        results: Dict[LookupKey, object] = {}
+        with start_span(
+            f"{self.name}.get_many", kind="client", batch_size=len(keys)
+        ):
+            fetched = await asyncio.gather(
+                *(self._fetch(ids, {"Authorization": auth} if auth else {})
+                  for auth, ids in by_auth.items())
+            )
+        for (auth, _), values in zip(by_auth.items(), fetched):
+            results.update({(auth, id): value for id, value in values.items()})
+        return results
+
+    async def _fetch(self, ids: List[str], headers: dict) -> Dict[str, object]:
+        if self.batch_param and len(ids) > 1:
+            try:
+                return await self._fetch_batch(ids, headers)
+            except (httpx.HTTPError, ValueError) as e:
+                return {id: e for id in ids}
+        return await self._fetch_each(ids, headers)
+
+    async def _fetch_batch(self, ids: List[str], headers: dict) -> Dict[str, object]:
+        response = await self.list({self.batch_param: ",".join(ids)}, headers)
+        response.raise_for_status()
+        found = {str(record.get("id")): record for record in response.json().get("data", [])}
+        return {id: found.get(id) for id in ids}
+
+    async def _fetch_each(self, ids: List[str], headers: dict) -> Dict[str, object]:
+        client = get_http_client()
+        limit = asyncio.Semaphore(self.fanout)
+
+        async def fetch_one(id: str):
+            async with limit:
+                try:
+                    response = await client.get(
+                        self.url(id), headers=headers, follow_redirects=True
+                    )
+                    if response.status_code == 404:
+                        return None
+                    response.raise_for_status()
+                    return response.json()
+                except (httpx.HTTPError, ValueError) as e:
+                    return e
+
+        values = await asyncio.gather(*(fetch_one(id) for id in ids))
+        return dict(zip(ids, values))
+
+
+class BreederClient(DownstreamClient):
+    name = "breeder"
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("batch_param", os.getenv("BREEDER_BATCH_PARAM") or None)
+        kwargs.setdefault("version_field", os.getenv("BREEDER_VERSION_FIELD") or None)
+        super().__init__(BREEDER_SERVICE_URL, **kwargs)
+
+
+class PetClient(DownstreamClient):
+    name = "pet"
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("batch_param", os.getenv("PET_BATCH_PARAM") or None)
+        kwargs.setdefault("version_field", os.getenv("PET_VERSION_FIELD") or None)
+        super().__init__(PET_SERVICE_URL, **kwargs)
+
+
+class CustomerClient(DownstreamClient):
+    name = "customer"
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("batch_param", os.getenv("CUSTOMER_BATCH_PARAM") or None)
+        kwargs.setdefault("version_field", os.getenv("CUSTOMER_VERSION_FIELD") or None)
+        super().__init__(CUSTOMER_SERVICE_URL, **kwargs)
+
+
+_clients: Dict[type, DownstreamClient] = {}
+_clients_loop = None
+
+
+def _client(cls) -> DownstreamClient:
+    """Per-process client, rebuilt when the running event loop changes"""
+    global _clients_loop
+    loop = asyncio.get_running_loop()
+    if _clients_loop is not loop:
+        _clients.clear()
+        _clients_loop = loop
+    if cls not in _clients:
+        _clients[cls] = cls()
+    return _clients[cls]
+
+
+def breeders() -> BreederClient:
+    return _client(BreederClient)
+
+
+def pets() -> PetClient:
+    return _client(PetClient)
+
+
+def customers() -> CustomerClient:
+    return _client(CustomerClient)
@@ -0,0 +1,284 @@
+"""Latency and fault injection for downstream dependencies.
+
+A scenario file describes, per dependency, how calls to it misbehave::
+
+    {
+      "name": "breeder-503s",
+      "seed": 7,
+      "services": {
+        "breeder": {"latency_ms": {"p50": 20, "p99": 150},
+                    "error_rate": 0.05, "error_status": 503},
+        "pet": {"latency_ms": {"p50": 40, "p99": 2000}},
+        "customer": {"reset_rate": 0.01,
+                     "slow_body": {"rate": 0.1, "bytes_per_second": 2048}},
+        "pubsub": {"latency_ms": 50}, "workflows": {...}, "lambda": {...}
+      }
+    }
+
+``latency_ms`` is a number (fixed), ``{"min", "max"}`` (uniform) or
+``{"p50", "p99"}`` (log-normal through both points). Errors answer with
+``error_status`` without calling the service, resets fail the call after the
+latency, and slow bodies trickle the real response at ``bytes_per_second``.
+HTTP services are named as in tracing (breeder, pet, customer); SDK calls use
+pubsub, workflows and lambda, where errors and resets raise instead. Latency on
+a blocking SDK call is only injected when the call runs off the event loop
+(e.g. through ``bulkhead.run_blocking``): sleeping on the loop would stall the
+whole worker, not just the slow call.
+
+Set ``FAULT_SCENARIO`` to a file path, or to the name of a scenario bundled in
+``app/scripts/scenarios``, to route every downstream call through it. Nothing
+is injected when it is unset. Everything runs offline.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+import httpx
+
+from app.api import metrics
+
+logger = logging.getLogger("composite-service")
+
+FAULT_SCENARIO = os.getenv("FAULT_SCENARIO")
+SCENARIO_DIR = Path(__file__).resolve().parent.parent / "scripts" / "scenarios"
+
+# z-score of the 99th percentile of a standard normal distribution
+_Z99 = 2.3263
+
+faults_injected_total = metrics.counter(
+    "faults_injected_total", "Injected faults, by service and fault"
+)
+
+
+class InjectedFault(Exception):
+    """An SDK call failed because the active scenario said so"""
+
+
+@dataclass
+class FaultProfile:
+    latency_ms: object = 0
+    error_rate: float = 0.0
+    error_status: int = 503
+    reset_rate: float = 0.0
+    slow_body: Dict[str, float] = field(default_factory=dict)
+
+    def latency(self, rng: random.Random) -> float:
+        """One latency sample in seconds"""
+        spec = self.latency_ms
+        if isinstance(spec, (int, float)):
+            ms = spec
+        elif "p50" in spec:
+            mu = math.log(max(spec["p50"], 1e-3))
+            sigma = max(0.0, (math.log(max(spec.get("p99", spec["p50"]), 1e-3)) - mu) / _Z99)
+            ms = rng.lognormvariate(mu, sigma)
+        else:
+            ms = rng.uniform(spec.get("min", 0), spec.get("max", spec.get("min", 0)))
+        return max(0.0, ms) / 1000
+
+
+@dataclass
+class Scenario:
+    name: str
+    services: Dict[str, FaultProfile]
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Scenario":
+        return cls(
+            name=data.get("name", "unnamed"),
+            services={
+                service: FaultProfile(**profile)
+                for service, profile in data.get("services", {}).items()
+            },
+            seed=data.get("seed"),
+        )
+
+    def profile(self, service: str) -> Optional[FaultProfile]:
+        return self.services.get(service)
+
+    def roll(self, rate: float) -> bool:
+        return rate > 0 and self.rng.random() < rate
+
+
+def load_scenario(name_or_path: str) -> Scenario:
+    path = Path(name_or_path)
+    if not path.exists():
+        path = SCENARIO_DIR / f"{name_or_path}.json"
+    with open(path) as f:
+        return Scenario.from_dict(json.load(f))
+
+
+@functools.lru_cache(maxsize=1)
+def active_scenario() -> Optional[Scenario]:
+    return load_scenario(FAULT_SCENARIO) if FAULT_SCENARIO else None
+
+
+# HTTP
+
+
+class _SlowStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, bytes_per_second: float):
+        self._stream = stream
+        self._bytes_per_second = bytes_per_second
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            await asyncio.sleep(len(chunk) / self._bytes_per_second)
+            yield chunk
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+class FaultInjectionTransport(httpx.AsyncBaseTransport):
+    """Applies the scenario's profile for each request's service.
+
+    Injected latency counts against the request's read timeout, so it trips
+    the same timeouts a slow service would.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        scenario: Scenario,
+        service_name: Callable[[httpx.URL], str],
+    ):
+        self._transport = transport
+        self.scenario = scenario
+        self.service_name = service_name
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        service = self.service_name(request.url)
+        profile = self.scenario.profile(service)
+        if profile is None:
+            return await self._transport.handle_async_request(request)
+
+        latency = profile.latency(self.scenario.rng)
+        read_timeout = request.extensions.get("timeout", {}).get("read")
+        if read_timeout is not None and latency > read_timeout:
+            await asyncio.sleep(read_timeout)
+            faults_injected_total.inc(service=service, fault="timeout")
+            raise httpx.ReadTimeout("Injected latency exceeded the timeout", request=request)
+        await asyncio.sleep(latency)
+
+        if self.scenario.roll(profile.reset_rate):
+            faults_injected_total.inc(service=service, fault="reset")
+            raise httpx.ReadError("Connection reset by peer (injected)", request=request)
+        if self.scenario.roll(profile.error_rate):
+            faults_injected_total.inc(service=service, fault="error")
+            return httpx.Response(
+                profile.error_status,
+                json={"detail": "Injected fault"},
+                request=request,
+            )
+
+        response = await self._transport.handle_async_request(request)
+        if profile.slow_body and self.scenario.roll(profile.slow_body.get("rate", 1.0)):
+            faults_injected_total.inc(service=service, fault="slow_body")
+            return httpx.Response(
+                response.status_code,
+                headers=response.headers,
+                stream=_SlowStream(
+                    response.stream, profile.slow_body.get("bytes_per_second", 1024)
+                ),
+                extensions=response.extensions,
+                request=request,
+            )
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+# SDK clients
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+_warned_on_loop = set()
+
+
+def _warn_on_loop(service: str, method: str):
+    if (service, method) not in _warned_on_loop:
+        _warned_on_loop.add((service, method))
+        logger.warning(
+            f"{service}.{method} is called on the event loop; "
+            "not injecting its latency, which would stall the worker"
+        )
+
+
+class _FaultInjectingProxy:
+    def __init__(self, target, scenario: Scenario, service: str, methods: Iterable[str]):
+        self._target = target
+        self._scenario = scenario
+        self._service = service
+        self._methods = set(methods)
+
+    def _fault(self) -> Optional[Exception]:
+        profile = self._scenario.profile(self._service)
+        if self._scenario.roll(profile.reset_rate):
+            faults_injected_total.inc(service=self._service, fault="reset")
+            return ConnectionResetError(f"{self._service}: connection reset (injected)")
+        if self._scenario.roll(profile.error_rate):
+            faults_injected_total.inc(service=self._service, fault="error")
+            return InjectedFault(f"{self._service}: injected {profile.error_status}")
+        return None
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if name not in self._methods:
+            return attribute
+        profile = self._scenario.profile(self._service)
+
+        if inspect.iscoroutinefunction(attribute):
+
+            @functools.wraps(attribute)
+            async def call_async(*args, **kwargs):
+                await asyncio.sleep(profile.latency(self._scenario.rng))
+                fault = self._fault()
+                if fault is not None:
+                    raise fault
+                return await attribute(*args, **kwargs)
+
+            return call_async
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            delay = profile.latency(self._scenario.rng)
+            if _on_event_loop():
+                _warn_on_loop(self._service, name)
+            else:
+                time.sleep(delay)
+            fault = self._fault()
+            if fault is not None:
+                raise fault
+            return attribute(*args, **kwargs)
+
+        return call
+
+
+def wrap(target, service: str, methods: Iterable[str]):
+    """``target`` with faults injected into ``methods`` when a scenario covers ``service``"""
+    scenario = active_scenario()
+    if scenario is None or scenario.profile(service) is None:
+        return target
+    return _FaultInjectingProxy(target, scenario, service, methods)
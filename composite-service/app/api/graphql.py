@@ -1,12 +1,20 @@
+import httpx
 import strawberry
+from fastapi import HTTPException
+from strawberry.extensions import ParserCache, ValidationCache
 from strawberry.types import Info
-from typing import List, Optional
-import httpx
+from typing import AsyncGenerator, List, Optional
+from urllib.parse import quote
+from app.api import downstream
+from app.api.auth import verify_jwt_token
+from app.api.graphql_cache import GRAPHQL_CACHE_SIZE, ResponseCache
+from app.api.waitlist import get_waitlist_hub
 from app.api.service import (
-    BREEDER_SERVICE_URL,
     PET_SERVICE_URL,
     CUSTOMER_SERVICE_URL,
+    get_http_client,
 )
+from app.api.tracing import get_correlation_id
 
 # Function to get the Authorization header
 def get_auth_headers(info: Info) -> dict:
@@ -14,6 +22,25 @@ def get_auth_headers(info: Info) -> dict:
     auth_header = info.context.get("request").headers.get("Authorization")
     if not auth_header:
         raise Exception("Authorization header is required.")
+    return {"Authorization": auth_header, "X-Correlation-ID": get_correlation_id()}
+
+
+def get_subscription_headers(info: Info) -> dict:
+    """Verified Authorization header for a WebSocket subscription.
+
+    Browsers cannot set headers on a WebSocket, so the access token may also
+    be passed as the ``token`` query parameter of the connection URL.
+    """
+    request = info.context.get("request")
+    auth_header = request.headers.get("Authorization")
+    if not auth_header and request.query_params.get("token"):
+        auth_header = f"Bearer {request.query_params['token']}"
+    if not auth_header or not auth_header.startswith("Bearer "):
+        raise Exception("Authorization header is required.")
+    try:
+        verify_jwt_token(auth_header.split(" ", 1)[1])
+    except HTTPException as e:
+        raise Exception(e.detail)
     return {"Authorization": auth_header}
 
 
@@ -32,6 +59,21 @@ class WaitlistEntry:
     breeder_id: str
 
 
+@strawberry.type
+class WaitlistDelta:
+    kind: str  # "added", "updated" or "removed"
+    entry: WaitlistEntry
+
+
+def to_waitlist_entry(entry: dict, breeder_id: str) -> WaitlistEntry:
+    return WaitlistEntry(
+        id=entry["id"],
+        consumer=Customer(id=entry["id"], name=entry["name"], email=entry["email"]),
+        pet_id=entry["pet_id"],
+        breeder_id=breeder_id,
+    )
+
+
 @strawberry.type
 class Pet:
     id: str
@@ -61,84 +103,105 @@ class Query:
     async def breeder_pets_with_waitlist(self, breeder_id: str, info: Info) -> Optional[Breeder]:
         headers = get_auth_headers(info)
 
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            # Fetch breeder information
-            breeder_response = await client.get(
-                f"{BREEDER_SERVICE_URL}/{breeder_id}/", headers=headers
+        client = get_http_client()
+        # Fetch breeder information, batched with concurrent dashboards
+        try:
+            breeder_data = await downstream.breeders().get(breeder_id, headers)
+        except httpx.HTTPError:
+            breeder_data = None
+        if breeder_data is None:
+            raise Exception("Breeder not found")
+
+        # Fetch all pets and filter by breeder_id
+        pets_response = await client.get(
+            f"{PET_SERVICE_URL}/", headers=headers, follow_redirects=True
+        )
+        try:
+            pets_response_data = pets_response.json()
+            pets_data = [
+                pet
+                for pet in pets_response_data.get("data", [])
+                if pet.get("breeder_id") == breeder_id
+            ]
+        except ValueError:
+            raise Exception(
+                f"Invalid JSON response from pet service: {pets_response.text}"
             )
-            if breeder_response.status_code != 200:
-                raise Exception("Breeder not found")
-            breeder_data = breeder_response.json()
-
-            # Fetch all pets and filter by breeder_id
-            pets_response = await client.get(f"{PET_SERVICE_URL}/", headers=headers)
-            try:
-                pets_response_data = pets_response.json()
-                pets_data = [
-                    pet
-                    for pet in pets_response_data.get("data", [])
-                    if pet.get("breeder_id") == breeder_id
-                ]
-            except ValueError:
-                raise Exception(
-                    f"Invalid JSON response from pet service: {pets_response.text}"
-                )
-
-            # Fetch waitlist data for the breeder
-            waitlist_response = await client.get(
-                f"{CUSTOMER_SERVICE_URL}/breeder/{breeder_id}/waitlist", headers=headers
+
+        # Fetch waitlist data for the breeder
+        waitlist_response = await client.get(
+            f"{CUSTOMER_SERVICE_URL}/breeder/{quote(breeder_id, safe='')}/waitlist",
+            headers=headers,
+            follow_redirects=True,
+        )
+        try:
+            waitlist_data = waitlist_response.json()
+            if not isinstance(waitlist_data, list):
+                raise Exception(f"Unexpected waitlist data format: {waitlist_data}")
+        except ValueError:
+            raise Exception(
+                f"Invalid JSON response from waitlist service: {waitlist_response.text}"
             )
-            try:
-                waitlist_data = waitlist_response.json()
-                if not isinstance(waitlist_data, list):
-                    raise Exception(f"Unexpected waitlist data format: {waitlist_data}")
-            except ValueError:
-                raise Exception(
-                    f"Invalid JSON response from waitlist service: {waitlist_response.text}"
-                )
-
-            # Map waitlist entries to pets
-            pet_waitlists = {pet["id"]: [] for pet in pets_data}  # Initialize waitlist for each pet
-            for entry in waitlist_data:
-                pet_id = entry.get("pet_id")
-                if pet_id and pet_id in pet_waitlists:
-                    pet_waitlists[pet_id].append(
-                        WaitlistEntry(
-                            id=entry["id"],
-                            consumer=Customer(
-                                id=entry["id"], name=entry["name"], email=entry["email"]
-                            ),
-                            pet_id=pet_id,
-                            breeder_id=breeder_id,
-                        )
-                    )
-
-            # Build pet data with waitlist
-            pets_with_waitlist = [
-                Pet(
-                    id=pet["id"],
-                    name=pet["name"],
-                    type=pet["type"],
-                    price=pet.get("price"),
-                    image_url=pet.get("image_url"),
-                    breeder_id=pet["breeder_id"],
-                    waitlist=pet_waitlists.get(pet["id"], []),
-                )
-                for pet in pets_data
-            ]
 
-            # Return breeder with pets and waitlist
-            return Breeder(
-                id=breeder_data["id"],
-                name=breeder_data["name"],
-                email=breeder_data["email"],
-                breeder_city=breeder_data["breeder_city"],
-                breeder_country=breeder_data["breeder_country"],
-                price_level=breeder_data.get("price_level"),
-                breeder_address=breeder_data.get("breeder_address"),
-                pets=pets_with_waitlist,
+        # Map waitlist entries to pets
+        pet_waitlists = {pet["id"]: [] for pet in pets_data}  # Initialize waitlist for each pet
+        for entry in waitlist_data:
+            pet_id = entry.get("pet_id")
+            if pet_id and pet_id in pet_waitlists:
+                pet_waitlists[pet_id].append(to_waitlist_entry(entry, breeder_id))
+
+        # Build pet data with waitlist
+        pets_with_waitlist = [
+            Pet(
+                id=pet["id"],
+                name=pet["name"],
+                type=pet["type"],
+                price=pet.get("price"),
+                image_url=pet.get("image_url"),
+                breeder_id=pet["breeder_id"],
+                waitlist=pet_waitlists.get(pet["id"], []),
             )
+            for pet in pets_data
+        ]
+
+        # Return breeder with pets and waitlist
+        return Breeder(
+            id=breeder_data["id"],
+            name=breeder_data["name"],
+            email=breeder_data["email"],
+            breeder_city=breeder_data["breeder_city"],
+            breeder_country=breeder_data["breeder_country"],
+            price_level=breeder_data.get("price_level"),
+            breeder_address=breeder_data.get("breeder_address"),
+            pets=pets_with_waitlist,
+        )
 
 
-schema = strawberry.Schema(Query)
+@strawberry.type
+class Subscription:
+    @strawberry.subscription
+    async def waitlist_changes(
+        self, breeder_id: str, info: Info
+    ) -> AsyncGenerator[WaitlistDelta, None]:
+        """Waitlist entries added, updated or removed for a breeder from now on.
+
+        Load the current state with ``breederPetsWithWaitlist`` first, then
+        apply these deltas instead of polling the query.
+        """
+        headers = get_subscription_headers(info)
+        async for change in get_waitlist_hub().subscribe(breeder_id, headers):
+            yield WaitlistDelta(
+                kind=change.kind, entry=to_waitlist_entry(change.entry, breeder_id)
+            )
+
+
+schema = strawberry.Schema(
+    Query,
+    subscription=Subscription,
+    extensions=[
+        ParserCache(maxsize=GRAPHQL_CACHE_SIZE),
+        ValidationCache(maxsize=GRAPHQL_CACHE_SIZE),
+        ResponseCache,
+    ],
+)
 
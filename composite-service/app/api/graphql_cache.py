@@ -0,0 +1,136 @@
+"""GraphQL response cache driven by per-type cache hints.
+
+Every object field in a query has a max age: its ``"Type.field"`` hint, else
+the hint of the type it returns, else ``DEFAULT_MAX_AGE``. A query result is
+cached for the smallest max age in its selection, keyed by the query text,
+variables, operation name and the caller's tokenId, and the response carries
+the matching ``Cache-Control`` header. Results with errors are never cached.
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from graphql import ExecutionResult as GraphQLExecutionResult
+from graphql import TypeInfo, TypeInfoVisitor, Visitor, get_named_type, is_composite_type, visit
+from strawberry.extensions import Extension
+from strawberry.types.graphql import OperationType
+
+from app.api.auth import verify_jwt_token
+from app.api.cache import LRUCache, cache_requests_total
+
+GRAPHQL_CACHE_ENABLED = os.getenv("GRAPHQL_CACHE_ENABLED", "true").lower() == "true"
+GRAPHQL_CACHE_SIZE = int(os.getenv("GRAPHQL_CACHE_SIZE", "1024"))
+# Seconds, by type or by "Type.field" for fields that change faster than their type
+CACHE_HINTS: Dict[str, float] = {
+    "Breeder": 300,
+    "Pet": 300,
+    "Customer": 300,
+    "WaitlistEntry": 10,
+    "Pet.waitlist": 10,
+}
+DEFAULT_MAX_AGE = 0
+
+responses = LRUCache(GRAPHQL_CACHE_SIZE)
+# Max age per (query, operation name); parsing hints out of a document once
+_max_ages = LRUCache(GRAPHQL_CACHE_SIZE)
+
+
+class _HintVisitor(Visitor):
+    def __init__(self, type_info: TypeInfo):
+        super().__init__()
+        self.type_info = type_info
+        self.max_age: Optional[float] = None
+
+    def enter_field(self, node, *_):
+        parent_type = self.type_info.get_parent_type()
+        field_type = self.type_info.get_type()
+        if parent_type is None or field_type is None:
+            return
+        hint = CACHE_HINTS.get(f"{parent_type.name}.{node.name.value}")
+        named_type = get_named_type(field_type)
+        if hint is None and is_composite_type(named_type):
+            hint = CACHE_HINTS.get(named_type.name, DEFAULT_MAX_AGE)
+        if hint is not None:
+            self.max_age = hint if self.max_age is None else min(self.max_age, hint)
+
+
+def selection_max_age(schema, document) -> float:
+    """Smallest cache hint among the fields ``document`` selects"""
+    type_info = TypeInfo(schema)
+    visitor = _HintVisitor(type_info)
+    visit(document, TypeInfoVisitor(type_info, visitor))
+    return DEFAULT_MAX_AGE if visitor.max_age is None else visitor.max_age
+
+
+def auth_scope(request) -> Optional[str]:
+    """tokenId of the caller, or None when the request cannot be cached"""
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return None
+    try:
+        return verify_jwt_token(auth_header.split(" ", 1)[1])["tokenId"]
+    except HTTPException:
+        return None
+
+
+class ResponseCache(Extension):
+    """Serves repeated queries from ``responses`` and sets ``Cache-Control``"""
+
+    key = None
+    max_age = DEFAULT_MAX_AGE
+
+    def on_executing_start(self):
+        context = self.execution_context
+        if not GRAPHQL_CACHE_ENABLED or context.operation_type != OperationType.QUERY:
+            return
+        request = context.context.get("request")
+        scope = auth_scope(request) if request is not None else None
+        if scope is None:
+            return
+
+        hint_key = (context.query, context.operation_name)
+        entry = _max_ages.get(hint_key)
+        if entry is None:
+            entry = _max_ages.set(
+                hint_key, selection_max_age(context.schema._schema, context.graphql_document)
+            )
+        self.max_age = entry.value
+        if self.max_age <= 0:
+            return
+
+        self.key = (
+            scope,
+            context.operation_name,
+            context.query,
+            json.dumps(context.variables, sort_keys=True, default=str),
+        )
+        cached = responses.get(self.key)
+        if cached is not None and cached.age < self.max_age:
+            cache_requests_total.inc(cache="graphql", result="hit")
+            context.result = GraphQLExecutionResult(data=cached.value)
+            self._set_headers(self.max_age - cached.age, "hit")
+            self.key = None  # nothing to store
+            return
+        cache_requests_total.inc(cache="graphql", result="miss")
+
+    def on_executing_end(self):
+        if self.key is None:
+            return
+        result = self.execution_context.result
+        if result is not None and not result.errors:
+            responses.set(self.key, result.data)
+            self._set_headers(self.max_age, "miss")
+        else:
+            self._set_headers(0, "miss")
+
+    def _set_headers(self, max_age: float, result: str):
+        response = self.execution_context.context.get("response")
+        if response is None:
+            return
+        # Results depend on the caller's token, so shared caches must not keep them
+        response.headers["Cache-Control"] = (
+            f"private, max-age={int(max_age)}" if int(max_age) > 0 else "no-store"
+        )
+        response.headers["X-Cache"] = result
@@ -0,0 +1,105 @@
+"""Minimal in-process metrics rendered in the Prometheus text format.
+
+Metrics are per worker; scrape each worker (or sum in the query) as usual for
+multi-process gunicorn deployments.
+"""
+
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[Labels, float] = defaultdict(float)
+
+    def samples(self) -> Iterable[Tuple[Labels, float]]:
+        return self.values.items()
+
+    def get(self, **labels) -> float:
+        return self.values.get(_labels(labels), 0.0)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        self.values[_labels(labels)] += amount
+
+
+class Gauge(Metric):
+    """Set directly, or computed at scrape time from ``callback``"""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        callback: Optional[Callable[[], Dict[Labels, float]]] = None,
+    ):
+        super().__init__(name, help)
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        self.values[_labels(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        self.values[_labels(labels)] += amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.values[_labels(labels)] -= amount
+
+    def samples(self):
+        if self.callback is not None:
+            return self.callback().items()
+        return self.values.items()
+
+
+_registry: Dict[str, Metric] = {}
+
+
+def _register(metric: Metric) -> Metric:
+    return _registry.setdefault(metric.name, metric)
+
+
+def counter(name: str, help: str) -> Counter:
+    return _register(Counter(name, help))
+
+
+def gauge(name: str, help: str, callback=None) -> Gauge:
+    return _register(Gauge(name, help, callback))
+
+
+def labels(**values) -> Labels:
+    """Label key for gauge callbacks"""
+    return _labels(values)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _registry.values():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for sample_labels, value in metric.samples():
+            lines.append(f"{metric.name}{_format_labels(sample_labels)} {value:g}")
+    return "\n".join(lines) + "\n"
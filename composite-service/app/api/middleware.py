@@ -6,18 +6,16 @@ import uuid
 from fastapi import Request
 from fastapi.exceptions import HTTPException
 from app.api.auth import verify_jwt_token
-from contextvars import ContextVar
+from app.api.tracing import (
+    correlation_id,
+    get_correlation_id,
+    parse_traceparent,
+    start_span,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("composite-service")
 
-correlation_id = ContextVar("correlation_id", default=None)
-
-
-def get_correlation_id() -> str:
-    """Helper function to get current correlation ID"""
-    return correlation_id.get()
-
 
 class LoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
@@ -32,8 +30,17 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 
         start_time = time.time()
 
-        # Process request
-        response = await call_next(request)
+        # Process request inside a server span continuing any inbound trace
+        with start_span(
+            f"{request.method} {request.url.path}",
+            kind="server",
+            parent=parse_traceparent(request.headers.get("traceparent")),
+            **{"http.method": request.method, "correlation_id": cor_id},
+        ) as span:
+            response = await call_next(request)
+            span.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.status = "error"
 
         # Log response details with correlation ID and timing
         process_time = time.time() - start_time
@@ -41,8 +48,9 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             f"[{cor_id}] Request completed in {process_time:.4f} seconds with status code {response.status_code}"
         )
 
-        # Add correlation ID to response headers
+        # Add correlation and trace IDs to response headers
         response.headers["X-Correlation-ID"] = cor_id
+        response.headers["X-Trace-ID"] = span.trace_id
 
         return response
 
@@ -78,8 +86,11 @@ class JWTMiddleware(BaseHTTPMiddleware):
             token = auth_header.split("Bearer ")[1]
 
             # Validate the token using the custom function
-            if not verify_jwt_token(token):
+            payload = verify_jwt_token(token)
+            if not payload:
                 raise HTTPException(status_code=401, detail="Invalid or expired token")
+            # Verified claims for admission control and route handlers
+            request.state.user = payload
 
             # Proceed to the next middleware or route handler
             response = await call_next(request)
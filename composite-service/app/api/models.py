@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 # Model to represent a hypermedia link
@@ -64,6 +64,41 @@ class CompositeOut(BaseModel):
     links: Optional[List[Link]] = None
 
 
+class WaitlistEntryOut(BaseModel):
+    id: str
+    name: Optional[str] = None
+    email: Optional[str] = None
+    pet_id: Optional[str] = None
+    breeder_id: Optional[str] = None
+
+
+class BreederCompositeOut(BaseModel):
+    """One breeder with its pets, and its waitlist when expanded"""
+
+    breeder: BreederOut
+    pets: List[PetOut]
+    waitlist: Optional[List[WaitlistEntryOut]] = None
+    links: Optional[List[Link]] = None
+
+
+class SectionStatus(BaseModel):
+    status: str  # "ok" | "error" | "timeout"
+    stale: bool = False
+    age_seconds: Optional[float] = None
+    elapsed_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+class PartialCompositeOut(BaseModel):
+    """Composite read in degraded mode: failed sections are null or stale"""
+
+    breeders: Optional[BreederListResponse] = None
+    pets: Optional[PetListResponse] = None
+    links: Optional[List[Link]] = None
+    partial: bool = False
+    sections: Dict[str, SectionStatus]
+
+
 class CompositeFilterParams(BaseModel):
     breeder_limit: Optional[int] = None
     breeder_offset: Optional[int] = None
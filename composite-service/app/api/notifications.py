@@ -0,0 +1,263 @@
+"""Waitlist email notifications, batched per breeder.
+
+With ``NOTIFY_BATCH_WINDOW_MS`` set, webhook events for the same breeder are
+held and sent as one Lambda invocation once no new event has arrived for the
+window, once the first event has waited ``NOTIFY_MAX_DELAY_MS``, or as soon
+as the batch reaches ``NOTIFY_MAX_BATCH`` events or ``NOTIFY_MAX_BYTES`` of
+JSON. A batch of one is sent in the original single-email body; larger ones
+as::
+
+    {"breeder_email": "...", "notifications": [
+        {"customer_name": "...", "customer_email": "...", "pet_name": "...",
+         "pet_id": "...", "correlation_id": "..."}, ...]}
+
+Batches are held in memory per worker and sent on shutdown; events still
+waiting when a worker dies are lost. With the window at 0 (the default) each
+event is sent right away, as before. The transport is pluggable
+(``NOTIFY_TRANSPORT``), with an in-memory implementation for tests and local
+runs.
+"""
+
+import abc
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from app.api import bulkhead, metrics, sdk
+from app.api.middleware import get_correlation_id
+from app.api.tracing import propagation_headers, start_span
+
+logger = logging.getLogger("composite-service")
+
+NOTIFY_TRANSPORT = os.getenv("NOTIFY_TRANSPORT", "lambda")
+NOTIFY_BATCH_WINDOW_MS = float(os.getenv("NOTIFY_BATCH_WINDOW_MS", "0"))
+NOTIFY_MAX_DELAY_MS = float(os.getenv("NOTIFY_MAX_DELAY_MS", "30000"))
+NOTIFY_MAX_BATCH = int(os.getenv("NOTIFY_MAX_BATCH", "50"))
+NOTIFY_MAX_BYTES = int(os.getenv("NOTIFY_MAX_BYTES", str(256 * 1024)))
+LAMBDA_FUNCTION_NAME = os.getenv("LAMBDA_FUNCTION_NAME", "SendEmailFunction")
+
+notifications_total = metrics.counter(
+    "notifications_total",
+    "Waitlist notifications by outcome (queued, sent or failed)",
+)
+notification_batches_total = metrics.counter(
+    "notification_batches_total", "Notification sends by outcome (sent or failed)"
+)
+
+
+# Transports
+
+
+class NotificationTransport(abc.ABC):
+    @abc.abstractmethod
+    async def send(self, body: dict) -> dict:
+        """Send one email body; the handler's response, or a failure dict"""
+
+
+class LambdaTransport(NotificationTransport):
+    """Synchronous invocation of the email Lambda (see app.api.sdk), run in a
+    worker thread"""
+
+    def __init__(self, function_name: str = LAMBDA_FUNCTION_NAME):
+        self.function_name = function_name
+
+    def _invoke(self, client, payload: str) -> dict:
+        response = client.invoke(
+            FunctionName=self.function_name,
+            InvocationType="RequestResponse",
+            Payload=payload,
+        )
+        # The payload is a stream; read it in the thread too
+        return {**response, "Payload": response["Payload"].read()}
+
+    async def send(self, body: dict) -> dict:
+        try:
+            with start_span(
+                "lambda.invoke", kind="client", function_name=self.function_name
+            ) as span:
+                # The Lambda handler expects the email data as a JSON string
+                # under "body"; trace context travels next to it for its logs
+                payload = {"body": json.dumps(body)}
+                payload.update(propagation_headers(span))
+
+                # boto3 blocks for the whole round trip; keep it off the loop,
+                # once the Lambda bulkhead has a slot for it
+                response = await bulkhead.run_blocking(
+                    "lambda", self._invoke, sdk.lambda_client(), json.dumps(payload)
+                )
+
+                response_payload = json.loads(response["Payload"])
+                span.set_attribute("lambda.status_code", response_payload.get("statusCode"))
+                if response_payload.get("statusCode") != 200:
+                    span.status = "error"
+
+            if response_payload.get("statusCode") != 200:
+                return {
+                    "status": "failure",
+                    "message": "Lambda function invocation failed",
+                    "details": response_payload.get("body", "Unknown error"),
+                }
+            return response_payload
+        except Exception as e:
+            return {
+                "status": "failure",
+                "message": "Error invoking Lambda function",
+                "details": str(e),
+            }
+
+
+class InMemoryTransport(NotificationTransport):
+    """Records every body it is given and reports it sent"""
+
+    def __init__(self):
+        self.sent: List[dict] = []
+
+    async def send(self, body: dict) -> dict:
+        self.sent.append(body)
+        return {"statusCode": 200, "body": "Email sent"}
+
+
+def build_transport(kind: str = NOTIFY_TRANSPORT) -> NotificationTransport:
+    if kind == "lambda":
+        return LambdaTransport()
+    if kind == "memory":
+        return InMemoryTransport()
+    raise ValueError(f"Unknown notification transport: {kind}")
+
+
+def _sent(result: dict) -> bool:
+    return result.get("statusCode") == 200
+
+
+# Batching
+
+
+@dataclass
+class _Batch:
+    first_at: float
+    events: List[dict] = field(default_factory=list)
+    size: int = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class NotificationAggregator:
+    def __init__(
+        self,
+        transport: NotificationTransport,
+        window: float = NOTIFY_BATCH_WINDOW_MS / 1000,
+        max_delay: float = NOTIFY_MAX_DELAY_MS / 1000,
+        max_batch: int = NOTIFY_MAX_BATCH,
+        max_bytes: int = NOTIFY_MAX_BYTES,
+    ):
+        self.transport = transport
+        self.window = window
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.max_bytes = max_bytes
+        self._pending: Dict[str, _Batch] = {}
+        self._sending: Set[asyncio.Task] = set()
+
+    async def notify(self, breeder_id: str, email_data: dict) -> dict:
+        """Send ``email_data`` now, or queue it with the breeder's batch"""
+        if self.window <= 0:
+            result = await self.transport.send(email_data)
+            notifications_total.inc(outcome="sent" if _sent(result) else "failed")
+            return result
+
+        event = {**email_data, "correlation_id": get_correlation_id()}
+        size = len(json.dumps(event))
+        batch = self._pending.get(breeder_id)
+        if batch is not None and batch.size + size > self.max_bytes:
+            self._flush(breeder_id)
+            batch = None
+        now = time.monotonic()
+        if batch is None:
+            batch = self._pending[breeder_id] = _Batch(first_at=now)
+        batch.events.append(event)
+        batch.size += size
+        notifications_total.inc(outcome="queued")
+        pending = len(batch.events)
+
+        if pending >= self.max_batch or batch.size >= self.max_bytes:
+            self._flush(breeder_id)
+        else:
+            if batch.timer is not None:
+                batch.timer.cancel()
+            delay = max(0.0, min(self.window, batch.first_at + self.max_delay - now))
+            # The batch is not part of the request that happened to start the
+            # timer: no trace parent, no deadline
+            batch.timer = asyncio.get_running_loop().call_later(
+                delay, self._flush, breeder_id, context=contextvars.Context()
+            )
+        return {"status": "queued", "pending": pending}
+
+    def _flush(self, breeder_id: str):
+        batch = self._pending.pop(breeder_id, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(
+            self._send(breeder_id, batch.events), context=contextvars.Context()
+        )
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, breeder_id: str, events: List[dict]):
+        if len(events) == 1:
+            body = {k: v for k, v in events[0].items() if k != "correlation_id"}
+        else:
+            body = {
+                "breeder_email": events[-1]["breeder_email"],
+                "notifications": [
+                    {k: v for k, v in event.items() if k != "breeder_email"}
+                    for event in events
+                ],
+            }
+        with start_span(
+            "notifications.flush", breeder_id=breeder_id, batch_size=len(events)
+        ) as span:
+            result = await self.transport.send(body)
+            if not _sent(result):
+                span.status = "error"
+        outcome = "sent" if _sent(result) else "failed"
+        notification_batches_total.inc(outcome=outcome)
+        notifications_total.inc(len(events), outcome=outcome)
+        if outcome == "failed":
+            logger.error(
+                f"Sending {len(events)} notification(s) for breeder {breeder_id} "
+                f"failed: {result.get('details')}"
+            )
+
+    async def close(self):
+        """Send every waiting batch and wait for the sends to finish"""
+        for breeder_id in list(self._pending):
+            self._flush(breeder_id)
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+
+_notifier: Optional[NotificationAggregator] = None
+_notifier_loop = None
+
+
+def get_notifier() -> NotificationAggregator:
+    """Per-process aggregator, rebuilt when the running event loop changes"""
+    global _notifier, _notifier_loop
+    loop = asyncio.get_running_loop()
+    if _notifier is None or _notifier_loop is not loop:
+        _notifier = NotificationAggregator(build_transport())
+        _notifier_loop = loop
+    return _notifier
+
+
+async def close_notifier():
+    global _notifier, _notifier_loop
+    if _notifier is not None:
+        await _notifier.close()
+    _notifier = None
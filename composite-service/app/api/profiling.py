@@ -0,0 +1,343 @@
+"""On-demand CPU and allocation profiling for a single worker.
+
+Nothing here runs unless it is asked for: the sampling profiler and
+tracemalloc are started by admin routes (or SIGUSR2), and the per-request
+middleware is only installed when ``PROFILING_ENABLED`` is set.
+
+A request is profiled when it carries a ``PROFILE_HEADER`` signed with
+``PROFILING_SECRET`` for its method and path. Each signed value works once:
+its nonce is claimed in a SQLite file (``PROFILE_NONCE_DB``) shared by the
+workers on the host, and it expires within ``PROFILE_HEADER_MAX_TTL``.
+"""
+
+import asyncio
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import closing
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+logger = logging.getLogger("composite-service")
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_SECRET = os.getenv("PROFILING_SECRET")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/composite-profiles")
+PROFILE_SIGNAL_SECONDS = float(os.getenv("PROFILE_SIGNAL_SECONDS", "30"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+PROFILE_HEADER = "X-Profile-Request"
+PROFILE_HEADER_MAX_TTL = int(os.getenv("PROFILE_HEADER_MAX_TTL", "300"))
+PROFILE_NONCE_DB = os.getenv("PROFILE_NONCE_DB", "/tmp/composite-profile-nonces.db")
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+# Sampling CPU profiler
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples thread stacks from a background thread at a fixed interval"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, interval: float = 0.01, all_threads: bool = False):
+        self.interval = interval
+        self.all_threads = all_threads
+        self.target_thread = threading.main_thread().ident
+        self.samples: Dict[tuple, int] = defaultdict(int)
+        self.sample_count = 0
+        self.started: Optional[float] = None
+        self.duration = 0.0
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or (not self.all_threads and thread_id != self.target_thread):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.samples[tuple(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def run(self, seconds: float):
+        """Sample for ``seconds``; blocks the calling (non-event-loop) thread"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A CPU profile is already running in this worker")
+        try:
+            self.started = time.time()
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                self._sample()
+                time.sleep(self.interval)
+            self.duration = time.time() - self.started
+        finally:
+            self._lock.release()
+        return self
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, one stack per line"""
+        return "\n".join(
+            f"{';'.join(stack)} {count}"
+            for stack, count in sorted(self.samples.items(), key=lambda i: -i[1])
+        )
+
+    def speedscope(self) -> dict:
+        """speedscope.app 'sampled' profile"""
+        frames: List[dict] = []
+        index: Dict[str, int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            indexes = []
+            for name in stack:
+                if name not in index:
+                    index[name] = len(frames)
+                    frames.append({"name": name})
+                indexes.append(index[name])
+            samples.append(indexes)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": f"composite-service pid {os.getpid()}",
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.duration,
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "name": f"composite-service pid {os.getpid()}",
+            "exporter": "composite-service",
+        }
+
+
+# Signal hook for gunicorn/uvicorn workers
+
+
+def _profile_to_file(seconds: float):
+    try:
+        profiler = SamplingProfiler().run(seconds)
+    except ProfilerBusy as e:
+        logger.warning(str(e))
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"cpu-{os.getpid()}-{int(profiler.started)}.speedscope.json")
+    with open(path, "w") as f:
+        json.dump(profiler.speedscope(), f)
+    logger.info(f"CPU profile written to {path}")
+
+
+def install_signal_handler(signum: int = signal.SIGUSR2):
+    """`kill -USR2 <worker pid>` writes a CPU profile of that worker to PROFILE_DIR"""
+
+    def handler(*args):
+        threading.Thread(
+            target=_profile_to_file, args=(PROFILE_SIGNAL_SECONDS,), daemon=True
+        ).start()
+
+    signal.signal(signum, handler)
+
+
+# Signed per-request profiling
+
+
+def _profile_digest(method: str, path: str, expires: int, nonce: str, secret: str) -> str:
+    message = f"{method.upper()}\n{path}\n{expires}\n{nonce}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def sign_profile_request(
+    method: str, path: str, expires: int, secret: str = None, nonce: str = None
+) -> str:
+    """Header value that enables profiling of one ``method path`` request until ``expires``"""
+    secret = secret or PROFILING_SECRET
+    nonce = nonce or uuid.uuid4().hex
+    return f"{expires}.{nonce}.{_profile_digest(method, path, expires, nonce, secret)}"
+
+
+def verify_profile_request(
+    value: Optional[str], method: str, path: str, secret: str = None
+) -> bool:
+    """Signature and expiry only; ``claim_profile_request`` makes it single-use"""
+    secret = secret or PROFILING_SECRET
+    if not value or not secret:
+        return False
+    try:
+        expires, nonce, digest = value.split(".")
+        expires = int(expires)
+    except ValueError:
+        return False
+    if not time.time() <= expires <= time.time() + PROFILE_HEADER_MAX_TTL:
+        return False
+    return hmac.compare_digest(digest, _profile_digest(method, path, expires, nonce, secret))
+
+
+def claim_profile_request(value: str) -> bool:
+    """Record a verified value's nonce; False if any worker has seen it before"""
+    expires, nonce, _ = value.split(".")
+    now = time.time()
+    try:
+        with closing(sqlite3.connect(PROFILE_NONCE_DB, timeout=1, isolation_level=None)) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS nonces"
+                " (nonce TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+            )
+            # Expired values are refused anyway, so their nonces can go
+            conn.execute("DELETE FROM nonces WHERE expires_at < ?", (now,))
+            conn.execute("INSERT INTO nonces VALUES (?, ?)", (nonce, int(expires)))
+    except sqlite3.IntegrityError:
+        logger.warning("Refused a replayed profiling header")
+        return False
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Could not record profiling header nonce: {e}")
+        return False
+    return True
+
+
+request_profiles: "OrderedDict[str, dict]" = OrderedDict()
+_request_profile_lock = threading.Lock()
+
+
+def _store_request_profile(profile_id: str, route: str, profiler: cProfile.Profile, elapsed: float):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(50)
+    request_profiles[profile_id] = {
+        "id": profile_id,
+        "route": route,
+        "elapsed_ms": elapsed * 1000,
+        "created": time.time(),
+        "stats": out.getvalue(),
+    }
+    while len(request_profiles) > PROFILE_KEEP:
+        request_profiles.popitem(last=False)
+
+
+# Allocation tracking
+
+
+route_allocations: Dict[str, Dict[str, int]] = defaultdict(
+    lambda: {"requests": 0, "net_bytes": 0}
+)
+_baseline: Optional[tracemalloc.Snapshot] = None
+
+
+def start_allocation_tracking(frames: int = 10):
+    global _baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    route_allocations.clear()
+    _baseline = tracemalloc.take_snapshot()
+
+
+def stop_allocation_tracking():
+    global _baseline
+    tracemalloc.stop()
+    _baseline = None
+
+
+def allocation_diff(limit: int = 25) -> dict:
+    """Top allocation growth since tracking started, plus per-route net growth"""
+    if not tracemalloc.is_tracing() or _baseline is None:
+        return {"tracing": False}
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    )
+    stats = snapshot.compare_to(_baseline, "lineno")[:limit]
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "current_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {
+                "location": str(stat.traceback),
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+                "size": stat.size,
+            }
+            for stat in stats
+        ],
+        "routes": sorted(
+            ({"route": route, **data} for route, data in route_allocations.items()),
+            key=lambda r: -r["net_bytes"],
+        ),
+    }
+
+
+def _route_name(request: Request) -> str:
+    route = request.scope.get("route")
+    return f"{request.method} {getattr(route, 'path', request.url.path)}"
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """Per-request cProfile (signed header) and per-route allocation growth.
+
+    Only installed when PROFILING_ENABLED is set, so it costs nothing otherwise.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        value = request.headers.get(PROFILE_HEADER)
+        profile = verify_profile_request(
+            value, request.method, request.url.path
+        ) and await asyncio.to_thread(claim_profile_request, value)
+        tracing_allocations = tracemalloc.is_tracing()
+
+        if not profile and not tracing_allocations:
+            return await call_next(request)
+
+        before = tracemalloc.get_traced_memory()[0] if tracing_allocations else 0
+        profiler = None
+        # cProfile covers the whole thread, so only one request at a time
+        if profile and _request_profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _request_profile_lock.release()
+
+        if profiler is not None:
+            profile_id = uuid.uuid4().hex
+            _store_request_profile(
+                profile_id, _route_name(request), profiler, time.perf_counter() - started
+            )
+            response.headers["X-Profile-Id"] = profile_id
+
+        if tracing_allocations and tracemalloc.is_tracing():
+            stats = route_allocations[_route_name(request)]
+            stats["requests"] += 1
+            stats["net_bytes"] += tracemalloc.get_traced_memory()[0] - before
+
+        return response
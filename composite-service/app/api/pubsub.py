@@ -0,0 +1,381 @@
+"""Breeder lookups over the Pub/Sub request/reply channel.
+
+Request message, published to ``REQUEST_TOPIC``::
+
+    {"correlation_id": "...", "breeder_id": "b1"}                single id
+    {"correlation_id": "...", "breeder_ids": ["b1", "b2", ...]}  batch
+
+The breeder service answers on ``RESPONSE_SUBSCRIPTION_NAME`` with one reply
+per requested id::
+
+    {"correlation_id": "...", "breeder_id": "b1", "breeder_data": {...} | null}
+
+Concurrent single-id lookups are micro-batched into one request message, and
+one pull loop per worker dispatches replies to whichever batch is waiting for
+them. Replies addressed to another worker sharing the subscription are nacked
+so they are redelivered immediately. The transport is pluggable
+(``PUBSUB_TRANSPORT``), with an in-memory implementation for tests and local
+runs.
+"""
+
+import abc
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from app.api import bulkhead, deadline, faults, sdk
+from app.api.batching import MicroBatcher
+from app.api.tracing import propagation_headers, start_span
+
+logger = logging.getLogger("composite-service")
+
+PUBSUB_TRANSPORT = os.getenv("PUBSUB_TRANSPORT", "google")
+PUBSUB_BATCH_WINDOW_MS = float(os.getenv("PUBSUB_BATCH_WINDOW_MS", "5"))
+PUBSUB_MAX_BATCH = int(os.getenv("PUBSUB_MAX_BATCH", "100"))
+PUBSUB_REPLY_TIMEOUT = float(os.getenv("PUBSUB_REPLY_TIMEOUT", "30"))
+PUBSUB_POLL_INTERVAL = float(os.getenv("PUBSUB_POLL_INTERVAL", "0.05"))
+PUBSUB_PULL_MAX_MESSAGES = 100
+
+
+class ReplyTimeout(Exception):
+    """No reply arrived for a breeder id before the timeout"""
+
+
+@dataclass
+class ReceivedMessage:
+    ack_id: str
+    data: bytes
+    publish_time: Optional[float] = None  # epoch seconds, when known
+
+
+# Transports
+
+
+class PubSubTransport(abc.ABC):
+    @abc.abstractmethod
+    async def publish(self, data: bytes, attributes: Dict[str, str]) -> str:
+        """Publish a request message; its message id"""
+
+    @abc.abstractmethod
+    async def pull(self, max_messages: int) -> List[ReceivedMessage]:
+        """Wait for replies and return at most ``max_messages`` of them"""
+
+    @abc.abstractmethod
+    async def acknowledge(self, ack_ids: List[str]):
+        """Remove messages from the subscription"""
+
+    @abc.abstractmethod
+    async def nack(self, ack_ids: List[str]):
+        """Make messages available for redelivery right away"""
+
+    async def close(self):
+        pass
+
+
+class GooglePubSubTransport(PubSubTransport):
+    """Google Cloud Pub/Sub; the blocking SDK calls run in worker threads"""
+
+    def __init__(self):
+        project_name = os.getenv("GCP_PROJECT_ID")
+        self.topic_name = f"projects/{project_name}/topics/{os.getenv('REQUEST_TOPIC')}"
+        self.subscription_name = (
+            f"projects/{project_name}/subscriptions/"
+            f"{os.getenv('RESPONSE_SUBSCRIPTION_NAME')}"
+        )
+        self._subscriber = None
+
+    def _subscriber_client(self):
+        if self._subscriber is None:
+            self._subscriber = sdk.pubsub().SubscriberClient(
+                credentials=sdk.pubsub_credentials()
+            )
+        return self._subscriber
+
+    async def publish(self, data: bytes, attributes: Dict[str, str]) -> str:
+        future = sdk.publisher_client().publish(self.topic_name, data, **attributes)
+        return await asyncio.to_thread(future.result)
+
+    async def pull(self, max_messages: int) -> List[ReceivedMessage]:
+        response = await asyncio.to_thread(
+            self._subscriber_client().pull,
+            request={"subscription": self.subscription_name, "max_messages": max_messages},
+            timeout=10,
+        )
+        messages = []
+        for received in response.received_messages:
+            publish_time = getattr(received.message, "publish_time", None)
+            messages.append(
+                ReceivedMessage(
+                    ack_id=received.ack_id,
+                    data=received.message.data,
+                    publish_time=publish_time.timestamp() if publish_time else None,
+                )
+            )
+        return messages
+
+    async def acknowledge(self, ack_ids: List[str]):
+        await asyncio.to_thread(
+            self._subscriber_client().acknowledge,
+            request={"subscription": self.subscription_name, "ack_ids": ack_ids},
+        )
+
+    async def nack(self, ack_ids: List[str]):
+        await asyncio.to_thread(
+            self._subscriber_client().modify_ack_deadline,
+            request={
+                "subscription": self.subscription_name,
+                "ack_ids": ack_ids,
+                "ack_deadline_seconds": 0,
+            },
+        )
+
+    async def close(self):
+        if self._subscriber is not None:
+            self._subscriber.close()
+            self._subscriber = None
+
+
+class InMemoryPubSubTransport(PubSubTransport):
+    """Request topic and reply subscription in memory.
+
+    ``responder`` plays the breeder service: it receives each published
+    request and returns the reply payloads, delivered after ``delay`` seconds.
+    """
+
+    def __init__(
+        self,
+        responder: Optional[Callable[[dict], List[dict]]] = None,
+        delay: float = 0.0,
+    ):
+        self.responder = responder
+        self.delay = delay
+        self.published: List[dict] = []
+        self._replies: asyncio.Queue = asyncio.Queue()
+        self._unacked: Dict[str, ReceivedMessage] = {}
+
+    def deliver(self, reply: dict):
+        """Put a reply on the subscription, as the breeder service would"""
+        message = ReceivedMessage(
+            ack_id=uuid.uuid4().hex,
+            data=json.dumps(reply).encode("utf-8"),
+            publish_time=time.time(),
+        )
+        self._replies.put_nowait(message)
+
+    async def publish(self, data: bytes, attributes: Dict[str, str]) -> str:
+        request = json.loads(data.decode("utf-8"))
+        self.published.append({"data": request, "attributes": attributes})
+        if self.responder is not None:
+            for reply in self.responder(request):
+                asyncio.get_running_loop().call_later(self.delay, self.deliver, reply)
+        return uuid.uuid4().hex
+
+    async def pull(self, max_messages: int) -> List[ReceivedMessage]:
+        messages = [await self._replies.get()]
+        while len(messages) < max_messages and not self._replies.empty():
+            messages.append(self._replies.get_nowait())
+        for message in messages:
+            self._unacked[message.ack_id] = message
+        return messages
+
+    async def acknowledge(self, ack_ids: List[str]):
+        for ack_id in ack_ids:
+            self._unacked.pop(ack_id, None)
+
+    async def nack(self, ack_ids: List[str]):
+        for ack_id in ack_ids:
+            message = self._unacked.pop(ack_id, None)
+            if message is not None:
+                self._replies.put_nowait(message)
+
+
+def build_transport(kind: str = PUBSUB_TRANSPORT) -> PubSubTransport:
+    if kind == "memory":
+        transport = InMemoryPubSubTransport()
+    elif kind == "google":
+        transport = GooglePubSubTransport()
+    else:
+        raise ValueError(f"Unknown Pub/Sub transport: {kind}")
+    transport = faults.wrap(transport, "pubsub", ("publish",))
+    return bulkhead.wrap(transport, "pubsub", ("publish",))
+
+
+# Request/reply
+
+
+@dataclass
+class _PendingReplies:
+    ids: set
+    results: Dict[str, Optional[dict]] = field(default_factory=dict)
+    complete: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def add(self, breeder_id: str, data: Optional[dict]):
+        if breeder_id in self.ids:
+            self.results[breeder_id] = data
+            if len(self.results) == len(self.ids):
+                self.complete.set()
+
+
+class BreederLookup:
+    """Batched breeder requests with a shared reply dispatcher"""
+
+    def __init__(
+        self,
+        transport: PubSubTransport,
+        window: float = PUBSUB_BATCH_WINDOW_MS / 1000,
+        max_batch: int = PUBSUB_MAX_BATCH,
+        reply_timeout: float = PUBSUB_REPLY_TIMEOUT,
+    ):
+        self.transport = transport
+        self.reply_timeout = reply_timeout
+        self.batcher = MicroBatcher(self.fetch_many, window=window, max_batch=max_batch)
+        self._waiting: Dict[str, _PendingReplies] = {}
+        self._pump_task: Optional[asyncio.Task] = None
+
+    async def get(self, breeder_id: str) -> Optional[dict]:
+        """One breeder, micro-batched with concurrent callers"""
+        return await self._load(breeder_id)
+
+    async def get_many(self, breeder_ids: List[str]) -> Dict[str, Optional[dict]]:
+        """Several breeders; ids without a reply map to ``ReplyTimeout``"""
+        results = await asyncio.gather(
+            *(self._load(breeder_id) for breeder_id in breeder_ids),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, ReplyTimeout):
+                raise result
+        return dict(zip(breeder_ids, results))
+
+    async def _load(self, breeder_id: str) -> Optional[dict]:
+        # The batch waits up to the reply timeout; this caller no longer than
+        # its own request allows
+        try:
+            return await asyncio.wait_for(
+                self.batcher.load(breeder_id), timeout=deadline.remaining()
+            )
+        except asyncio.TimeoutError:
+            raise ReplyTimeout(f"No reply for breeder {breeder_id}") from None
+
+    async def fetch_many(self, breeder_ids: List[str]) -> Dict[str, object]:
+        """Publish one request for ``breeder_ids`` and collect the replies"""
+        # Shared by every caller in the batch, so no single request's deadline
+        # applies; each caller still stops waiting at its own (``_load``)
+        deadline.clear()
+        correlation_id = uuid.uuid4().hex
+        pending = _PendingReplies(ids=set(breeder_ids))
+        self._waiting[correlation_id] = pending
+        self._ensure_pump()
+
+        message = {"correlation_id": correlation_id}
+        if len(breeder_ids) == 1:
+            message["breeder_id"] = breeder_ids[0]
+        else:
+            message["breeder_ids"] = breeder_ids
+
+        try:
+            with start_span(
+                "pubsub.breeder_request", kind="client", batch_size=len(breeder_ids)
+            ) as span:
+                started = time.perf_counter()
+                await self.transport.publish(
+                    json.dumps(message).encode("utf-8"), propagation_headers(span)
+                )
+                try:
+                    await asyncio.wait_for(
+                        pending.complete.wait(),
+                        timeout=self.reply_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    span.status = "error"
+                span.set_attribute("pubsub.wait_ms", (time.perf_counter() - started) * 1000)
+                span.set_attribute("pubsub.replies", len(pending.results))
+        finally:
+            self._waiting.pop(correlation_id, None)
+
+        return {
+            breeder_id: pending.results[breeder_id]
+            if breeder_id in pending.results
+            else ReplyTimeout(f"No reply for breeder {breeder_id}")
+            for breeder_id in breeder_ids
+        }
+
+    def _ensure_pump(self):
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+
+    async def _pump(self):
+        """Pull replies while any request is waiting, then stop"""
+        while self._waiting:
+            try:
+                messages = await self.transport.pull(PUBSUB_PULL_MAX_MESSAGES)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Pub/Sub reply pull failed: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            ack_ids, nack_ids = [], []
+            for message in messages:
+                try:
+                    reply = json.loads(message.data.decode("utf-8"))
+                except ValueError:
+                    logger.warning("Dropping malformed Pub/Sub reply")
+                    ack_ids.append(message.ack_id)
+                    continue
+
+                pending = self._waiting.get(reply.get("correlation_id"))
+                if pending is not None:
+                    pending.add(str(reply.get("breeder_id")), reply.get("breeder_data"))
+                    ack_ids.append(message.ack_id)
+                elif (
+                    message.publish_time is not None
+                    and time.time() - message.publish_time > self.reply_timeout * 2
+                ):
+                    # Nobody can still be waiting for it
+                    ack_ids.append(message.ack_id)
+                else:
+                    # Another worker's reply
+                    nack_ids.append(message.ack_id)
+
+            if ack_ids:
+                await self.transport.acknowledge(ack_ids)
+            if nack_ids:
+                await self.transport.nack(nack_ids)
+            if not ack_ids:
+                # Nothing for us (or nothing at all); don't spin on redeliveries
+                await asyncio.sleep(PUBSUB_POLL_INTERVAL)
+
+    async def close(self):
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            await asyncio.gather(self._pump_task, return_exceptions=True)
+        await self.transport.close()
+
+
+_lookup: Optional[BreederLookup] = None
+_lookup_loop = None
+
+
+def get_breeder_lookup() -> BreederLookup:
+    """Per-process lookup, rebuilt when the running event loop changes"""
+    global _lookup, _lookup_loop
+    loop = asyncio.get_running_loop()
+    if _lookup is None or _lookup_loop is not loop:
+        _lookup = BreederLookup(build_transport())
+        _lookup_loop = loop
+    return _lookup
+
+
+async def close_breeder_lookup():
+    global _lookup, _lookup_loop
+    if _lookup is not None:
+        await _lookup.close()
+    _lookup = None
+    _lookup_loop = None
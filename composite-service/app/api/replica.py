@@ -0,0 +1,340 @@
+"""Local read replica of the breeder and pet services.
+
+The replica is kept current by a pluggable change-event source plus a periodic
+full resync. ``get_composites`` reads from it while it is fresh and falls back
+to the live fan-out once it lags too far behind, or once the event source has
+not completed a poll (or sent a heartbeat) for ``REPLICA_STALE_AFTER``
+seconds: a quiet feed still polls, a stalled one does not.
+"""
+
+import abc
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional
+
+from app.api import db, db_manager, sdk
+from app.api.auth import create_jwt_token
+from app.api.service import BREEDER_SERVICE_URL, PET_SERVICE_URL, get_http_client
+from app.api.tracing import start_span
+
+logger = logging.getLogger("composite-service")
+
+REPLICA_EVENT_SOURCE = os.getenv("REPLICA_EVENT_SOURCE", "pubsub")
+REPLICA_RESYNC_INTERVAL = float(os.getenv("REPLICA_RESYNC_INTERVAL", "300"))
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "30"))
+REPLICA_STALE_AFTER = float(os.getenv("REPLICA_STALE_AFTER", "30"))
+REPLICA_MAX_AGE = float(
+    os.getenv("REPLICA_MAX_AGE", str(REPLICA_RESYNC_INTERVAL * 3))
+)
+REPLICA_PAGE_SIZE = int(os.getenv("REPLICA_PAGE_SIZE", "500"))
+
+
+@dataclass
+class ChangeEvent:
+    """A single change published by the breeder or pet service"""
+
+    entity: str  # "breeder" | "pet"
+    op: str  # "upsert" | "delete"
+    id: str
+    data: Optional[dict] = None
+    timestamp: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "ChangeEvent":
+        return cls(
+            entity=payload["entity"],
+            op=payload["op"],
+            id=str(payload["id"]),
+            data=payload.get("data"),
+            timestamp=float(payload.get("timestamp") or time.time()),
+        )
+
+
+class EventSource(abc.ABC):
+    """Base class for change-event sources feeding the replica"""
+
+    # Wall-clock time of the last completed poll or heartbeat
+    last_seen: Optional[float] = None
+
+    def heartbeat(self):
+        """Record that the feed is being read, whether or not it had events"""
+        self.last_seen = time.time()
+
+    @abc.abstractmethod
+    def events(self) -> AsyncIterator[ChangeEvent]:
+        """Change events, in order, for as long as the replica runs"""
+
+    async def close(self):
+        pass
+
+
+class InMemoryEventSource(EventSource):
+    """Local stand-in for the change feed, used in tests and local runs"""
+
+    def __init__(self, poll_interval: float = 1.0):
+        self.poll_interval = poll_interval
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def publish(self, event: ChangeEvent):
+        self._queue.put_nowait(event)
+
+    async def events(self) -> AsyncIterator[ChangeEvent]:
+        while True:
+            try:
+                event = await asyncio.wait_for(self._queue.get(), self.poll_interval)
+            except asyncio.TimeoutError:
+                self.heartbeat()
+                continue
+            self.heartbeat()
+            yield event
+
+
+class PubSubEventSource(EventSource):
+    """Change feed delivered over a Pub/Sub subscription"""
+
+    def __init__(self, subscription: Optional[str] = None, poll_interval: float = 1.0):
+        project_name = os.getenv("GCP_PROJECT_ID")
+        subscription = subscription or os.getenv("REPLICA_SUBSCRIPTION_NAME")
+        self.subscription_name = f"projects/{project_name}/subscriptions/{subscription}"
+        self.poll_interval = poll_interval
+        self._subscriber = None
+
+    def _pull(self) -> list:
+        if self._subscriber is None:
+            self._subscriber = sdk.pubsub().SubscriberClient(
+                credentials=sdk.pubsub_credentials()
+            )
+
+        # Bounded, so a hung pull shows up as a silent feed
+        response = self._subscriber.pull(
+            request={"subscription": self.subscription_name, "max_messages": 100},
+            timeout=10,
+        )
+        if response.received_messages:
+            self._subscriber.acknowledge(
+                request={
+                    "subscription": self.subscription_name,
+                    "ack_ids": [msg.ack_id for msg in response.received_messages],
+                }
+            )
+        return [msg.message.data for msg in response.received_messages]
+
+    async def events(self) -> AsyncIterator[ChangeEvent]:
+        while True:
+            try:
+                messages = await asyncio.to_thread(self._pull)
+                self.heartbeat()
+            except Exception as e:
+                logger.error(f"Replica event pull failed: {e}")
+                messages = []
+
+            for data in messages:
+                try:
+                    yield ChangeEvent.from_dict(json.loads(data.decode("utf-8")))
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"Skipping malformed replica event: {e}")
+
+            if not messages:
+                await asyncio.sleep(self.poll_interval)
+
+    async def close(self):
+        if self._subscriber is not None:
+            self._subscriber.close()
+
+
+async def fetch_all(url: str, headers: dict, page_size: int = REPLICA_PAGE_SIZE) -> List[dict]:
+    """Page through a downstream list endpoint until it is exhausted"""
+    items = []
+    offset = 0
+    client = get_http_client()
+    while True:
+        response = await client.get(
+            url,
+            params={"limit": page_size, "offset": offset},
+            headers=headers,
+            follow_redirects=True,
+        )
+        response.raise_for_status()
+        page = response.json().get("data", [])
+        items.extend(page)
+        if len(page) < page_size:
+            return items
+        offset += page_size
+
+
+class Replica:
+    """Materialized breeders/pets tables fed by change events and resyncs"""
+
+    def __init__(
+        self,
+        source: EventSource,
+        resync_interval: float = REPLICA_RESYNC_INTERVAL,
+        max_lag: float = REPLICA_MAX_LAG,
+        max_age: float = REPLICA_MAX_AGE,
+        stale_after: float = REPLICA_STALE_AFTER,
+    ):
+        self.source = source
+        self.resync_interval = resync_interval
+        self.max_lag = max_lag
+        self.max_age = max_age
+        self.stale_after = stale_after
+
+        self.started_at: Optional[float] = None
+        self.last_resync: Optional[float] = None
+        self.last_event_lag = 0.0
+        self.events_applied = 0
+
+        self._lock = asyncio.Lock()
+        self._replay: Optional[List[ChangeEvent]] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def apply(self, event: ChangeEvent):
+        """Apply one change event, buffering it if a resync is in flight"""
+        async with self._lock:
+            if self._replay is not None:
+                self._replay.append(event)
+            await self._apply(event)
+
+        self.last_event_lag = max(0.0, time.time() - event.timestamp)
+        self.events_applied += 1
+
+    async def _apply(self, event: ChangeEvent):
+        if event.entity == "breeder":
+            if event.op == "delete":
+                await db_manager.delete_breeder(event.id)
+            else:
+                await db_manager.upsert_breeder({**(event.data or {}), "id": event.id})
+        elif event.entity == "pet":
+            if event.op == "delete":
+                await db_manager.delete_pet(event.id)
+            else:
+                await db_manager.upsert_pet({**(event.data or {}), "id": event.id})
+        else:
+            logger.warning(f"Ignoring replica event for unknown entity {event.entity}")
+
+    async def resync(self):
+        """Replace the replica with a full snapshot of both services.
+
+        Events that arrive while the snapshot is being fetched are replayed on
+        top of it, so a resync never rolls back a newer change.
+        """
+        self._replay = []
+        try:
+            with start_span("replica.resync"):
+                headers = {
+                    "Authorization": "Bearer "
+                    + create_jwt_token({"tokenId": "composite-replica"})["access_token"]
+                }
+                breeders, pets = await asyncio.gather(
+                    fetch_all(f"{BREEDER_SERVICE_URL}/", headers),
+                    fetch_all(f"{PET_SERVICE_URL}/", headers),
+                )
+                async with self._lock:
+                    await db_manager.replace_all(breeders, pets)
+                    for event in self._replay:
+                        await self._apply(event)
+        finally:
+            self._replay = None
+
+        self.last_resync = time.time()
+        logger.info(f"Replica resynced: {len(breeders)} breeders, {len(pets)} pets")
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last successful full resync"""
+        if self.last_resync is None:
+            return None
+        return time.time() - self.last_resync
+
+    def feed_silence(self) -> Optional[float]:
+        """Seconds since the event source last polled, or None when not consuming"""
+        if self.started_at is None:
+            return None
+        return time.time() - max(self.source.last_seen or 0.0, self.started_at)
+
+    def is_fresh(self) -> bool:
+        """Whether reads may be served locally instead of fanning out"""
+        if self.last_resync is None:
+            return False
+        if any(task.done() for task in self._tasks):
+            return False
+        silence = self.feed_silence()
+        if silence is not None and silence > self.stale_after:
+            return False
+        return self.age() <= self.max_age and self.last_event_lag <= self.max_lag
+
+    def status(self) -> dict:
+        return {
+            "fresh": self.is_fresh(),
+            "age": self.age(),
+            "event_lag": self.last_event_lag,
+            "feed_silence": self.feed_silence(),
+            "events_applied": self.events_applied,
+        }
+
+    async def _consume(self):
+        async for event in self.source.events():
+            try:
+                await self.apply(event)
+            except Exception as e:
+                logger.error(f"Failed to apply replica event {event}: {e}")
+
+    async def _resync_loop(self):
+        while True:
+            try:
+                await self.resync()
+            except Exception as e:
+                logger.error(f"Replica resync failed: {e}")
+            await asyncio.sleep(self.resync_interval)
+
+    def start(self):
+        self.started_at = time.time()
+        self._tasks = [
+            asyncio.create_task(self._consume()),
+            asyncio.create_task(self._resync_loop()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.started_at = None
+        await self.source.close()
+
+
+replica: Optional[Replica] = None
+
+
+def get_replica() -> Optional[Replica]:
+    return replica
+
+
+def create_event_source(kind: str = REPLICA_EVENT_SOURCE) -> EventSource:
+    if kind == "memory":
+        return InMemoryEventSource()
+    if kind == "pubsub":
+        return PubSubEventSource()
+    raise ValueError(f"Unknown replica event source: {kind}")
+
+
+async def start_replica(source: Optional[EventSource] = None) -> Replica:
+    """Connect the replica database and start consuming events"""
+    global replica
+    db.metadata.create_all(db.engine)
+    await db.database.connect()
+    replica = Replica(source or create_event_source())
+    replica.start()
+    return replica
+
+
+async def stop_replica():
+    global replica
+    if replica is not None:
+        await replica.stop()
+        replica = None
+    if db.database.is_connected:
+        await db.database.disconnect()
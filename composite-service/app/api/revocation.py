@@ -0,0 +1,137 @@
+"""Token revocation by ``tokenId``.
+
+Revoking a tokenId invalidates every access and refresh token issued for it
+up to that moment (``iat`` <= revocation time). Tokens minted afterwards, e.g.
+on the next login, are unaffected.
+
+The check runs on every request, so it is a single dict lookup in memory.
+Revocations are appended to a local SQLite log (``REVOCATION_DB``) that every
+gunicorn worker on the host tails from a background thread, so a logout
+handled by one worker reaches the others within ``REVOCATION_SYNC_INTERVAL``.
+Entries are dropped once every token they could match has expired.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("composite-service")
+
+REVOCATION_DB = os.getenv("REVOCATION_DB", "/tmp/composite-revocations.db")
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "1"))
+REVOCATION_PURGE_INTERVAL = 60.0
+
+
+class RevocationList:
+    def __init__(self, path: str = REVOCATION_DB):
+        self.path = path
+        # tokenId -> latest revocation time; read on the hot path
+        self.cutoffs: Dict[str, float] = {}
+        self._expires: Dict[str, float] = {}
+        self._last_seq = 0
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._created = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        if not self._created:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Append-only log; AUTOINCREMENT never reuses a seq after purges
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS revocations (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    token_id TEXT NOT NULL,
+                    revoked_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )"""
+            )
+            self._created = True
+        return conn
+
+    def is_revoked(self, payload: dict) -> bool:
+        cutoff = self.cutoffs.get(payload.get("tokenId"))
+        return cutoff is not None and payload.get("iat", 0) <= cutoff
+
+    def revoke(self, token_id: str, expires_at: float, revoked_at: Optional[float] = None):
+        """Revoke every token for ``token_id`` issued up to ``revoked_at``"""
+        revoked_at = revoked_at or time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO revocations (token_id, revoked_at, expires_at) VALUES (?, ?, ?)",
+                (token_id, revoked_at, expires_at),
+            )
+        # Visible in this worker immediately, in the others on their next sync
+        self._apply(token_id, revoked_at, expires_at)
+
+    def _apply(self, token_id: str, revoked_at: float, expires_at: float):
+        with self._lock:
+            self.cutoffs[token_id] = max(self.cutoffs.get(token_id, 0.0), revoked_at)
+            self._expires[token_id] = max(self._expires.get(token_id, 0.0), expires_at)
+
+    def sync(self):
+        """Apply revocations written by any worker since the last sync"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT seq, token_id, revoked_at, expires_at FROM revocations "
+                "WHERE seq > ? AND expires_at > ? ORDER BY seq",
+                (self._last_seq, now),
+            ).fetchall()
+            if now - self._last_purge > REVOCATION_PURGE_INTERVAL:
+                conn.execute("DELETE FROM revocations WHERE expires_at <= ?", (now,))
+                self._purge_memory(now)
+                self._last_purge = now
+
+        for seq, token_id, revoked_at, expires_at in rows:
+            self._apply(token_id, revoked_at, expires_at)
+            self._last_seq = max(self._last_seq, seq)
+
+    def _purge_memory(self, now: float):
+        with self._lock:
+            for token_id, expires_at in list(self._expires.items()):
+                if expires_at <= now:
+                    self.cutoffs.pop(token_id, None)
+                    self._expires.pop(token_id, None)
+
+    def entries(self) -> List[dict]:
+        return [
+            {
+                "tokenId": token_id,
+                "revoked_at": cutoff,
+                "expires_at": self._expires.get(token_id),
+            }
+            for token_id, cutoff in list(self.cutoffs.items())
+        ]
+
+    def _run(self):
+        while not self._stop.wait(REVOCATION_SYNC_INTERVAL):
+            try:
+                self.sync()
+            except sqlite3.Error as e:
+                logger.error(f"Revocation sync failed: {e}")
+
+    def start(self):
+        """Load current revocations and keep following the shared log"""
+        self.sync()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="revocation-sync", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=REVOCATION_SYNC_INTERVAL + 1)
+            self._thread = None
+
+
+revocations = RevocationList()
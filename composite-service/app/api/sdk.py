@@ -0,0 +1,216 @@
+"""Lazily imported cloud SDKs and their clients.
+
+The Google Cloud (Pub/Sub, Workflows, OAuth) and AWS SDKs are expensive to
+import, and building a boto3 client costs as much again. Nothing here is
+imported when the app module loads. Each SDK is imported and each client is
+built the first time it is needed, or by ``warm_up`` in the background once the
+worker is already serving. Import and construction times are recorded for
+``startup_report``.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.api import faults
+
+logger = logging.getLogger("composite-service")
+
+SDK_WARMUP = os.getenv("SDK_WARMUP", "true").lower() == "true"
+SDK_WARMUP_DELAY = float(os.getenv("SDK_WARMUP_DELAY", "0"))
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+
+PUBSUB_SCOPES = ["https://www.googleapis.com/auth/pubsub"]
+WORKFLOW_SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+_lock = threading.RLock()
+_modules: Dict[str, object] = {}
+_clients: Dict[tuple, object] = {}
+timings: List[dict] = []
+ready_at: Optional[float] = None
+
+
+def _record(kind: str, name: str, started: float):
+    timings.append(
+        {
+            "kind": kind,
+            "name": name,
+            "ms": (time.perf_counter() - started) * 1000,
+            "thread": threading.current_thread().name,
+        }
+    )
+
+
+def load(module_name: str):
+    """Import a module on first use, timing the import"""
+    module = _modules.get(module_name)
+    if module is not None:
+        return module
+    with _lock:
+        if module_name not in _modules:
+            started = time.perf_counter()
+            _modules[module_name] = importlib.import_module(module_name)
+            _record("import", module_name, started)
+        return _modules[module_name]
+
+
+def provide(module_name: str, module):
+    """Use ``module`` in place of the real SDK module (stand-ins and tests)"""
+    with _lock:
+        _modules[module_name] = module
+        _clients.clear()
+
+
+def _client(key: tuple, build):
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        if key not in _clients:
+            started = time.perf_counter()
+            _clients[key] = build()
+            _record("client", key[0], started)
+        return _clients[key]
+
+
+def reset():
+    """Drop constructed clients, e.g. after fork (imported modules stay)"""
+    with _lock:
+        _clients.clear()
+
+
+# Accessors
+
+
+def service_account():
+    return load("google.oauth2.service_account")
+
+
+def pubsub():
+    return load("google.cloud.pubsub_v1")
+
+
+def workflows():
+    return load("google.cloud.workflows_v1")
+
+
+def executions():
+    return load("google.cloud.workflows.executions_v1")
+
+
+def credentials(path: Optional[str], scopes: List[str]):
+    """Service-account credentials, loaded once per key file and scope set"""
+    return _client(
+        ("credentials", path, tuple(scopes)),
+        lambda: service_account().Credentials.from_service_account_file(
+            path, scopes=scopes
+        ),
+    )
+
+
+def pubsub_credentials():
+    return credentials(os.getenv("GOOGLE_APPLICATION_CREDENTIALS_PUBSUB"), PUBSUB_SCOPES)
+
+
+def workflow_credentials():
+    return credentials(
+        os.getenv("GOOGLE_APPLICATION_CREDENTIALS_WORKFLOW"), WORKFLOW_SCOPES
+    )
+
+
+def publisher_client():
+    """Shared Pub/Sub publisher; it batches and is safe to use across requests"""
+    return _client(
+        ("pubsub.publisher",),
+        lambda: pubsub().PublisherClient(credentials=pubsub_credentials()),
+    )
+
+
+def workflows_client():
+    return _client(
+        ("workflows.client",),
+        lambda: workflows().WorkflowsClient(credentials=workflow_credentials()),
+    )
+
+
+def lambda_client():
+    return _client(
+        ("lambda.client",),
+        # Blocking; callers limit it with bulkhead.run_blocking
+        lambda: faults.wrap(
+            load("boto3").client("lambda", region_name=AWS_REGION), "lambda", ("invoke",)
+        ),
+    )
+
+
+# Warm-up and reporting
+
+
+def preload():
+    """Import every SDK and build the clients whose configuration is present"""
+    for module_name in (
+        "google.oauth2.service_account",
+        "google.cloud.pubsub_v1",
+        "google.cloud.workflows_v1",
+        "google.cloud.workflows.executions_v1",
+        "boto3",
+    ):
+        try:
+            load(module_name)
+        except ImportError as e:
+            logger.warning(f"SDK warm-up could not import {module_name}: {e}")
+
+    builders = [lambda_client]
+    if os.getenv("GOOGLE_APPLICATION_CREDENTIALS_PUBSUB"):
+        builders.append(publisher_client)
+    if os.getenv("GOOGLE_APPLICATION_CREDENTIALS_WORKFLOW"):
+        builders.append(workflows_client)
+    for build in builders:
+        try:
+            build()
+        except Exception as e:
+            logger.warning(f"SDK warm-up could not build {build.__name__}: {e}")
+
+
+async def warm_up(delay: float = SDK_WARMUP_DELAY):
+    """Background task started from the lifespan.
+
+    The first await yields back to the server so it can bind its socket and
+    accept traffic before the imports start in a worker thread.
+    """
+    await asyncio.sleep(delay)
+    started = time.perf_counter()
+    await asyncio.to_thread(preload)
+    logger.info(f"SDK warm-up finished in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+def _process_started() -> Optional[float]:
+    """Wall-clock start time of this process, from /proc where available"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+def mark_ready():
+    global ready_at
+    ready_at = time.time()
+
+
+def startup_report() -> dict:
+    """How long this worker took to become ready and what the SDKs cost"""
+    started = _process_started()
+    return {
+        "pid": os.getpid(),
+        "ready_after_seconds": ready_at - started if ready_at and started else None,
+        "sdk_ms": sum(t["ms"] for t in timings),
+        "sdk": sorted(timings, key=lambda t: -t["ms"]),
+    }
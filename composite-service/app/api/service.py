@@ -1,10 +1,22 @@
+import asyncio
 import os
 import httpx
 
+from app.api import bulkhead, faults
+from app.api.deadline import DeadlineTransport
+from app.api.tracing import TracingTransport
+
 BREEDER_SERVICE_URL = os.getenv("BREEDER_SERVICE_URL")
 PET_SERVICE_URL = os.getenv("PET_SERVICE_URL")
 CUSTOMER_SERVICE_URL = os.getenv("CUSTOMER_SERVICE_URL")
 
+DOWNSTREAM_MAX_CONNECTIONS = int(os.getenv("DOWNSTREAM_MAX_CONNECTIONS", "100"))
+DOWNSTREAM_MAX_KEEPALIVE = int(os.getenv("DOWNSTREAM_MAX_KEEPALIVE", "20"))
+DOWNSTREAM_TIMEOUT = float(os.getenv("DOWNSTREAM_TIMEOUT", "10"))
+
+_http_client = None
+_http_client_loop = None
+
 
 def is_breeder_route_present():
     url = os.environ.get("BREEDER_SERVICE_URL") or BREEDER_SERVICE_URL
@@ -23,3 +35,88 @@ def is_customer_route_present():
     url = os.environ.get("CUSTOMER_SERVICE_URL") or CUSTOMER_SERVICE_URL
     r = httpx.get(f"{url}/openapi.json")
     return True if r.status == 200 else False
+
+
+def downstream_name(url: httpx.URL) -> str:
+    """Name of the downstream service a URL belongs to"""
+    url = str(url)
+    for name, prefix in (
+        ("breeder", BREEDER_SERVICE_URL),
+        ("pet", PET_SERVICE_URL),
+        ("customer", CUSTOMER_SERVICE_URL),
+    ):
+        if prefix and url.startswith(prefix):
+            return name
+    return httpx.URL(url).host
+
+
+def build_base_transport() -> httpx.AsyncBaseTransport:
+    """Network transport with the shared connection pool"""
+    return httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=DOWNSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=DOWNSTREAM_MAX_KEEPALIVE,
+        )
+    )
+
+
+def build_transport() -> httpx.AsyncBaseTransport:
+    """Transport chain used by the shared downstream client"""
+    transport = build_base_transport()
+    scenario = faults.active_scenario()
+    if scenario is not None:
+        # Inside the deadline layer, so injected latency trips real timeouts
+        transport = faults.FaultInjectionTransport(transport, scenario, downstream_name)
+    if bulkhead.BULKHEAD_ENABLED:
+        # Outside fault injection, so injected latency and errors move the limits
+        transport = bulkhead.BulkheadTransport(transport, downstream_name)
+    transport = DeadlineTransport(transport)
+    return TracingTransport(transport, service_name=downstream_name)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the pooled client shared by all downstream calls in this process.
+
+    Connections are bound to the event loop that opened them, so a new client
+    is built whenever the running loop changes (e.g. a new worker or test).
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            transport=build_transport(), timeout=DOWNSTREAM_TIMEOUT
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client, _http_client_loop
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _http_client_loop = None
+
+
+async def warm_up(
+    client: httpx.AsyncClient, urls: list, headers: dict = None, connections: int = 1
+):
+    """Open ``connections`` pooled connections to each downstream (concurrent
+    requests each need their own) and return the ones that are not serving
+    """
+    responses = await asyncio.gather(
+        *(
+            client.get(f"{url}/openapi.json", headers=headers)
+            for url in urls
+            for _ in range(connections)
+        ),
+        return_exceptions=True,
+    )
+    return [
+        url
+        for i, url in enumerate(urls)
+        if any(
+            isinstance(r, Exception) or r.status_code != 200
+            for r in responses[i * connections : (i + 1) * connections]
+        )
+    ]
@@ -0,0 +1,233 @@
+"""Cache tier shared by the gunicorn workers on one host.
+
+Per-worker caches stay in front of it: a worker that misses locally looks
+here before loading, so a value loaded by one worker serves all of them and
+each worker keeps fewer entries of its own. When the shared tier fails, the
+workers carry on with their own caches.
+
+Backends (``SHARED_CACHE_BACKEND``):
+
+- ``sqlite`` (the default): a local SQLite file (``SHARED_CACHE_PATH``) in WAL mode with
+  memory-mapped reads, so readers never wait for each other or for a writer.
+  Eviction is least-recently-used, with read times recorded at most once per
+  ``SHARED_CACHE_TOUCH_INTERVAL`` so that reads stay reads. The file and its
+  directory are created readable by the service's user only; point
+  ``SHARED_CACHE_PATH`` at a directory no other user can write to.
+- ``none``: no shared tier; each worker caches for itself, with no second
+  copy of its entries
+
+Anything written to the file can be read back by every worker, so readers
+must not trust entries whose forgery would matter (see ``auth``).
+
+Values are compact JSON, zlib-compressed above ``SHARED_CACHE_COMPRESS_MIN``
+bytes. Values that are not JSON-serializable are not shared.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Hashable, Optional, Tuple
+
+from app.api import metrics
+
+logger = logging.getLogger("composite-service")
+
+SHARED_CACHE_BACKEND = os.getenv("SHARED_CACHE_BACKEND", "sqlite")
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH") or os.path.join(
+    os.getenv("XDG_RUNTIME_DIR") or os.path.expanduser("~/.cache"),
+    "composite-service",
+    "shared-cache.db",
+)
+SHARED_CACHE_MAX_ENTRIES = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "100000"))
+SHARED_CACHE_MMAP_BYTES = int(os.getenv("SHARED_CACHE_MMAP_BYTES", str(256 * 1024 * 1024)))
+SHARED_CACHE_TOUCH_INTERVAL = float(os.getenv("SHARED_CACHE_TOUCH_INTERVAL", "1"))
+SHARED_CACHE_COMPRESS_MIN = int(os.getenv("SHARED_CACHE_COMPRESS_MIN", "1024"))
+# Writes between expiry and size sweeps
+EVICT_EVERY = 100
+
+shared_cache_requests_total = metrics.counter(
+    "shared_cache_requests_total",
+    "Shared cache lookups by namespace and result (hit, miss or error)",
+)
+
+
+def dumps(value: Any) -> bytes:
+    data = json.dumps(value, separators=(",", ":")).encode()
+    if len(data) >= SHARED_CACHE_COMPRESS_MIN:
+        return b"z" + zlib.compress(data, 1)
+    return b"j" + data
+
+
+def loads(blob: bytes) -> Any:
+    data = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+    return json.loads(data)
+
+
+def _key(key: Hashable) -> str:
+    return key if isinstance(key, str) else json.dumps(key, default=str)
+
+
+def _group_prefix(group: Hashable) -> str:
+    """What ``_key`` of every ``(group, ...)`` tuple starts with"""
+    return json.dumps([group], default=str)[:-1] + ", "
+
+
+class SharedCache:
+    """``get`` returns ``(value, stored_at)``, with ``stored_at`` in wall-clock time"""
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Tuple[Any, float]]:
+        return None
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: float):
+        pass
+
+    def delete(self, namespace: str, key: Hashable):
+        pass
+
+    def delete_group(self, namespace: str, group: Hashable):
+        """Delete every ``(group, ...)`` tuple key"""
+
+    def clear(self):
+        pass
+
+
+class SQLiteSharedCache(SharedCache):
+    """Shared through a SQLite file that every worker on the host opens"""
+
+    def __init__(
+        self,
+        path: str = SHARED_CACHE_PATH,
+        max_entries: int = SHARED_CACHE_MAX_ENTRIES,
+        touch_interval: float = SHARED_CACHE_TOUCH_INTERVAL,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        # Connections are per thread, and per process after a fork
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        # SQLite gives its -wal and -shm files the database file's mode
+        os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+        # Writes are tiny; a writer waits briefly rather than stall a request
+        conn = sqlite3.connect(self.path, timeout=0.1, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # A lost write after a power cut only costs a cache miss
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(f"PRAGMA mmap_size={SHARED_CACHE_MMAP_BYTES}")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                used_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at)")
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, namespace, key):
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, stored_at, expires_at, used_at FROM entries"
+                " WHERE namespace = ? AND key = ?",
+                (namespace, _key(key)),
+            ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            shared_cache_requests_total.inc(namespace=namespace, result="error")
+            return None
+        if row is None or row[2] < now:
+            shared_cache_requests_total.inc(namespace=namespace, result="miss")
+            return None
+        shared_cache_requests_total.inc(namespace=namespace, result="hit")
+        if now - row[3] > self.touch_interval:
+            try:
+                conn.execute(
+                    "UPDATE entries SET used_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, _key(key)),
+                )
+            except (sqlite3.Error, OSError):
+                pass  # only ages the entry for eviction
+        return loads(row[0]), row[1]
+
+    def set(self, namespace, key, value, ttl):
+        try:
+            blob = dumps(value)
+        except (TypeError, ValueError):
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, _key(key), blob, now, now + ttl, now),
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict(conn, now)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM entries WHERE expires_at < ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM entries WHERE (namespace, key) IN"
+                " (SELECT namespace, key FROM entries ORDER BY used_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def delete(self, namespace, key):
+        try:
+            self._connect().execute(
+                "DELETE FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, _key(key)),
+            )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache delete failed: {e}")
+
+    def delete_group(self, namespace, group):
+        prefix = _group_prefix(group)
+        try:
+            self._connect().execute(
+                "DELETE FROM entries WHERE namespace = ? AND substr(key, 1, ?) = ?",
+                (namespace, len(prefix), prefix),
+            )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache delete failed: {e}")
+
+    def clear(self):
+        try:
+            self._connect().execute("DELETE FROM entries")
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache clear failed: {e}")
+
+
+def build_backend(kind: str = SHARED_CACHE_BACKEND) -> SharedCache:
+    if kind == "sqlite":
+        return SQLiteSharedCache()
+    if kind == "none":
+        return SharedCache()
+    raise ValueError(f"Unknown shared cache backend: {kind}")
+
+
+cache = build_backend()
@@ -0,0 +1,289 @@
+"""Lightweight request tracing.
+
+Every inbound request, downstream HTTP call, Pub/Sub round trip, Workflows
+execution and Lambda invoke is recorded as a span. Context is propagated with
+the W3C ``traceparent`` header alongside ``X-Correlation-ID``, and finished
+spans are handed to a pluggable exporter (``TRACE_EXPORTER``).
+"""
+
+import abc
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger("composite-service")
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+
+correlation_id = ContextVar("correlation_id", default=None)
+current_span = ContextVar("current_span", default=None)
+
+
+def get_correlation_id() -> str:
+    """Helper function to get current correlation ID"""
+    return correlation_id.get()
+
+
+@dataclass
+class SpanContext:
+    trace_id: str
+    span_id: str
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    kind: str = "internal"
+    start: float = field(default_factory=time.time)
+    end: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: Dict[str, object] = field(default_factory=dict)
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end is None:
+            return None
+        return (self.end - self.start) * 1000
+
+    @property
+    def context(self) -> SpanContext:
+        return SpanContext(self.trace_id, self.span_id)
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException):
+        self.status = "error"
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def finish(self):
+        if self.end is None:
+            self.end = self.start + (time.perf_counter() - self._started)
+            exporter.export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+# Exporters
+
+
+class SpanExporter(abc.ABC):
+    @abc.abstractmethod
+    def export(self, span: Span):
+        """Hand off one finished span"""
+
+
+class NoopExporter(SpanExporter):
+    def export(self, span: Span):
+        pass
+
+
+class InMemoryExporter(SpanExporter):
+    """Keeps the most recent spans in memory, for tests and local debugging"""
+
+    def __init__(self, maxlen: int = 10000):
+        self.spans = deque(maxlen=maxlen)
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans.clear()
+
+
+class FileExporter(SpanExporter):
+    """Appends spans to a JSON-lines file"""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class LoggingExporter(SpanExporter):
+    def export(self, span: Span):
+        logger.info(
+            f"[{span.trace_id}] span {span.name} {span.duration_ms:.2f}ms {span.status}"
+        )
+
+
+def create_exporter(kind: str = TRACE_EXPORTER) -> SpanExporter:
+    if kind == "memory":
+        return InMemoryExporter()
+    if kind == "file":
+        return FileExporter()
+    if kind == "log":
+        return LoggingExporter()
+    return NoopExporter()
+
+
+exporter: SpanExporter = create_exporter()
+
+
+def set_exporter(new_exporter: SpanExporter):
+    global exporter
+    exporter = new_exporter
+
+
+# Spans
+
+
+def open_span(
+    name: str,
+    kind: str = "internal",
+    parent: Optional[SpanContext] = None,
+    **attributes,
+) -> Span:
+    """Create a span without making it current; call ``finish()`` when done"""
+    parent = parent or current_span.get()
+    return Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+        kind=kind,
+        attributes=attributes,
+    )
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: str = "internal",
+    parent: Optional[SpanContext] = None,
+    **attributes,
+):
+    """Open a span, make it current for the enclosed block and finish it"""
+    span = open_span(name, kind, parent, **attributes)
+    token = current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        current_span.reset(token)
+        span.finish()
+
+
+# Propagation
+
+
+def format_traceparent(context: SpanContext) -> str:
+    return f"00-{context.trace_id}-{context.span_id}-01"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    try:
+        _, trace_id, span_id, _ = value.split("-")
+    except (AttributeError, ValueError):
+        return None
+    if len(trace_id) != 32 or len(span_id) != 16:
+        return None
+    return SpanContext(trace_id, span_id)
+
+
+def propagation_headers(span: Optional[Span] = None) -> Dict[str, str]:
+    """Headers that carry the trace and correlation ID to a downstream call"""
+    headers = {}
+    span = span or current_span.get()
+    if span is not None:
+        headers["traceparent"] = format_traceparent(span.context)
+    if correlation_id.get():
+        headers["X-Correlation-ID"] = correlation_id.get()
+    return headers
+
+
+class _TracedStream(httpx.AsyncByteStream):
+    """Finishes the client span once the response body has been consumed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, span: Span):
+        self._stream = stream
+        self._span = span
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._span.finish()
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """Opens a client span per downstream HTTP call and injects its context"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, service_name=None):
+        self._transport = transport
+        self._service_name = service_name
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        span = open_span(
+            f"HTTP {request.method}",
+            kind="client",
+            **{
+                "http.method": request.method,
+                "http.url": str(request.url),
+                "peer.service": self._service_name(request.url)
+                if self._service_name
+                else request.url.host,
+            },
+        )
+        headers = propagation_headers(span)
+        request.headers["traceparent"] = headers.pop("traceparent")
+        for key, value in headers.items():
+            request.headers.setdefault(key, value)
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e:
+            span.record_error(e)
+            span.finish()
+            raise
+
+        span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.status = "error"
+        if isinstance(response.stream, httpx.ByteStream):
+            # In-memory bodies are already complete
+            span.finish()
+        else:
+            response.stream = _TracedStream(response.stream, span)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
@@ -0,0 +1,274 @@
+"""Live waitlist changes for the GraphQL subscription.
+
+A change source watches one breeder's waitlist and yields batches of deltas.
+The hub runs at most one watcher per breeder, however many dashboards are
+subscribed to it, fans every batch out to them and stops the watcher when the
+last subscriber leaves.
+
+Sources (``WAITLIST_SOURCE``):
+
+- ``poll``: polls the customer service's waitlist endpoint and diffs
+  snapshots, so one request per breeder per interval replaces one full
+  ``breederPetsWithWaitlist`` query per dashboard. The watcher outlives any
+  one subscriber, so it polls with the service's own credential; each
+  subscriber's token is checked against the endpoint once, on subscribe
+- ``memory``: deltas are pushed with ``publish``; local stand-in for tests
+  and development
+"""
+
+import abc
+import asyncio
+import contextvars
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Set
+from urllib.parse import quote
+
+import httpx
+
+from app.api import metrics
+from app.api.auth import create_jwt_token
+from app.api.service import CUSTOMER_SERVICE_URL, get_http_client
+
+logger = logging.getLogger("composite-service")
+
+WAITLIST_SOURCE = os.getenv("WAITLIST_SOURCE", "poll")
+WAITLIST_POLL_INTERVAL = float(os.getenv("WAITLIST_POLL_INTERVAL", "5"))
+WAITLIST_SUBSCRIBER_QUEUE = int(os.getenv("WAITLIST_SUBSCRIBER_QUEUE", "100"))
+
+
+@dataclass
+class WaitlistChange:
+    kind: str  # "added", "updated" or "removed"
+    entry: dict
+
+
+class SubscriberLagged(Exception):
+    """A subscriber fell too far behind and has to resubscribe"""
+
+
+class WaitlistUnauthorized(Exception):
+    """The customer service refused the credential a waitlist was read with"""
+
+
+def diff_waitlist(previous: Dict[str, dict], current: Dict[str, dict]) -> List[WaitlistChange]:
+    """Changes between two waitlist snapshots keyed by entry id"""
+    changes = [
+        WaitlistChange("removed", entry)
+        for entry_id, entry in previous.items()
+        if entry_id not in current
+    ]
+    for entry_id, entry in current.items():
+        if entry_id not in previous:
+            changes.append(WaitlistChange("added", entry))
+        elif previous[entry_id] != entry:
+            changes.append(WaitlistChange("updated", entry))
+    return changes
+
+
+# Sources
+
+
+class WaitlistSource(abc.ABC):
+    async def check_access(self, breeder_id: str, headers: dict):
+        """Raise ``WaitlistUnauthorized`` unless ``headers`` may read the waitlist"""
+
+    @abc.abstractmethod
+    def changes(self, breeder_id: str) -> AsyncIterator[List[WaitlistChange]]:
+        """Batches of changes to one breeder's waitlist, until cancelled"""
+
+
+class PollingWaitlistSource(WaitlistSource):
+    """Diffs successive waitlist snapshots from the customer service"""
+
+    def __init__(self, interval: float = WAITLIST_POLL_INTERVAL):
+        self.interval = interval
+
+    async def _get(self, breeder_id: str, headers: dict) -> httpx.Response:
+        response = await get_http_client().get(
+            f"{CUSTOMER_SERVICE_URL}/breeder/{quote(breeder_id, safe='')}/waitlist",
+            headers=headers,
+            follow_redirects=True,
+        )
+        if response.status_code in (401, 403):
+            raise WaitlistUnauthorized(
+                f"Waitlist of breeder {breeder_id} refused: HTTP {response.status_code}"
+            )
+        return response
+
+    async def check_access(self, breeder_id: str, headers: dict):
+        await self._get(breeder_id, headers)
+
+    async def changes(self, breeder_id: str):
+        previous: Optional[Dict[str, dict]] = None
+        while True:
+            # Minted per poll: a watch can outlive any one access token
+            headers = {
+                "Authorization": "Bearer "
+                + create_jwt_token({"tokenId": "composite-waitlist"})["access_token"]
+            }
+            try:
+                response = await self._get(breeder_id, headers)
+                response.raise_for_status()
+                current = {str(entry["id"]): entry for entry in response.json()}
+            except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Waitlist poll for breeder {breeder_id} failed: {e}")
+            else:
+                # The first snapshot is the baseline; subscribers load the
+                # current state with the query
+                if previous is not None:
+                    changes = diff_waitlist(previous, current)
+                    if changes:
+                        yield changes
+                previous = current
+            await asyncio.sleep(self.interval)
+
+
+class InMemoryWaitlistSource(WaitlistSource):
+    """Deltas pushed by ``publish``, as a customer service change feed would"""
+
+    def __init__(self):
+        self.watches_started = 0
+        self._queues: Dict[str, asyncio.Queue] = {}
+
+    def publish(self, breeder_id: str, changes: List[WaitlistChange]):
+        queue = self._queues.get(breeder_id)
+        if queue is not None:
+            queue.put_nowait(changes)
+
+    async def changes(self, breeder_id: str):
+        queue = self._queues[breeder_id] = asyncio.Queue()
+        self.watches_started += 1
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._queues.pop(breeder_id, None)
+
+
+def build_source(kind: str = WAITLIST_SOURCE) -> WaitlistSource:
+    if kind == "memory":
+        return InMemoryWaitlistSource()
+    if kind == "poll":
+        return PollingWaitlistSource()
+    raise ValueError(f"Unknown waitlist source: {kind}")
+
+
+# Fan-out
+
+
+@dataclass
+class _Watch:
+    task: Optional[asyncio.Task] = None
+    subscribers: Set[asyncio.Queue] = field(default_factory=set)
+
+
+class WaitlistHub:
+    """One upstream watcher per breeder, shared by all of its subscribers"""
+
+    def __init__(self, source: WaitlistSource, queue_size: int = WAITLIST_SUBSCRIBER_QUEUE):
+        self.source = source
+        self.queue_size = queue_size
+        self._watches: Dict[str, _Watch] = {}
+
+    def subscriber_counts(self) -> Dict[str, int]:
+        return {
+            breeder_id: len(watch.subscribers)
+            for breeder_id, watch in self._watches.items()
+        }
+
+    async def subscribe(self, breeder_id: str, headers: dict) -> AsyncIterator[WaitlistChange]:
+        """Changes to ``breeder_id``'s waitlist from now on.
+
+        ``headers`` must be allowed to read the waitlist; the shared watcher
+        reads it with the service's own credential.
+        """
+        await self.source.check_access(breeder_id, headers)
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        watch = self._watches.get(breeder_id)
+        if watch is None:
+            watch = self._watches[breeder_id] = _Watch()
+            # Detached from the subscribing connection's context
+            watch.task = asyncio.get_running_loop().create_task(
+                self._watch(breeder_id, watch), context=contextvars.Context()
+            )
+        watch.subscribers.add(queue)
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                for change in item:
+                    yield change
+        finally:
+            watch.subscribers.discard(queue)
+            if not watch.subscribers and self._watches.get(breeder_id) is watch:
+                del self._watches[breeder_id]
+                watch.task.cancel()
+
+    async def _watch(self, breeder_id: str, watch: _Watch):
+        end = None
+        try:
+            async for changes in self.source.changes(breeder_id):
+                for queue in list(watch.subscribers):
+                    self._offer(queue, changes)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Waitlist watch for breeder {breeder_id} failed: {e}")
+            end = e
+        # The source ended: let the subscribers finish, and start fresh next time
+        if self._watches.get(breeder_id) is watch:
+            del self._watches[breeder_id]
+        for queue in list(watch.subscribers):
+            self._offer(queue, end)
+
+    def _offer(self, queue: asyncio.Queue, item):
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Dropping deltas would leave the dashboard silently wrong
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(SubscriberLagged("Too many undelivered waitlist changes"))
+
+    async def close(self):
+        watches, self._watches = list(self._watches.values()), {}
+        for watch in watches:
+            watch.task.cancel()
+        await asyncio.gather(*(watch.task for watch in watches), return_exceptions=True)
+
+
+_hub: Optional[WaitlistHub] = None
+_hub_loop = None
+
+
+def get_waitlist_hub() -> WaitlistHub:
+    """Per-process hub, rebuilt when the running event loop changes"""
+    global _hub, _hub_loop
+    loop = asyncio.get_running_loop()
+    if _hub is None or _hub_loop is not loop:
+        _hub = WaitlistHub(build_source())
+        _hub_loop = loop
+    return _hub
+
+
+async def close_waitlist_hub():
+    global _hub, _hub_loop
+    if _hub is not None:
+        await _hub.close()
+    _hub = None
+    _hub_loop = None
+
+
+metrics.gauge(
+    "waitlist_subscribers",
+    "GraphQL waitlist subscribers, by breeder",
+    lambda: {
+        metrics.labels(breeder_id=breeder_id): count
+        for breeder_id, count in (_hub.subscriber_counts() if _hub else {}).items()
+    },
+)
@@ -0,0 +1,136 @@
+"""Worker warm-up and readiness.
+
+Started from the lifespan once the worker is already accepting connections,
+the warm-up pays the first-request costs before real traffic does:
+
+- resolves every downstream host, so DNS trouble shows up in the report
+- opens ``WARMUP_CONNECTIONS`` pooled connections to each of the breeder, pet
+  and customer services through the shared client, handshakes included
+- imports the cloud SDKs and builds their clients (``sdk.warm_up``)
+
+``GET /api/v1/health/ready`` answers 503 until the warm-up has finished or
+``WARMUP_TIMEOUT`` seconds have passed, then 200; point the load balancer's
+readiness probe at it. A dependency that fails to warm up is reported but does
+not keep the worker unready: the routes already degrade without it, and
+every worker would be held back alike.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import List, Optional
+
+import httpx
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.api import sdk, service
+from app.api.auth import create_jwt_token
+
+logger = logging.getLogger("composite-service")
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "10"))
+
+
+async def resolve(host: str, port: int):
+    await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+
+
+class Readiness:
+    def __init__(
+        self,
+        connections: int = WARMUP_CONNECTIONS,
+        timeout: float = WARMUP_TIMEOUT,
+        sdk_warm_up: bool = sdk.SDK_WARMUP,
+    ):
+        self.connections = connections
+        self.timeout = timeout
+        self.sdk_warm_up = sdk_warm_up
+        self.ready = False
+        self.report: dict = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def urls(self) -> List[str]:
+        return [
+            url
+            for url in (
+                service.BREEDER_SERVICE_URL,
+                service.PET_SERVICE_URL,
+                service.CUSTOMER_SERVICE_URL,
+            )
+            if url
+        ]
+
+    async def run(self):
+        """Warm up, and become ready when done or out of time"""
+        started = time.perf_counter()
+        work = asyncio.ensure_future(self._warm_up())
+        done, _ = await asyncio.wait({work}, timeout=self.timeout)
+        if not done:
+            # Keep warming in the background; the worker serves regardless
+            logger.warning(f"Warm-up still running after {self.timeout:g}s; ready anyway")
+        self.report["timed_out"] = not done
+        self.report["ms"] = (time.perf_counter() - started) * 1000
+        self.ready = True
+        sdk.mark_ready()
+        try:
+            await work
+        except Exception as e:
+            logger.error(f"Warm-up failed: {e}")
+
+    async def _warm_up(self):
+        urls = self.urls()
+        hosts = set()
+        for url in map(httpx.URL, urls):
+            hosts.add((url.host, url.port or (443 if url.scheme == "https" else 80)))
+        resolved = await asyncio.gather(
+            *(resolve(host, port) for host, port in hosts), return_exceptions=True
+        )
+        self.report["unresolved"] = sorted(
+            host for (host, _), r in zip(hosts, resolved) if isinstance(r, Exception)
+        )
+
+        # Connections past the keep-alive limit would be closed straight away
+        connections = max(
+            1, min(self.connections, service.DOWNSTREAM_MAX_KEEPALIVE // max(1, len(urls)))
+        )
+        headers = {
+            "Authorization": "Bearer "
+            + create_jwt_token({"tokenId": "composite-warmup"})["access_token"]
+        }
+        steps = [service.warm_up(service.get_http_client(), urls, headers, connections)]
+        if self.sdk_warm_up:
+            steps.append(sdk.warm_up())
+        unavailable, *_ = await asyncio.gather(*steps)
+        self.report["connections"] = connections
+        self.report["unavailable"] = unavailable
+        problems = self.report["unresolved"] + unavailable
+        if problems:
+            logger.warning(f"Warm-up could not reach: {problems}")
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+readiness = Readiness()
+
+health = APIRouter()
+
+
+@health.get("/ready")
+async def ready():
+    """200 once this worker has warmed up, 503 until then"""
+    return JSONResponse(
+        status_code=200 if readiness.ready else 503,
+        content={"ready": readiness.ready, "pid": os.getpid(), **readiness.report},
+    )
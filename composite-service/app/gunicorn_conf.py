@@ -0,0 +1,29 @@
+"""gunicorn settings for production: ``gunicorn -c app/gunicorn_conf.py app.main:app``"""
+
+import os
+
+from app import runtime
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = runtime.worker_count()
+worker_class = "app.runtime.UvicornWorker"
+
+# Import the app once in the master; workers inherit it copy-on-write
+preload_app = True
+
+# SIGTERM: stop accepting, finish in-flight requests, then exit
+graceful_timeout = runtime.GRACEFUL_TIMEOUT
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = runtime.KEEPALIVE
+
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    server.log.info(f"composite-service runtime: {runtime.describe()}")
+
+
+def post_fork(server, worker):
+    runtime.post_fork()
@@ -2,30 +2,68 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.composites import composites
 from app.api.auth import auth
+from app.api.admin import admin
+from app.api import catalog, profiling, revocation, sdk, warmup
+from app.api.service import close_http_client
+from app.api.pubsub import close_breeder_lookup
+from app.api.notifications import close_notifier
+from app.api.waitlist import close_waitlist_hub
 
-# from app.api.db import metadata, database, engine
+from app.api.db import REPLICA_ENABLED
 from app.api.middleware import LoggingMiddleware, JWTMiddleware
+from app.api.admission import ADMISSION_ENABLED, AdmissionMiddleware
+from app.api.deadline import DeadlineMiddleware
+from app.api.replica import start_replica, stop_replica
 from contextlib import asynccontextmanager
+import asyncio
 
 # code for graphql
 from strawberry.fastapi import GraphQLRouter
 from app.api.graphql import schema
 
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-#     # Startup code: connect to the database
-#     await database.connect()
-#     yield
-#     # Shutdown code: disconnect from the database
-#     await database.disconnect()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup code: connect the optional local read replica
+    if REPLICA_ENABLED:
+        await start_replica()
+    if profiling.PROFILING_ENABLED:
+        # Lifespan runs in every gunicorn worker, so each gets its own hook
+        profiling.install_signal_handler()
+    # Per worker: follow revocations made by the other workers on this host
+    revocation.revocations.start()
+    if catalog.CATALOG_ENABLED:
+        catalog.catalog.start()
+    # Connections and cloud SDKs are warmed up after the worker starts
+    # serving, not before; /api/v1/health/ready reports when that is done
+    warm_up_task = None
+    if warmup.WARMUP_ENABLED:
+        warmup.readiness.start()
+    else:
+        if sdk.SDK_WARMUP:
+            warm_up_task = asyncio.create_task(sdk.warm_up())
+        warmup.readiness.ready = True
+        sdk.mark_ready()
+    yield
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    await warmup.readiness.stop()
+    # Runs after in-flight requests have drained; waiting batches go out first
+    await close_notifier()
+    await close_http_client()
+    await close_breeder_lookup()
+    await close_waitlist_hub()
+    await catalog.catalog.stop()
+    revocation.revocations.stop()
+    # Shutdown code: stop consuming events and disconnect from the database
+    if REPLICA_ENABLED:
+        await stop_replica()
 
-# metadata.create_all(engine)
 
 app = FastAPI(
     openapi_url="/api/v1/composites/openapi.json",
     docs_url="/api/v1/composites/docs",
-    # lifespan=lifespan  # Use lifespan event handler
+    lifespan=lifespan,  # Use lifespan event handler
 )
 
 origins = [
@@ -47,11 +85,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
 app.add_middleware(LoggingMiddleware)
+# Cancels the request (and its downstream work) on deadline or disconnect
+app.add_middleware(DeadlineMiddleware)
+if ADMISSION_ENABLED:
+    # Runs after JWT verification and before logging, tracing and routes
+    app.add_middleware(
+        AdmissionMiddleware,
+        excluded_paths=[
+            "/api/v1/admin",
+            "/api/v1/health",
+            "/api/v1/composites/openapi.json",
+            "/api/v1/composites/docs",
+        ],
+    )
 app.add_middleware(
     JWTMiddleware,
     excluded_paths=[
         "/api/v1/auth",
+        "/api/v1/health",
         "/api/v1/composites/openapi.json",
         "/api/v1/composites/docs",
         "/api/v1/graphql",
@@ -60,6 +114,8 @@ app.add_middleware(
 
 app.include_router(composites, prefix="/api/v1/composites", tags=["composites"])
 app.include_router(auth, prefix="/api/v1/auth", tags=["auth"])
+app.include_router(admin, prefix="/api/v1/admin", tags=["admin"])
+app.include_router(warmup.health, prefix="/api/v1/health", tags=["health"])
 
 # Add GraphQL route
 graphql_app = GraphQLRouter(schema)
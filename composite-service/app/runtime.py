@@ -0,0 +1,120 @@
+"""Production server runtime for the composite service.
+
+Used by ``app/gunicorn_conf.py``:
+
+- the worker count is derived from the CPUs the container may actually use
+  (cgroup quota, then CPU affinity), not from the host's core count
+- workers run uvloop and httptools when they are installed
+- the app is preloaded in the gunicorn master, so imports are paid once
+- ``post_fork`` drops anything a worker must not share with the master; the
+  worker's lifespan warm-up (``app.api.warmup``) then builds its own
+- workers drain in-flight requests on SIGTERM within ``GRACEFUL_TIMEOUT``
+"""
+
+import math
+import os
+from typing import Optional
+
+from uvicorn.workers import UvicornWorker as _UvicornWorker
+
+WORKERS_PER_CPU = float(os.getenv("WORKERS_PER_CPU", "1"))
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "0"))  # 0 means no cap
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+
+
+def cgroup_cpu_limit(root: str = "/sys/fs/cgroup") -> Optional[float]:
+    """CPU limit from the cgroup v2 or v1 quota, or None when unlimited"""
+    try:
+        with open(os.path.join(root, "cpu.max")) as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(os.path.join(root, "cpu", "cpu.cfs_quota_us")) as f:
+            quota = int(f.read())
+        with open(os.path.join(root, "cpu", "cpu.cfs_period_us")) as f:
+            period = int(f.read())
+    except (OSError, ValueError):
+        return None
+    return quota / period if quota > 0 else None
+
+
+def available_cpus(root: str = "/sys/fs/cgroup") -> int:
+    """CPUs this process can use, honouring container quotas and affinity"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit(root)
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return cpus
+
+
+def worker_count(cpus: Optional[int] = None) -> int:
+    """WEB_CONCURRENCY if set, else WORKERS_PER_CPU per available CPU"""
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.getenv("WEB_CONCURRENCY")))
+    cpus = cpus or available_cpus()
+    workers = max(1, round(cpus * WORKERS_PER_CPU))
+    return min(workers, MAX_WORKERS) if MAX_WORKERS else workers
+
+
+def _installed(module_name: str) -> bool:
+    try:
+        __import__(module_name)
+    except ImportError:
+        return False
+    return True
+
+
+def event_loop() -> str:
+    return "uvloop" if _installed("uvloop") else "asyncio"
+
+
+def http_parser() -> str:
+    return "httptools" if _installed("httptools") else "h11"
+
+
+class UvicornWorker(_UvicornWorker):
+    """Uvicorn worker with explicit loop/parser selection and bounded draining"""
+
+    CONFIG_KWARGS = {
+        "loop": event_loop(),
+        "http": http_parser(),
+        # Stop waiting for stragglers (e.g. long bulk streams) a little before
+        # gunicorn's graceful_timeout kills the worker outright
+        "timeout_graceful_shutdown": max(1, GRACEFUL_TIMEOUT - 5),
+    }
+
+
+def post_fork():
+    """Run in each worker right after fork, before its event loop starts.
+
+    Pooled HTTP connections, SDK clients and gRPC channels are per worker;
+    anything that leaked into the preloaded master is dropped here. Nothing
+    is built here: the HTTP client belongs to the worker's event loop, which
+    does not exist yet. The lifespan warm-up (``app.api.warmup``) builds the
+    client, opens its connections and builds the SDK clients once the worker
+    is accepting connections, and ``/api/v1/health/ready`` answers 503 until
+    it is done.
+    """
+    from app.api import sdk, service
+
+    service._http_client = None
+    service._http_client_loop = None
+    sdk.reset()
+
+
+def describe() -> dict:
+    return {
+        "cpus": available_cpus(),
+        "workers": worker_count(),
+        "loop": event_loop(),
+        "http": http_parser(),
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+    }
@@ -0,0 +1,267 @@
+"""Seeded synthetic datasets for benchmarks.
+
+Generates breeders with a skewed number of pets, customers, and a skewed
+waitlist per pet. The same seed always produces the same dataset, record by
+record, so runs can be compared. Two outputs:
+
+- a fixtures file for the local stand-in services (``loadtest --fixtures``),
+  streamed to disk so 100k+ breeders do not need to fit in memory
+- POSTs through the composite API with bounded concurrency; customers and
+  waitlists have no composite route and are only written to fixtures
+
+    python -m app.scripts.datagen --breeders 100000 --out benchmarks/data/100k.json
+    python -m app.scripts.datagen --breeders 2000 --api http://localhost:8080 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.scripts.loadtest import summarize
+
+CITIES = [
+    "New York", "Los Angeles", "Paris", "Berlin", "Tokyo",
+    "Moscow", "Mumbai", "Sydney", "Rio de Janeiro", "Cape Town",
+]
+COUNTRIES = ["USA", "France", "Germany", "Japan", "Russia", "India", "Australia", "Brazil", "South Africa"]
+PRICE_LEVELS = ["low", "medium", "high"]
+# Weighted so dogs and cats dominate, as they do in practice
+PET_TYPES = ["dog"] * 5 + ["cat"] * 3 + ["rabbit", "parrot"]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "bel", "sto", "vin", "dor", "an", "el", "su"]
+
+
+@dataclass
+class DatasetSpec:
+    breeders: int = 1000
+    customers: int = 1000
+    # Pareto shape of pets per breeder: most have a few, some have dozens
+    pets_alpha: float = 1.5
+    max_pets: int = 60
+    # Pareto shape of waitlist length per pet (0 for most pets)
+    waitlist_alpha: float = 1.2
+    max_waitlist: int = 40
+    seed: int = 42
+
+
+def _name(rng: random.Random, parts: int = 2) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(parts)).capitalize()
+
+
+def customer_record(spec: DatasetSpec, index: int) -> dict:
+    return _customer(spec.seed, index)
+
+
+@functools.lru_cache(maxsize=1 << 17)
+def _customer(seed: int, index: int) -> dict:
+    rng = random.Random(f"{seed}:customer:{index}")
+    first, last = _name(rng), _name(rng, 3)
+    return {
+        "id": f"c{index}",
+        "name": f"{first} {last}",
+        "email": f"{first.lower()}.{last.lower()}{index}@example.com",
+    }
+
+
+def breeder_records(spec: DatasetSpec, index: int) -> Tuple[dict, List[dict], List[dict]]:
+    """Breeder ``index`` with its pets and their waitlist entries"""
+    rng = random.Random(f"{spec.seed}:breeder:{index}")
+    breeder_id = f"b{index}"
+    name = f"{_name(rng)} {rng.choice(['Kennels', 'Breeders', 'Farm', 'Pets'])}"
+    breeder = {
+        "id": breeder_id,
+        "name": name,
+        "breeder_city": rng.choice(CITIES),
+        "breeder_country": rng.choice(COUNTRIES),
+        "price_level": rng.choice(PRICE_LEVELS),
+        "breeder_address": f"{rng.randint(1, 999)} {_name(rng)} Street",
+        "email": f"{name.split()[0].lower()}{index}@example.com",
+    }
+
+    pets, waitlist = [], []
+    pet_count = min(spec.max_pets, int(rng.paretovariate(spec.pets_alpha)))
+    for p in range(pet_count):
+        pet_id = f"p{index}-{p}"
+        pet_type = rng.choice(PET_TYPES)
+        pets.append(
+            {
+                "id": pet_id,
+                "name": _name(rng),
+                "type": pet_type,
+                "price": round(rng.lognormvariate(6, 0.6), 2),
+                "breeder_id": breeder_id,
+                "image_url": None,
+            }
+        )
+        if spec.customers:
+            waiting = min(spec.max_waitlist, int(rng.paretovariate(spec.waitlist_alpha)) - 1)
+            for _ in range(waiting):
+                customer = customer_record(spec, rng.randrange(spec.customers))
+                waitlist.append({**customer, "pet_id": pet_id, "breeder_id": breeder_id})
+    return breeder, pets, waitlist
+
+
+# Fixtures
+
+
+def write_fixtures(spec: DatasetSpec, path: str) -> Dict[str, int]:
+    """Stream the dataset to a JSON file StandinStore.load understands.
+
+    Breeders go straight to ``path``; pets and waitlist entries are spooled
+    to temporary files in the same pass and appended after them.
+    """
+    counts = dict.fromkeys(("breeders", "pets", "customers", "waitlist"), 0)
+
+    def write(f, section: str, record: dict):
+        f.write(("," if counts[section] else "") + "\n" + json.dumps(record))
+        counts[section] += 1
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as out, tempfile.TemporaryFile("w+") as pets, tempfile.TemporaryFile(
+        "w+"
+    ) as waitlist:
+        out.write('{\n"breeders": [')
+        for index in range(spec.breeders):
+            breeder, breeder_pets, entries = breeder_records(spec, index)
+            write(out, "breeders", breeder)
+            for pet in breeder_pets:
+                write(pets, "pets", pet)
+            for entry in entries:
+                write(waitlist, "waitlist", entry)
+
+        out.write('\n],\n"pets": [')
+        pets.seek(0)
+        shutil.copyfileobj(pets, out)
+        out.write('\n],\n"customers": [')
+        for index in range(spec.customers):
+            write(out, "customers", customer_record(spec, index))
+        out.write('\n],\n"waitlist": [')
+        waitlist.seek(0)
+        shutil.copyfileobj(waitlist, out)
+        out.write("\n]\n}\n")
+    return counts
+
+
+# Composite API
+
+
+def composite_body(breeder: dict, pets: List[dict]) -> dict:
+    return {
+        "breeder": {key: value for key, value in breeder.items() if key != "id"},
+        "pets": [
+            {"name": pet["name"], "type": pet["type"], "price": pet["price"]}
+            for pet in pets
+        ],
+    }
+
+
+async def post_dataset(
+    client: httpx.AsyncClient, spec: DatasetSpec, concurrency: int = 16
+) -> dict:
+    """POST every breeder and its pets as a composite, ``concurrency`` at a time"""
+    indices = iter(range(spec.breeders))
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    pets_sent = 0
+
+    async def worker():
+        nonlocal pets_sent
+        for index in indices:
+            breeder, pets, _ = breeder_records(spec, index)
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/api/v1/composites/", json=composite_body(breeder, pets)
+                )
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "201":
+                pets_sent += len(pets)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(latencies, statuses, time.perf_counter() - started)
+    result["pets"] = pets_sent
+    return result
+
+
+def _token(args) -> Optional[str]:
+    if args.token:
+        return args.token
+    if os.getenv("JWT_SECRET_KEY"):
+        from app.api.auth import create_jwt_token
+
+        return create_jwt_token({"tokenId": "datagen"})["access_token"]
+    return None
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--breeders", type=int, default=1000)
+    parser.add_argument("--customers", type=int, default=None, help="default: same as breeders")
+    parser.add_argument("--pets-alpha", type=float, default=1.5)
+    parser.add_argument("--max-pets", type=int, default=60)
+    parser.add_argument("--waitlist-alpha", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="write a fixtures file")
+    parser.add_argument("--api", default=None, help="composite service base URL to POST to")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--token", default=os.getenv("DATAGEN_TOKEN"), help="bearer token for --api")
+    args = parser.parse_args(argv)
+    if not args.out and not args.api:
+        parser.error("pass --out and/or --api")
+
+    spec = DatasetSpec(
+        breeders=args.breeders,
+        customers=args.breeders if args.customers is None else args.customers,
+        pets_alpha=args.pets_alpha,
+        max_pets=args.max_pets,
+        waitlist_alpha=args.waitlist_alpha,
+        seed=args.seed,
+    )
+
+    if args.out:
+        started = time.perf_counter()
+        counts = write_fixtures(spec, args.out)
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        print(
+            f"Wrote {args.out}: "
+            + ", ".join(f"{count} {section}" for section, count in counts.items())
+            + f" in {elapsed:.1f}s ({total / elapsed:,.0f} records/s)"
+        )
+
+    if args.api:
+        token = _token(args)
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        limits = httpx.Limits(max_connections=args.concurrency)
+
+        async def run():
+            async with httpx.AsyncClient(
+                base_url=args.api, headers=headers, limits=limits, timeout=60
+            ) as client:
+                return await post_dataset(client, spec, args.concurrency)
+
+        result = asyncio.run(run())
+        latency = result["latency_ms"]
+        print(
+            f"POSTed {result['requests']} composites ({result['pets']} pets) "
+            f"rps={result['rps']} p50={latency['p50']}ms p99={latency['p99']}ms "
+            f"errors={result['errors']} statuses={result['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,7 @@ def generate_dummy_breeder():
 
     return {
         "name": name,
+        "email": f"{name.lower()}@example.com",
         "breeder_city": breeder_city,
         "breeder_country": breeder_country,
         "price_level": price_level,
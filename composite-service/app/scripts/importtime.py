@@ -0,0 +1,89 @@
+"""Startup-time report for the composite service, broken down by import.
+
+Runs ``python -X importtime`` on the app module in a fresh interpreter and
+aggregates the cumulative time by top-level package, so regressions in cold
+start (a new eager SDK import, say) show up before they reach Cloud Run::
+
+    python -m app.scripts.importtime
+    python -m app.scripts.importtime --module app.api.composites --top 15 --json
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(module: str = "app.main") -> List[dict]:
+    """Import ``module`` in a new interpreter and return one row per import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append(
+                {
+                    "module": name,
+                    "depth": len(indent) // 2,
+                    "self_ms": int(self_us) / 1000,
+                    "cumulative_ms": int(cumulative_us) / 1000,
+                }
+            )
+    return rows
+
+
+def by_package(rows: List[dict]) -> Dict[str, float]:
+    """Self time summed by top-level package (``google.cloud`` kept as one level deeper)"""
+    totals: Dict[str, float] = defaultdict(float)
+    for row in rows:
+        parts = row["module"].split(".")
+        package = ".".join(parts[:3] if parts[0] == "google" else parts[:1])
+        totals[package] += row["self_ms"]
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def report(module: str = "app.main", top: int = 20) -> dict:
+    rows = measure(module)
+    root = next(row for row in reversed(rows) if row["module"] == module)
+    return {
+        "module": module,
+        "total_ms": root["cumulative_ms"],
+        "packages": dict(list(by_package(rows).items())[:top]),
+        "slowest_imports": sorted(rows, key=lambda r: -r["self_ms"])[:top],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    result = report(args.module, args.top)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"import {result['module']}: {result['total_ms']:.1f}ms")
+    print("\nby package (self time):")
+    for package, ms in result["packages"].items():
+        print(f"  {ms:9.1f}ms  {package}")
+    print("\nslowest modules (self time):")
+    for row in result["slowest_imports"]:
+        print(f"  {row['self_ms']:9.1f}ms  {row['module']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,558 @@
+"""Reproducible load test for the composite service.
+
+Starts in-process stand-ins for the breeder, pet and customer services (and
+for Pub/Sub, Workflows and Lambda), forks composite-service workers that
+share one listening socket, drives each route at a fixed concurrency and
+writes latency percentiles, RPS and per-worker CPU/RSS to a JSON file.
+
+    python -m app.scripts.loadtest --concurrency 32 --duration 10 --workers 2
+    python -m app.scripts.loadtest --compare benchmarks/results/old.json
+    python -m app.scripts.loadtest --fixtures benchmarks/data/100k.json
+    python -m app.scripts.loadtest --faults breeder-503s --scenario composite_update_both
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from app.scripts.standins import StandinConfig, StandinStore, create_standin_app
+
+BENCH_JWT_SECRET = "loadtest-secret-key-for-the-composite-service"
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    # The smallest value with at least pct% of the values at or below it
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct * len(sorted_values) / 100) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], statuses: Dict[str, int], elapsed: float) -> dict:
+    """Latency percentiles (ms) and throughput for one scenario"""
+    ordered = sorted(latencies)
+    to_ms = lambda v: None if v is None else round(v * 1000, 3)
+    errors = sum(n for status, n in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "statuses": statuses,
+        "rps": round(len(ordered) / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": to_ms(percentile(ordered, 50)),
+            "p95": to_ms(percentile(ordered, 95)),
+            "p99": to_ms(percentile(ordered, 99)),
+            "mean": to_ms(sum(ordered) / len(ordered)) if ordered else None,
+            "max": to_ms(ordered[-1]) if ordered else None,
+        },
+    }
+
+
+# Process sampling
+
+
+def proc_sample(pid: int) -> Optional[dict]:
+    """CPU seconds and RSS of a process, read from /proc (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            rss_kb = next(
+                int(line.split()[1]) for line in f if line.startswith("VmRSS:")
+            )
+    except (OSError, StopIteration):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {
+        "cpu_seconds": (int(fields[11]) + int(fields[12])) / ticks,
+        "rss_mb": round(rss_kb / 1024, 2),
+    }
+
+
+# Servers
+
+
+def _listen(host: str = "127.0.0.1") -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, 0))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve(app, sock: socket.socket, loop: str = "auto"):
+    import uvicorn
+
+    config = uvicorn.Config(app, loop=loop, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    return server
+
+
+def load_fixtures(path: Optional[str]) -> Optional[dict]:
+    """Dataset written by app.scripts.datagen, or None to use the seeded one"""
+    if not path:
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _worker_main(
+    sock: socket.socket,
+    config: StandinConfig,
+    loop: str,
+    stats_queue,
+    fixtures: Optional[str] = None,
+):
+    """Entry point of a forked composite-service worker"""
+    from app.main import app
+    from app.scripts.standins import install_sdk_standins
+
+    # Per-request logging would dominate the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    install_sdk_standins(StandinStore(config, load_fixtures(fixtures)))
+    # uvicorn re-raises the captured SIGTERM on exit; make that a no-op so the
+    # worker can report its totals after a graceful shutdown
+    signal.signal(signal.SIGTERM, lambda *args: None)
+    _serve(app, sock, loop)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    stats_queue.put(
+        {
+            "pid": os.getpid(),
+            "cpu_seconds": usage.ru_utime + usage.ru_stime,
+            "max_rss_mb": round(usage.ru_maxrss / 1024, 2),
+        }
+    )
+
+
+class Harness:
+    """Stand-in services plus forked composite workers on a shared socket"""
+
+    def __init__(
+        self,
+        config: StandinConfig,
+        workers: int = 1,
+        loop: str = "auto",
+        faults: Optional[str] = None,
+        fixtures: Optional[str] = None,
+    ):
+        self.config = config
+        self.fixtures = fixtures
+        self.workers = workers
+        self.loop = loop
+        self.faults = faults
+        self.processes: List[multiprocessing.Process] = []
+        self.stats_queue = None
+        self._standin_server = None
+        self._standin_thread = None
+
+    def start(self):
+        standin_sock = _listen()
+        composite_sock = _listen()
+        standin_url = "http://%s:%d" % standin_sock.getsockname()
+        self.base_url = "http://%s:%d" % composite_sock.getsockname()
+
+        os.environ.update(
+            {
+                "BREEDER_SERVICE_URL": f"{standin_url}/api/v1/breeders",
+                "PET_SERVICE_URL": f"{standin_url}/api/v1/pets",
+                "CUSTOMER_SERVICE_URL": f"{standin_url}/api/v1/customers",
+                "URL_PREFIX": f"{self.base_url}/api/v1",
+                "JWT_SECRET_KEY": BENCH_JWT_SECRET,
+                "JWT_REFRESH_SECRET": BENCH_JWT_SECRET,
+                "JWT_ALGORITHM": "HS256",
+                "GCP_PROJECT_ID": "loadtest",
+                "FASTAPI_ENV": "production",
+            }
+        )
+        # Every scenario runs as one user; keep admission control in the path
+        # without letting the per-user limit cap the benchmark
+        os.environ.setdefault("RATE_LIMIT_RPS", "1000000")
+        os.environ.setdefault("RATE_LIMIT_BURST", "1000000")
+        if self.faults:
+            # Read by app.api.faults when the forked workers import the app
+            os.environ["FAULT_SCENARIO"] = self.faults
+
+        # Fork the workers before any thread is started in this process
+        context = multiprocessing.get_context("fork")
+        self.stats_queue = context.Queue()
+        for _ in range(self.workers):
+            process = context.Process(
+                target=_worker_main,
+                args=(composite_sock, self.config, self.loop, self.stats_queue, self.fixtures),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        composite_sock.close()
+
+        import uvicorn
+
+        self.store = StandinStore(self.config, load_fixtures(self.fixtures))
+        self._standin_server = uvicorn.Server(
+            uvicorn.Config(
+                create_standin_app(self.store), log_level="warning", access_log=False
+            )
+        )
+        self._standin_thread = threading.Thread(
+            target=self._standin_server.run, kwargs={"sockets": [standin_sock]}, daemon=True
+        )
+        self._standin_thread.start()
+        self._wait_ready()
+
+    def _wait_ready(self, timeout: float = 30):
+        """Until every worker has answered its readiness probe (the probes
+        land on whichever worker accepts them)
+        """
+        deadline = time.monotonic() + timeout
+        ready = set()
+        while time.monotonic() < deadline:
+            try:
+                r = httpx.get(f"{self.base_url}/api/v1/health/ready")
+                if r.status_code == 200:
+                    ready.add(r.json()["pid"])
+                    if len(ready) >= self.workers:
+                        return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.05)
+        if not ready:
+            raise RuntimeError("Composite workers did not become ready")
+
+    def sample_workers(self) -> Dict[int, Optional[dict]]:
+        return {p.pid: proc_sample(p.pid) for p in self.processes}
+
+    def stop(self) -> List[dict]:
+        for process in self.processes:
+            process.terminate()
+        stats = []
+        for process in self.processes:
+            process.join(timeout=10)
+            try:
+                stats.append(self.stats_queue.get(timeout=1))
+            except Exception:
+                pass
+        if self._standin_server is not None:
+            self._standin_server.should_exit = True
+            self._standin_thread.join(timeout=5)
+        return stats
+
+
+# Scenarios
+
+RequestFactory = Callable[[random.Random], dict]
+
+
+def build_scenarios(store: StandinStore) -> Dict[str, RequestFactory]:
+    """Request factories for every composite route, GraphQL and the webhook"""
+    breeder_ids = list(store.breeders)
+    pet_ids = list(store.pets)
+    customer_ids = list(store.customers)
+
+    def composite_body(rng: random.Random) -> dict:
+        return {
+            "breeder": {
+                "name": f"Bench {rng.randint(0, 10**6)}",
+                "breeder_city": "Paris",
+                "breeder_country": "France",
+                "price_level": "$$",
+                "breeder_address": "1 Bench Street",
+                "email": "bench@example.com",
+            },
+            "pets": [
+                {"name": f"Pet {i}", "type": "dog", "price": 100.0} for i in range(3)
+            ],
+        }
+
+    graphql_query = """
+        query ($breederId: String!) {
+          breederPetsWithWaitlist(breederId: $breederId) {
+            id name pets { id name waitlist { id consumer { name email } } }
+          }
+        }
+    """
+
+    return {
+        "composites_list": lambda rng: {
+            "method": "GET",
+            "url": "/api/v1/composites/",
+            "params": {"breeder_limit": 20, "pet_limit": 50},
+        },
+        "composite_breeder": lambda rng: {
+            "method": "GET",
+            "url": f"/api/v1/composites/{rng.choice(breeder_ids)}/",
+            "params": {"expand": "waitlist"},
+        },
+        "composite_create": lambda rng: {
+            "method": "POST",
+            "url": "/api/v1/composites/",
+            "json": composite_body(rng),
+        },
+        "composite_bulk": lambda rng: {
+            "method": "POST",
+            "url": "/api/v1/composites/bulk",
+            "json": [composite_body(rng) for _ in range(10)],
+        },
+        "composite_update_both": lambda rng: {
+            "method": "PUT",
+            "url": "/api/v1/composites/both/{}/{}/".format(
+                rng.choice(breeder_ids), rng.choice(pet_ids)
+            ),
+            "json": {"breeder": {"price_level": "$$"}, "pet": {"price": 120.0}},
+        },
+        "breeder_pubsub": lambda rng: {
+            "method": "GET",
+            "url": f"/api/v1/composites/breeders/id/{rng.choice(breeder_ids)}/",
+        },
+        "breeder_pubsub_batch": lambda rng: {
+            "method": "GET",
+            "url": "/api/v1/composites/breeders/ids",
+            "params": {"ids": ",".join(rng.sample(breeder_ids, min(20, len(breeder_ids))))},
+        },
+        "customer_workflow": lambda rng: {
+            "method": "GET",
+            "url": f"/api/v1/composites/customers/id/{rng.choice(customer_ids)}/",
+        },
+        "graphql_breeder_pets": lambda rng: {
+            "method": "POST",
+            "url": "/api/v1/graphql",
+            "json": {
+                "query": graphql_query,
+                "variables": {"breederId": rng.choice(breeder_ids)},
+            },
+        },
+        "webhook": lambda rng: {
+            "method": "POST",
+            "url": "/api/v1/composites/webhook",
+            "json": (
+                lambda pet_id: {
+                    "breeder_id": store.pets[pet_id]["breeder_id"],
+                    "pet_id": pet_id,
+                    "consumer_id": rng.choice(customer_ids),
+                }
+            )(rng.choice(pet_ids)),
+        },
+    }
+
+
+async def run_scenario(
+    base_url: str,
+    headers: dict,
+    factory: RequestFactory,
+    concurrency: int,
+    duration: float,
+    max_requests: Optional[int],
+    seed: int,
+) -> dict:
+    """Drive one scenario with ``concurrency`` closed-loop clients"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=60
+    ) as client:
+
+        async def user(index: int):
+            rng = random.Random(seed * 1000 + index)
+            while time.perf_counter() < deadline:
+                if max_requests is not None and len(latencies) >= max_requests:
+                    return
+                spec = factory(rng)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(**spec)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(latencies, statuses, elapsed)
+
+
+def compare(previous: dict, current: dict) -> List[str]:
+    """Human-readable deltas between two result files"""
+    lines = []
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        parts = []
+        for key in ("p50", "p95", "p99"):
+            old, new = before["latency_ms"][key], result["latency_ms"][key]
+            if old and new:
+                parts.append(f"{key} {old:.1f}->{new:.1f}ms ({(new - old) / old:+.0%})")
+        if before.get("rps") and result.get("rps"):
+            parts.append(
+                f"rps {before['rps']:.0f}->{result['rps']:.0f} "
+                f"({(result['rps'] - before['rps']) / before['rps']:+.0%})"
+            )
+        lines.append(f"{name}: " + ", ".join(parts))
+    return lines
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_latency(values: List[str]) -> Dict[str, float]:
+    latency = StandinConfig().latency_ms
+    for value in values or []:
+        service, ms = value.split("=")
+        latency[service] = float(ms)
+    return latency
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--requests", type=int, default=None, help="cap per scenario")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--loop", default="auto", choices=["auto", "asyncio", "uvloop"])
+    parser.add_argument("--scenario", action="append", help="run only these scenarios")
+    parser.add_argument(
+        "--latency", action="append", metavar="SERVICE=MS",
+        help="mean latency per stand-in (breeder, pet, customer, pubsub, workflows, lambda)",
+    )
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument(
+        "--faults", default=None, metavar="SCENARIO",
+        help="fault scenario file, or the name of one in app/scripts/scenarios",
+    )
+    parser.add_argument("--breeders", type=int, default=200)
+    parser.add_argument("--pets-per-breeder", type=int, default=5)
+    parser.add_argument("--payload-bytes", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--fixtures", default=None, help="dataset from app.scripts.datagen instead of the seeded one"
+    )
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--output", default="benchmarks/results")
+    parser.add_argument("--compare", default=None, help="previous result file")
+    args = parser.parse_args(argv)
+
+    config = StandinConfig(
+        latency_ms=parse_latency(args.latency),
+        jitter=args.jitter,
+        breeders=args.breeders,
+        pets_per_breeder=args.pets_per_breeder,
+        payload_bytes=args.payload_bytes,
+        seed=args.seed,
+    )
+    harness = Harness(
+        config, workers=args.workers, loop=args.loop, faults=args.faults, fixtures=args.fixtures
+    )
+    harness.start()
+
+    from app.api.auth import create_jwt_token
+
+    token = create_jwt_token({"tokenId": "loadtest"})["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    scenarios = build_scenarios(harness.store)
+    selected = args.scenario or list(scenarios)
+    results = {}
+    try:
+        for name in selected:
+            before = harness.sample_workers()
+            result = asyncio.run(
+                run_scenario(
+                    harness.base_url,
+                    headers,
+                    scenarios[name],
+                    args.concurrency,
+                    args.duration,
+                    args.requests,
+                    args.seed,
+                )
+            )
+            after = harness.sample_workers()
+            result["workers"] = [
+                {
+                    "pid": pid,
+                    "cpu_seconds": round(after[pid]["cpu_seconds"] - before[pid]["cpu_seconds"], 3),
+                    "rss_mb": after[pid]["rss_mb"],
+                }
+                for pid in after
+                if before.get(pid) and after.get(pid)
+            ]
+            results[name] = result
+            latency = result["latency_ms"]
+            print(
+                f"{name:24s} rps={result['rps']:>8} p50={latency['p50']}ms "
+                f"p95={latency['p95']}ms p99={latency['p99']}ms errors={result['errors']}"
+            )
+    finally:
+        worker_totals = harness.stop()
+
+    report = {
+        "meta": {
+            "label": args.label,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "workers": args.workers,
+            "loop": args.loop,
+            "standins": asdict(config),
+            "faults": args.faults,
+            "fixtures": args.fixtures,
+        },
+        "scenarios": results,
+        "worker_totals": worker_totals,
+    }
+
+    if args.output.endswith(".json"):
+        path = args.output
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(args.output, f"{stamp}-{args.label or 'run'}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            for line in compare(json.load(f), report):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""In-process stand-ins for the composite service's dependencies.
+
+``create_standin_app`` serves the breeder, pet and customer REST APIs from
+memory with configurable latency and payload sizes. ``install_sdk_standins``
+replaces the Pub/Sub, Workflows and Lambda SDKs loaded through
+``app.api.sdk`` with fakes that answer from the same data.
+"""
+
+import asyncio
+import io
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+
+CITIES = ["New York", "Los Angeles", "Paris", "Berlin", "Tokyo", "Sydney"]
+COUNTRIES = ["USA", "France", "Germany", "Japan", "Australia"]
+PET_TYPES = ["dog", "cat", "rabbit", "parrot"]
+
+
+@dataclass
+class StandinConfig:
+    """Shape of the simulated downstream services"""
+
+    # Mean latency per service in milliseconds; jitter is uniform +/- that fraction
+    latency_ms: Dict[str, float] = field(
+        default_factory=lambda: {
+            "breeder": 10.0,
+            "pet": 10.0,
+            "customer": 10.0,
+            "pubsub": 20.0,
+            "workflows": 50.0,
+            "lambda": 30.0,
+        }
+    )
+    jitter: float = 0.2
+    breeders: int = 200
+    pets_per_breeder: int = 5
+    customers: int = 200
+    waitlist_per_pet: int = 2
+    # Extra bytes added to every record to simulate larger payloads
+    payload_bytes: int = 0
+    seed: int = 42
+
+    def delay(self, service: str) -> float:
+        mean = self.latency_ms.get(service, 0.0) / 1000
+        if mean <= 0:
+            return 0.0
+        return max(0.0, mean * (1 + random.uniform(-self.jitter, self.jitter)))
+
+
+class StandinStore:
+    """Seeded in-memory data shared by the HTTP and SDK stand-ins"""
+
+    def __init__(self, config: StandinConfig, fixtures: Optional[dict] = None):
+        self.config = config
+        self.breeders: Dict[str, dict] = {}
+        self.pets: Dict[str, dict] = {}
+        self.customers: Dict[str, dict] = {}
+        self.waitlists: Dict[str, List[dict]] = {}
+        self._ids = itertools.count()
+        if fixtures is not None:
+            self.load(fixtures)
+        else:
+            self.seed()
+
+    def padding(self) -> str:
+        return "x" * self.config.payload_bytes
+
+    def seed(self):
+        rng = random.Random(self.config.seed)
+        for c in range(self.config.customers):
+            self.customers[f"c{c}"] = {
+                "id": f"c{c}",
+                "name": f"Customer {c}",
+                "email": f"customer{c}@example.com",
+            }
+        customer_ids = list(self.customers)
+        for b in range(self.config.breeders):
+            breeder_id = f"b{b}"
+            self.breeders[breeder_id] = {
+                "id": breeder_id,
+                "name": f"Breeder {b}",
+                "breeder_city": rng.choice(CITIES),
+                "breeder_country": rng.choice(COUNTRIES),
+                "price_level": rng.choice(["$", "$$", "$$$"]),
+                "breeder_address": f"{b} Test Street",
+                "email": f"breeder{b}@example.com",
+            }
+            waitlist = self.waitlists.setdefault(breeder_id, [])
+            for p in range(self.config.pets_per_breeder):
+                pet_id = f"p{b}-{p}"
+                self.pets[pet_id] = {
+                    "id": pet_id,
+                    "name": f"Pet {b}-{p}",
+                    "type": rng.choice(PET_TYPES),
+                    "price": round(rng.uniform(50, 2000), 2),
+                    "breeder_id": breeder_id,
+                    "image_url": None,
+                }
+                for _ in range(self.config.waitlist_per_pet):
+                    customer = self.customers[rng.choice(customer_ids)]
+                    waitlist.append({**customer, "pet_id": pet_id})
+
+    def load(self, fixtures: dict):
+        """Load data written by the synthetic data generator"""
+        self.breeders = {b["id"]: b for b in fixtures.get("breeders", [])}
+        self.pets = {p["id"]: p for p in fixtures.get("pets", [])}
+        self.customers = {c["id"]: c for c in fixtures.get("customers", [])}
+        self.waitlists = {}
+        for entry in fixtures.get("waitlist", []):
+            self.waitlists.setdefault(entry["breeder_id"], []).append(entry)
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}-{next(self._ids)}-{uuid.uuid4().hex[:8]}"
+
+    def render(self, record: dict) -> dict:
+        if self.config.payload_bytes:
+            return {**record, "description": self.padding()}
+        return record
+
+
+def _page(items: list, request: Request) -> list:
+    offset = int(request.query_params.get("offset") or 0)
+    limit = request.query_params.get("limit")
+    if limit is not None:
+        return items[offset : offset + int(limit)]
+    return items[offset:]
+
+
+def create_standin_app(store: StandinStore) -> FastAPI:
+    """Breeder, pet and customer services served from one in-memory app"""
+    app = FastAPI()
+    config = store.config
+
+    @app.middleware("http")
+    async def simulate_latency(request: Request, call_next):
+        service = request.url.path.split("/")[3] if request.url.path.count("/") >= 3 else ""
+        await asyncio.sleep(config.delay(service.rstrip("s")))
+        return await call_next(request)
+
+    for service in ("breeders", "pets", "customers"):
+
+        @app.get(f"/api/v1/{service}/openapi.json")
+        async def openapi():
+            return {"openapi": "3.1.0"}
+
+    @app.get("/api/v1/breeders/")
+    async def list_breeders(request: Request):
+        items = list(store.breeders.values())
+        city = request.query_params.get("breeder_city")
+        if city:
+            items = [b for b in items if b["breeder_city"] == city]
+        return {"data": [store.render(b) for b in _page(items, request)], "links": []}
+
+    @app.post("/api/v1/breeders/", status_code=201)
+    async def create_breeder(payload: dict):
+        breeder = {**payload, "id": store.new_id("b")}
+        store.breeders[breeder["id"]] = breeder
+        return store.render(breeder)
+
+    @app.get("/api/v1/breeders/{breeder_id}/")
+    async def get_breeder(breeder_id: str):
+        if breeder_id not in store.breeders:
+            raise HTTPException(status_code=404, detail="Breeder not found")
+        return store.render(store.breeders[breeder_id])
+
+    @app.put("/api/v1/breeders/{breeder_id}/")
+    async def update_breeder(breeder_id: str, payload: dict):
+        if breeder_id not in store.breeders:
+            raise HTTPException(status_code=404, detail="Breeder not found")
+        store.breeders[breeder_id].update(payload)
+        return store.render(store.breeders[breeder_id])
+
+    @app.get("/api/v1/pets/")
+    async def list_pets(request: Request):
+        items = list(store.pets.values())
+        pet_type = request.query_params.get("type")
+        if pet_type:
+            items = [p for p in items if p["type"] == pet_type]
+        breeder_id = request.query_params.get("breeder_id")
+        if breeder_id:
+            items = [p for p in items if p["breeder_id"] == breeder_id]
+        return {"data": [store.render(p) for p in _page(items, request)], "links": []}
+
+    @app.post("/api/v1/pets/", status_code=201)
+    async def create_pet(payload: dict):
+        pet = {**payload, "id": store.new_id("p"), "links": []}
+        store.pets[pet["id"]] = pet
+        return store.render(pet)
+
+    @app.get("/api/v1/pets/{pet_id}/")
+    async def get_pet(pet_id: str):
+        if pet_id not in store.pets:
+            raise HTTPException(status_code=404, detail="Pet not found")
+        return store.render(store.pets[pet_id])
+
+    @app.put("/api/v1/pets/{pet_id}/")
+    async def update_pet(pet_id: str, payload: dict):
+        if pet_id not in store.pets:
+            raise HTTPException(status_code=404, detail="Pet not found")
+        store.pets[pet_id].update(payload)
+        return store.render(store.pets[pet_id])
+
+    @app.get("/api/v1/customers/breeder/{breeder_id}/waitlist")
+    async def get_waitlist(breeder_id: str):
+        return store.waitlists.get(breeder_id, [])
+
+    @app.get("/api/v1/customers/{customer_id}/")
+    async def get_customer(customer_id: str):
+        if customer_id not in store.customers:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        return store.render(store.customers[customer_id])
+
+    return app
+
+
+# SDK stand-ins
+
+
+class _FakeCredentials:
+    @staticmethod
+    def from_service_account_file(*args, **kwargs):
+        return object()
+
+
+class FakePubSubBroker:
+    """Request topic plus reply subscription answered like the breeder service"""
+
+    def __init__(self, store: StandinStore, lease_seconds: float = 1.0):
+        self.store = store
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        # ack_id -> [ready_at, payload bytes]
+        self._messages: Dict[str, list] = {}
+
+    def publish(self, data: bytes) -> str:
+        request = json.loads(data.decode("utf-8"))
+        ready_at = time.monotonic() + self.store.config.delay("pubsub")
+        breeder_ids = request.get("breeder_ids") or [request.get("breeder_id")]
+        with self._lock:
+            for breeder_id in breeder_ids:
+                reply = {
+                    "correlation_id": request.get("correlation_id"),
+                    "breeder_id": breeder_id,
+                    "breeder_data": self.store.breeders.get(breeder_id),
+                }
+                self._messages[uuid.uuid4().hex] = [
+                    ready_at,
+                    json.dumps(reply).encode("utf-8"),
+                ]
+        return uuid.uuid4().hex
+
+    def pull(self, max_messages: int) -> list:
+        now = time.monotonic()
+        received = []
+        with self._lock:
+            for ack_id, message in self._messages.items():
+                if message[0] <= now:
+                    # Unacknowledged messages are redelivered after the lease
+                    message[0] = now + self.lease_seconds
+                    received.append(
+                        SimpleNamespace(
+                            ack_id=ack_id, message=SimpleNamespace(data=message[1])
+                        )
+                    )
+                    if len(received) >= max_messages:
+                        break
+        return received
+
+    def acknowledge(self, ack_ids: list):
+        with self._lock:
+            for ack_id in ack_ids:
+                self._messages.pop(ack_id, None)
+
+    def nack(self, ack_ids: list):
+        with self._lock:
+            for ack_id in ack_ids:
+                if ack_id in self._messages:
+                    self._messages[ack_id][0] = time.monotonic()
+
+
+class _ResolvedFuture:
+    def __init__(self, value):
+        self._value = value
+
+    def result(self, timeout=None):
+        return self._value
+
+
+def make_pubsub_clients(broker: FakePubSubBroker):
+    class FakePublisherClient:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def publish(self, topic, data, **attributes):
+            return _ResolvedFuture(broker.publish(data))
+
+    class FakeSubscriberClient:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def close(self):
+            pass
+
+        def pull(self, request=None, **kwargs):
+            request = request or kwargs
+            return SimpleNamespace(
+                received_messages=broker.pull(request.get("max_messages", 10))
+            )
+
+        def acknowledge(self, request=None, **kwargs):
+            request = request or kwargs
+            broker.acknowledge(request["ack_ids"])
+
+        def modify_ack_deadline(self, request=None, **kwargs):
+            request = request or kwargs
+            if request["ack_deadline_seconds"] == 0:
+                broker.nack(request["ack_ids"])
+
+    return FakePublisherClient, FakeSubscriberClient
+
+
+class _ExecutionState:
+    ACTIVE = 1
+    SUCCEEDED = 2
+    FAILED = 3
+
+
+class FakeExecution:
+    State = _ExecutionState
+
+
+def make_workflow_clients(store: StandinStore):
+    executions: Dict[str, SimpleNamespace] = {}
+
+    class FakeExecutionsAsyncClient:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def create_execution(self, request=None, **kwargs):
+            request = request or kwargs
+            argument = json.loads(request["execution"]["argument"])
+            customer = store.customers.get(argument["customer_id"])
+            if customer is None:
+                result = {"code": 404, "message": "Customer not found"}
+            else:
+                result = {"code": 200, "data": store.render(customer)}
+            name = f"{request['parent']}/executions/{uuid.uuid4().hex}"
+            executions[name] = SimpleNamespace(
+                name=name,
+                ready_at=time.monotonic() + store.config.delay("workflows"),
+                result=json.dumps(result),
+                error=None,
+            )
+            return SimpleNamespace(name=name, state=_ExecutionState.ACTIVE)
+
+        async def get_execution(self, request=None, **kwargs):
+            request = request or kwargs
+            execution = executions[request["name"]]
+            if time.monotonic() < execution.ready_at:
+                return SimpleNamespace(name=execution.name, state=_ExecutionState.ACTIVE)
+            executions.pop(request["name"], None)
+            return SimpleNamespace(
+                name=execution.name,
+                state=_ExecutionState.SUCCEEDED,
+                result=execution.result,
+                error=None,
+            )
+
+    class FakeWorkflowsClient:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        @staticmethod
+        def workflow_path(project, location, workflow):
+            return f"projects/{project}/locations/{location}/workflows/{workflow}"
+
+    return FakeExecutionsAsyncClient, FakeWorkflowsClient
+
+
+class FakeLambdaClient:
+    """Synchronous boto3-style Lambda client that always sends the email"""
+
+    def __init__(self, store: StandinStore):
+        self.store = store
+        self.invocations = []
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        time.sleep(self.store.config.delay("lambda"))
+        self.invocations.append(json.loads(Payload))
+        body = json.dumps({"statusCode": 200, "body": "Email sent"})
+        return {"StatusCode": 200, "Payload": io.BytesIO(body.encode("utf-8"))}
+
+
+def install_sdk_standins(store: StandinStore) -> SimpleNamespace:
+    """Provide fake Pub/Sub, Workflows, OAuth and boto3 modules to app.api.sdk"""
+    from app.api import sdk
+
+    broker = FakePubSubBroker(store)
+    publisher_cls, subscriber_cls = make_pubsub_clients(broker)
+    executions_cls, workflows_cls = make_workflow_clients(store)
+    lambda_client = FakeLambdaClient(store)
+
+    sdk.provide(
+        "google.oauth2.service_account",
+        SimpleNamespace(Credentials=_FakeCredentials),
+    )
+    sdk.provide(
+        "google.cloud.pubsub_v1",
+        SimpleNamespace(PublisherClient=publisher_cls, SubscriberClient=subscriber_cls),
+    )
+    sdk.provide(
+        "google.cloud.workflows.executions_v1",
+        SimpleNamespace(ExecutionsAsyncClient=executions_cls, Execution=FakeExecution),
+    )
+    sdk.provide("google.cloud.workflows_v1", SimpleNamespace(WorkflowsClient=workflows_cls))
+    sdk.provide("boto3", SimpleNamespace(client=lambda *args, **kwargs: lambda_client))
+
+    return SimpleNamespace(pubsub=broker, lambda_client=lambda_client)
@@ -1,10 +1,19 @@
 # conftest.py
+import os
+
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-for-the-composite-service")
+os.environ.setdefault("JWT_REFRESH_SECRET", "test-refresh-secret-for-the-composite-service")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("BREEDER_SERVICE_URL", "http://breeder.test/api/v1/breeders")
+os.environ.setdefault("PET_SERVICE_URL", "http://pet.test/api/v1/pets")
+os.environ.setdefault("CUSTOMER_SERVICE_URL", "http://customer.test/api/v1/customers")
+
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from databases import Database
 from app.api.db import metadata, engine
-import os
 
 # Override DATABASE_URI for testing
 TEST_DATABASE_URL = "sqlite:///file:mem.db?mode=memory&cache=shared&uri=true"
@@ -62,3 +71,81 @@ async def cleanup_database(test_database):
     """Clean up the database between tests"""
     yield
     await test_database.execute("DELETE FROM breeders")
+    await test_database.execute("DELETE FROM pets")
+
+
+@pytest.fixture(autouse=True)
+def fresh_admission(monkeypatch):
+    """Give every test its own rate-limit buckets and in-flight counters"""
+    from app.api import admission
+
+    monkeypatch.setattr(admission, "controller", admission.AdmissionController())
+
+
+@pytest.fixture(autouse=True)
+def fresh_revocations(monkeypatch, tmp_path):
+    """Give every test its own revocation log"""
+    from app.api import revocation
+
+    revocations = revocation.RevocationList(str(tmp_path / "revocations.db"))
+    monkeypatch.setattr(revocation, "revocations", revocations)
+    yield revocations
+    revocations.stop()
+
+
+@pytest.fixture(autouse=True)
+def fresh_shared_cache(monkeypatch, tmp_path):
+    """Give every test its own shared cache tier"""
+    from app.api import shared_cache
+
+    cache = shared_cache.SQLiteSharedCache(str(tmp_path / "shared-cache.db"))
+    monkeypatch.setattr(shared_cache, "cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_bulkheads(monkeypatch):
+    """Give every test its own downstream bulkheads"""
+    from app.api import bulkhead
+
+    monkeypatch.setattr(bulkhead, "bulkheads", {})
+
+
+@pytest.fixture
+def auth_headers():
+    """Bearer header for a valid access token"""
+    from app.api.auth import create_jwt_token
+
+    token = create_jwt_token({"tokenId": "test-user"})["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+class FakeDownstream:
+    """In-memory stand-in for the breeder, pet and customer services"""
+
+    def __init__(self):
+        self.requests = []
+        self.handler = lambda request: httpx.Response(404)
+
+    def __call__(self, request: httpx.Request):
+        self.requests.append(request)
+        return self.handler(request)
+
+
+@pytest.fixture
+def downstream(monkeypatch):
+    """Route the shared downstream client to a FakeDownstream handler"""
+    from app.api import service
+
+    fake = FakeDownstream()
+    monkeypatch.setattr(service, "build_base_transport", lambda: httpx.MockTransport(fake))
+    monkeypatch.setattr(service, "_http_client", None)
+    return fake
+
+
+@pytest.fixture
+async def api_client(test_app):
+    """Async client calling the app in-process"""
+    transport = httpx.ASGITransport(app=test_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
@@ -0,0 +1,102 @@
+import httpx
+import pytest
+
+from app.api import admission, auth
+from app.api.admission import AdmissionController
+
+
+def test_token_bucket_refills_and_evicts_lru():
+    controller = AdmissionController(rate=1, burst=2, max_keys=2, max_in_flight=10)
+
+    assert controller.check_rate("a", 1, now=0) == 0
+    assert controller.check_rate("a", 1, now=0) == 0
+    assert controller.check_rate("a", 1, now=0) == pytest.approx(1.0)
+    assert controller.check_rate("a", 1, now=1.0) == 0
+
+    controller.check_rate("b", 1, now=1.0)
+    controller.check_rate("c", 1, now=1.0)
+    assert list(controller.buckets) == ["b", "c"]
+
+
+def test_lower_priority_classes_shed_first():
+    controller = AdmissionController(max_in_flight=10)
+    for _ in range(7):
+        controller.acquire("read")
+
+    assert not controller.has_capacity("graphql")
+    assert controller.has_capacity("read")
+
+    controller.acquire("read")
+    assert not controller.has_capacity("read")
+    assert controller.has_capacity("write")
+    assert controller.has_capacity("webhook")
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_per_token_id(api_client, auth_headers, downstream, monkeypatch):
+    """Requests over the per-user budget get 429 before any downstream call"""
+    monkeypatch.setattr(
+        admission, "controller", AdmissionController(rate=0.001, burst=2, max_in_flight=10)
+    )
+    downstream.handler = lambda request: httpx.Response(200, json={"data": []})
+
+    for _ in range(2):
+        response = await api_client.get("/api/v1/composites/", headers=auth_headers)
+        assert response.status_code == 200
+    calls = len(downstream.requests)
+
+    response = await api_client.get("/api/v1/composites/", headers=auth_headers)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert len(downstream.requests) == calls
+
+    # A different tokenId has its own bucket
+    other = auth.create_jwt_token({"tokenId": "other-user"})["access_token"]
+    response = await api_client.get(
+        "/api/v1/composites/", headers={"Authorization": f"Bearer {other}"}
+    )
+    assert response.status_code == 200
+    assert admission.requests_total.get(**{"class": "read", "outcome": "rate_limited"}) >= 1
+
+
+@pytest.mark.asyncio
+async def test_slot_released_when_body_is_never_sent(monkeypatch):
+    """A client that goes away before the streamed body is read frees its slot"""
+    controller = AdmissionController(max_in_flight=10)
+    monkeypatch.setattr(admission, "controller", controller)
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"partial", "more_body": True})
+
+    async def gone(message):
+        raise OSError("client disconnected")
+
+    middleware = admission.AdmissionMiddleware(streaming_app)
+    scope = {"type": "http", "method": "POST", "path": "/api/v1/composites/bulk",
+             "headers": [], "query_string": b"", "client": ("10.0.0.1", 1)}
+    with pytest.raises(OSError):
+        await middleware(scope, None, gone)
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_graphql_rate_limited_per_token(api_client, auth_headers, monkeypatch):
+    """GraphQL skips JWTMiddleware but is still keyed by the caller's token"""
+    monkeypatch.setattr(
+        admission, "controller", AdmissionController(rate=0.001, burst=2, max_in_flight=10)
+    )
+    query = {"query": "{ __typename }"}
+
+    response = await api_client.post("/api/v1/graphql", json=query, headers=auth_headers)
+    assert response.status_code == 200
+    response = await api_client.post("/api/v1/graphql", json=query, headers=auth_headers)
+    assert response.status_code == 429
+
+    # Same address, another token: its own bucket
+    other = auth.create_jwt_token({"tokenId": "other-user"})["access_token"]
+    response = await api_client.post(
+        "/api/v1/graphql", json=query, headers={"Authorization": f"Bearer {other}"}
+    )
+    assert response.status_code == 200
+    assert admission.controller.in_flight == 0
@@ -0,0 +1,91 @@
+import httpx
+import pytest
+
+from app.api import auth, composites
+
+BREEDER = {"id": "b1", "name": "Acme", "breeder_city": "Paris", "breeder_country": "France",
+           "price_level": "$", "breeder_address": "1 Rue", "email": "a@x.io"}
+PETS = [
+    {"id": "p1", "name": "Rex", "type": "dog", "price": 80.0, "breeder_id": "b1"},
+    {"id": "p2", "name": "Tom", "type": "cat", "price": 50.0, "breeder_id": "b2"},
+]
+WAITLIST = [{"id": "c1", "name": "Ann", "email": "ann@x.io", "pet_id": "p1", "breeder_id": "b1"}]
+
+
+@pytest.fixture
+def services(downstream):
+    for cache in (composites.breeder_cache, composites.breeder_pets_cache, composites.waitlist_cache):
+        cache.entries.clear()
+
+    def handler(request: httpx.Request):
+        path = request.url.path
+        if path == "/api/v1/breeders/b1/":
+            return httpx.Response(200, json=BREEDER)
+        if path == "/api/v1/pets/":
+            return httpx.Response(200, json={"data": PETS})
+        if path == "/api/v1/customers/breeder/b1/waitlist":
+            return httpx.Response(200, json=WAITLIST)
+        return httpx.Response(404)
+
+    downstream.handler = handler
+    return downstream
+
+
+@pytest.mark.asyncio
+async def test_cached_and_conditional_reads(api_client, auth_headers, services):
+    """The second read comes from the entity caches, and a matching ETag is a 304"""
+    first = await api_client.get("/api/v1/composites/b1/", headers=auth_headers)
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "miss"
+    assert first.json()["breeder"]["name"] == "Acme"
+    assert [pet["id"] for pet in first.json()["pets"]] == ["p1"]
+    assert "waitlist" not in first.json()
+    assert len(services.requests) == 2
+
+    second = await api_client.get("/api/v1/composites/b1/", headers=auth_headers)
+    assert second.headers["X-Cache"] == "hit"
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert len(services.requests) == 2
+
+    not_modified = await api_client.get(
+        "/api/v1/composites/b1/",
+        headers={**auth_headers, "If-None-Match": first.headers["ETag"]},
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+@pytest.mark.asyncio
+async def test_waitlist_expansion_and_missing_breeder(api_client, auth_headers, services):
+    response = await api_client.get(
+        "/api/v1/composites/b1/", params={"expand": "waitlist"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["waitlist"][0]["pet_id"] == "p1"
+
+    missing = await api_client.get("/api/v1/composites/nope/", headers=auth_headers)
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_entries_are_per_caller(api_client, auth_headers, services, fresh_shared_cache):
+    """Another token holder never gets what was loaded with someone else's token"""
+    params = {"expand": "waitlist"}
+    await api_client.get("/api/v1/composites/b1/", params=params, headers=auth_headers)
+    calls = len(services.requests)
+
+    # Not even from the shared tier after this worker's entries are gone
+    for cache in (composites.breeder_cache, composites.breeder_pets_cache, composites.waitlist_cache):
+        cache.entries.clear()
+    other = auth.create_jwt_token({"tokenId": "other-user"})["access_token"]
+    response = await api_client.get(
+        "/api/v1/composites/b1/", params=params, headers={"Authorization": f"Bearer {other}"}
+    )
+    assert response.headers["X-Cache"] == "miss"
+    assert len(services.requests) == calls + 3
+    assert all(r.headers["Authorization"] == f"Bearer {other}" for r in services.requests[calls:])
+
+    # An update drops the entity for every caller
+    composites.breeder_cache.invalidate_group("b1")
+    assert composites.breeder_cache.entries.keys() == []
+    assert fresh_shared_cache.get("breeder", ("b1", "user:test-user")) is None
@@ -0,0 +1,145 @@
+import json
+
+import httpx
+import pytest
+
+
+def make_composite(name, pets=1, email="breeder@example.com"):
+    breeder = {
+        "name": name,
+        "breeder_city": "Paris",
+        "breeder_country": "France",
+        "price_level": "$$",
+        "breeder_address": "1 Rue Test",
+    }
+    if email:
+        breeder["email"] = email
+    return {
+        "breeder": breeder,
+        "pets": [{"name": f"{name}-pet-{i}", "type": "dog", "price": 10.0} for i in range(pets)],
+    }
+
+
+@pytest.fixture
+def services(downstream):
+    """Breeder and pet stand-ins; breeders named "broken" are rejected"""
+    counter = {"n": 0}
+
+    def handler(request: httpx.Request):
+        if request.url.path.endswith("openapi.json"):
+            return httpx.Response(200, json={})
+        body = json.loads(request.content)
+        counter["n"] += 1
+        if request.url.host == "breeder.test":
+            if body["name"] == "broken":
+                return httpx.Response(500, json={"detail": "boom"})
+            return httpx.Response(201, json={**body, "id": f"b{counter['n']}"})
+        return httpx.Response(
+            201, json={**body, "id": f"p{counter['n']}", "links": []}
+        )
+
+    downstream.handler = handler
+    return downstream
+
+
+@pytest.mark.asyncio
+async def test_bulk_json_array(api_client, auth_headers, services):
+    """Each item gets its own status line, including validation and downstream errors"""
+    items = [
+        make_composite("one", pets=2),
+        make_composite("missing-email", email=None),
+        make_composite("broken"),
+    ]
+    response = await api_client.post(
+        "/api/v1/composites/bulk", json=items, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    results = {r["index"]: r for r in map(json.loads, response.text.splitlines())}
+    assert results[0]["status"] == 201
+    assert len(results[0]["pet_ids"]) == 2
+    assert results[1]["status"] == 422
+    assert results[2]["status"] == 500
+
+    # The warm-up runs once per batch, not once per item
+    warm_ups = [r for r in services.requests if r.url.path.endswith("openapi.json")]
+    assert len(warm_ups) == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_ndjson_stream(api_client, auth_headers, services):
+    """NDJSON bodies are processed line by line"""
+    body = "\n".join(json.dumps(make_composite(f"b{i}")) for i in range(25)) + "\n"
+    response = await api_client.post(
+        "/api/v1/composites/bulk",
+        content=body,
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(r["index"] for r in results) == list(range(25))
+    assert all(r["status"] == 201 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_bulk_downstream_unavailable(api_client, auth_headers, downstream):
+    """A failed warm-up rejects the whole batch before any item is processed"""
+    downstream.handler = lambda request: httpx.Response(503)
+    response = await api_client.post(
+        "/api/v1/composites/bulk", json=[make_composite("one")], headers=auth_headers
+    )
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_bulk_over_the_limit(api_client, auth_headers, services, monkeypatch):
+    """Too long an array creates nothing; too long a stream says where it stopped"""
+    from app.api import composites
+
+    monkeypatch.setattr(composites, "BULK_MAX_ITEMS", 2)
+    items = [make_composite(f"b{i}") for i in range(3)]
+    response = await api_client.post(
+        "/api/v1/composites/bulk", json=items, headers=auth_headers
+    )
+    assert response.status_code == 413
+    assert not [r for r in services.requests if r.method == "POST"]
+
+    response = await api_client.post(
+        "/api/v1/composites/bulk",
+        content="\n".join(map(json.dumps, items)),
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["status"] for r in results] == [201, 201, 413]
+    assert results[-1]["index"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_pet_reports_the_created_breeder(api_client, auth_headers, downstream):
+    """A breeder whose pets could not all be created is not left unaccounted for"""
+
+    def handler(request: httpx.Request):
+        if request.url.path.endswith("openapi.json"):
+            return httpx.Response(200, json={})
+        body = json.loads(request.content)
+        if request.url.host == "breeder.test":
+            return httpx.Response(201, json={**body, "id": "b1"})
+        if body["name"].endswith("-1"):
+            return httpx.Response(500, json={"detail": "boom"})
+        return httpx.Response(201, json={**body, "id": "p0", "links": []})
+
+    downstream.handler = handler
+    response = await api_client.post(
+        "/api/v1/composites/", json=make_composite("one", pets=2), headers=auth_headers
+    )
+    assert response.status_code == 500
+    assert response.json()["detail"]["breeder_id"] == "b1"
+    assert response.json()["detail"]["pet_ids"] == ["p0"]
+    assert response.headers["Location"].endswith("/composites/b1/")
+
+    response = await api_client.post(
+        "/api/v1/composites/bulk", json=[make_composite("one", pets=2)], headers=auth_headers
+    )
+    (result,) = map(json.loads, response.text.splitlines())
+    assert (result["status"], result["breeder_id"], result["pet_ids"]) == (500, "b1", ["p0"])
@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.api import bulkhead, metrics, service
+from app.api.bulkhead import DROPPED, OK, Bulkhead, BulkheadFull
+
+
+def test_aimd_limit():
+    """Used slots grow the limit; errors and slow calls cut it once per burst"""
+    limit = Bulkhead("breeder", initial_limit=4, max_limit=10, backoff=0.5, slow_floor=0.05)
+
+    for now in range(1, 9):
+        limit.in_flight = 4
+        limit.release(started=now - 0.01, outcome=OK, now=now)
+    assert limit.slots == 5
+    assert limit.baseline == pytest.approx(0.01)
+
+    # Two failures from the same burst cut once; a later one cuts again
+    limit.in_flight = 2
+    limit.release(started=9.0, outcome=DROPPED, now=9.5)
+    limit.release(started=9.1, outcome=DROPPED, now=9.6)
+    assert limit.slots == 2
+    limit.in_flight = 1
+    limit.release(started=9.7, outcome=DROPPED, now=10)
+    assert limit.slots == 1
+
+    # Idle capacity does not grow the limit, and a slow success cuts it
+    limit.limit = 4
+    limit.in_flight = 1
+    limit.release(started=11, outcome=OK, now=11.01)
+    assert limit.limit == 4
+    limit.in_flight = 1
+    limit.release(started=12, outcome=OK, now=13)
+    assert limit.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_queue_then_reject():
+    limit = Bulkhead("pet", initial_limit=1, queue_size=1, queue_timeout=0.05)
+    await limit.acquire()
+
+    waiting = asyncio.create_task(limit.acquire())
+    await asyncio.sleep(0)
+    assert limit.queued == 1
+    with pytest.raises(BulkheadFull):
+        await limit.acquire()  # the line is full
+
+    limit.release(started=0, outcome=bulkhead.IGNORED)
+    await waiting
+    assert limit.in_flight == 1 and limit.queued == 0
+
+    with pytest.raises(BulkheadFull):
+        await limit.acquire()  # waited the whole queue timeout
+    assert limit.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_dependency_is_isolated(downstream, monkeypatch):
+    """A stuck breeder service rejects its own excess calls; pets still answer"""
+    bulkhead.bulkheads["breeder"] = Bulkhead("breeder", initial_limit=1, queue_size=0)
+    release = asyncio.Event()
+
+    async def handler(request: httpx.Request):
+        if "/breeders/" in request.url.path:
+            await release.wait()
+        return httpx.Response(200, json={"data": []})
+
+    downstream.handler = handler
+    client = service.get_http_client()
+    stuck = asyncio.create_task(client.get(f"{service.BREEDER_SERVICE_URL}/"))
+    await asyncio.sleep(0.01)
+
+    rejected = await client.get(f"{service.BREEDER_SERVICE_URL}/")
+    assert rejected.status_code == 503
+    assert rejected.headers["X-Bulkhead"] == "rejected"
+    assert (await client.get(f"{service.PET_SERVICE_URL}/")).status_code == 200
+
+    release.set()
+    assert (await stuck).status_code == 200
+    # The stuck call succeeded with the limit in use, so the limit grew
+    assert 'bulkhead_limit{dependency="breeder"} 2' in metrics.render()
+    assert bulkhead.requests_total.get(dependency="breeder", outcome="rejected") >= 1
+
+
+@pytest.mark.asyncio
+async def test_blocking_calls_wait_for_a_slot(monkeypatch):
+    """Blocking calls queue on the loop, and run in threads once admitted"""
+    monkeypatch.setitem(
+        bulkhead.bulkheads, "lambda", Bulkhead("lambda", initial_limit=1, max_limit=1, queue_timeout=0.15)
+    )
+    running, peak = [], []
+
+    def invoke(n):
+        running.append(n)
+        peak.append(len(running))
+        time.sleep(0.1)
+        running.remove(n)
+        return n
+
+    results = await asyncio.gather(
+        *(bulkhead.run_blocking("lambda", invoke, n) for n in range(3)),
+        return_exceptions=True,
+    )
+    assert max(peak) == 1
+    # The second waits one call for its slot; the third would wait two
+    assert results[:2] == [0, 1]
+    assert isinstance(results[2], BulkheadFull)
+    assert bulkhead.requests_total.get(dependency="lambda", outcome="rejected") >= 1
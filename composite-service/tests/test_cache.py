@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import composites
+from app.api.cache import SWRCache
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        if self.fail:
+            raise RuntimeError("workflow failed")
+        return {"version": self.calls}
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate():
+    cache = SWRCache("test", ttl=0.05, stale_ttl=1)
+    loader = Loader()
+
+    # Concurrent misses share one load
+    results = await asyncio.gather(*(cache.get("c1", loader) for _ in range(5)))
+    assert results == [({"version": 1}, "miss")] * 5
+    assert loader.calls == 1
+
+    assert await cache.get("c1", loader) == ({"version": 1}, "hit")
+
+    # Past the TTL the old value is served at once and refreshed behind it
+    await asyncio.sleep(0.06)
+    assert await cache.get("c1", loader) == ({"version": 1}, "stale")
+    assert await cache.get("c1", loader) == ({"version": 1}, "stale")
+    await asyncio.sleep(0.05)
+    assert loader.calls == 2
+    assert await cache.get("c1", loader) == ({"version": 2}, "hit")
+
+    # A failed refresh keeps serving the stale value
+    loader.fail = True
+    await asyncio.sleep(0.06)
+    assert await cache.get("c1", loader) == ({"version": 2}, "stale")
+    await asyncio.sleep(0.05)
+    assert (await cache.get("c1", loader))[0] == {"version": 2}
+
+
+@pytest.mark.asyncio
+async def test_customer_route_caches_workflow_results(
+    api_client, auth_headers, monkeypatch
+):
+    executions = []
+
+    async def run_customer_workflow(id):
+        executions.append(id)
+        if id == "missing":
+            raise HTTPException(status_code=404, detail="Customer not found")
+        return {"id": id}
+
+    monkeypatch.setattr(composites, "run_customer_workflow", run_customer_workflow)
+    monkeypatch.setattr(composites, "customer_cache", SWRCache("customer", 60, 600))
+
+    for expected in ("miss", "hit"):
+        response = await api_client.get(
+            "/api/v1/composites/customers/id/c1/", headers=auth_headers
+        )
+        assert response.json() == {"id": "c1"}
+        assert response.headers["X-Cache"] == expected
+
+    # Errors are not cached
+    for _ in range(2):
+        response = await api_client.get(
+            "/api/v1/composites/customers/id/missing/", headers=auth_headers
+        )
+        assert response.status_code == 404
+    assert executions == ["c1", "missing", "missing"]
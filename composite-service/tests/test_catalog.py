@@ -0,0 +1,69 @@
+import httpx
+import pytest
+
+from app.api import catalog
+
+BREEDERS = [
+    {"id": "b1", "breeder_city": "Paris", "breeder_country": "France", "price_level": "$"},
+    {"id": "b2", "breeder_city": "Berlin", "breeder_country": "Germany", "price_level": "$$"},
+    {"id": "b3", "breeder_city": "Paris", "breeder_country": "France", "price_level": None},
+]
+PETS = [
+    {"id": "p1", "type": "dog", "price": 100.0, "breeder_id": "b1"},
+    {"id": "p2", "type": "cat", "price": 50.0, "breeder_id": "b1"},
+    {"id": "p3", "type": "dog", "price": 300.0, "breeder_id": "b2"},
+    {"id": "p4", "type": "dog", "price": None, "breeder_id": "b3"},
+    {"id": "p5", "type": "cat", "price": 10.0, "breeder_id": "gone"},
+]
+
+
+def test_snapshot_search():
+    """Facets leave out their own filter; pets match through their breeder"""
+    snapshot = catalog.CatalogSnapshot(BREEDERS, PETS)
+
+    everything = snapshot.search({})
+    assert everything["breeders"]["count"] == 3
+    assert everything["pets"]["count"] == 5
+    assert everything["breeders"]["facets"]["price_level"] == {"$": 1, "$$": 1}
+
+    paris_dogs = snapshot.search({"breeder_city": ["Paris"], "type": ["dog"]})
+    assert paris_dogs["breeders"]["count"] == 2
+    assert paris_dogs["pets"]["count"] == 2
+    assert paris_dogs["breeders"]["facets"]["breeder_city"] == {"Paris": 2, "Berlin": 1}
+    assert paris_dogs["pets"]["facets"]["type"] == {"dog": 2, "cat": 1}
+    # p4 has no price
+    assert paris_dogs["pets"]["price"]["count"] == 1
+    assert paris_dogs["pets"]["price"]["p50"] == 100.0
+
+    priced = snapshot.search({}, min_price=40, max_price=200, bins=2)
+    assert priced["pets"]["count"] == 2
+    assert priced["breeders"]["count"] == 1
+    assert priced["pets"]["price"]["histogram"]["counts"] == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_search_endpoint(api_client, auth_headers, downstream, monkeypatch):
+    """The endpoint answers from the latest snapshot and reports its age"""
+    monkeypatch.setattr(catalog, "catalog", catalog.Catalog())
+    response = await api_client.get("/api/v1/composites/search", headers=auth_headers)
+    assert response.status_code == 503
+
+    def handler(request: httpx.Request):
+        data = BREEDERS if "/breeders/" in request.url.path else PETS
+        offset = int(request.url.params["offset"])
+        return httpx.Response(200, json={"data": data[offset:]})
+
+    downstream.handler = handler
+    await catalog.catalog.refresh()
+
+    response = await api_client.get(
+        "/api/v1/composites/search",
+        params={"breeder_country": "France,Germany", "type": "cat"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Catalog-Age"] == "0"
+    body = response.json()
+    assert body["snapshot"]["pets"] == 5
+    assert body["pets"]["count"] == 1
+    assert body["breeders"]["facets"]["breeder_country"] == {"France": 1}
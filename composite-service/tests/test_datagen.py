@@ -0,0 +1,48 @@
+import json
+
+import httpx
+import pytest
+
+from app.scripts.datagen import DatasetSpec, breeder_records, post_dataset, write_fixtures
+from app.scripts.standins import StandinConfig, StandinStore
+
+
+def test_fixtures_are_reproducible(tmp_path):
+    """The same seed writes the same dataset, and StandinStore loads it"""
+    spec = DatasetSpec(breeders=50, customers=20, seed=7)
+    first, second = tmp_path / "a.json", tmp_path / "b.json"
+    counts = write_fixtures(spec, str(first))
+    write_fixtures(spec, str(second))
+
+    assert first.read_bytes() == second.read_bytes()
+    assert breeder_records(spec, 3) == breeder_records(DatasetSpec(seed=7, customers=20), 3)
+
+    fixtures = json.loads(first.read_text())
+    store = StandinStore(StandinConfig(latency_ms={}), fixtures)
+    assert len(store.breeders) == counts["breeders"] == 50
+    assert len(store.pets) == counts["pets"]
+    assert len(store.customers) == 20
+    assert sum(len(entries) for entries in store.waitlists.values()) == counts["waitlist"]
+    assert {pet["breeder_id"] for pet in fixtures["pets"]} <= set(store.breeders)
+
+
+@pytest.mark.asyncio
+async def test_post_dataset(api_client, auth_headers, downstream):
+    """Every breeder is POSTed as a composite with its pets"""
+    ids = iter(range(1000))
+
+    def handler(request: httpx.Request):
+        body = json.loads(request.content)
+        return httpx.Response(201, json={**body, "id": str(next(ids)), "links": []})
+
+    downstream.handler = handler
+    api_client.headers.update(auth_headers)
+    spec = DatasetSpec(breeders=12, customers=0, max_pets=3)
+
+    result = await post_dataset(api_client, spec, concurrency=4)
+
+    assert result["requests"] == 12
+    assert result["statuses"] == {"201": 12}
+    expected_pets = sum(len(breeder_records(spec, i)[1]) for i in range(12))
+    assert result["pets"] == expected_pets
+    assert len(downstream.requests) == 12 + expected_pets
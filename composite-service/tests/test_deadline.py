@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.api import deadline
+from app.api.deadline import DEADLINE_HEADER, DeadlineMiddleware
+
+
+@pytest.mark.asyncio
+async def test_deadline_forwarded_and_enforced(api_client, auth_headers, downstream):
+    """Downstream calls see the shrinking budget; a slow one ends in 504"""
+    seen = []
+
+    async def handler(request):
+        seen.append(int(request.headers[DEADLINE_HEADER]))
+        if "breeder" in request.url.host:
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"data": []})
+
+    downstream.handler = handler
+
+    response = await api_client.get(
+        "/api/v1/composites/", headers={**auth_headers, DEADLINE_HEADER: "200"}
+    )
+
+    assert response.status_code == 504
+    assert seen and all(0 < ms <= 200 for ms in seen)
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_work():
+    cancelled = asyncio.Event()
+
+    async def app(scope, receive, send):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise AssertionError("nothing should be sent to a gone client")
+
+    before = deadline.cancellations_total.get(reason="disconnect")
+    scope = {"type": "http", "path": "/api/v1/composites/", "headers": []}
+    await asyncio.wait_for(DeadlineMiddleware(app)(scope, receive, send), timeout=1)
+
+    assert cancelled.is_set()
+    assert deadline.cancellations_total.get(reason="disconnect") == before + 1
+
+
+def test_header_only_shortens_route_default():
+    assert deadline.request_deadline_ms("/api/v1/composites/", "1000") == 1000
+    assert deadline.request_deadline_ms("/api/v1/composites/", "99999999") == deadline.DEFAULT_DEADLINE_MS
+    assert deadline.request_deadline_ms("/api/v1/composites/bulk", None) == deadline.ROUTE_DEADLINES_MS["/api/v1/composites/bulk"]
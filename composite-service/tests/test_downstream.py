@@ -0,0 +1,70 @@
+import asyncio
+from urllib.parse import unquote
+
+import httpx
+import pytest
+
+from app.api.downstream import BreederClient, PetClient
+
+HEADERS = {"Authorization": "Bearer a"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_batch_call(downstream):
+    downstream.handler = lambda request: httpx.Response(
+        200, json={"data": [{"id": "b1"}, {"id": "b 2"}]}
+    )
+    client = BreederClient(batch_param="ids")
+
+    b1, b2, b3 = await asyncio.gather(
+        client.get("b1", HEADERS), client.get("b 2", HEADERS), client.get("b3", HEADERS)
+    )
+
+    assert (b1, b2, b3) == ({"id": "b1"}, {"id": "b 2"}, None)
+    assert len(downstream.requests) == 1
+    assert downstream.requests[0].url.params["ids"] == "b1,b 2,b3"
+
+
+@pytest.mark.asyncio
+async def test_unbatched_lookups_fan_out_with_per_caller_errors(downstream):
+    def handler(request):
+        pet_id = unquote(request.url.raw_path.decode().split("/")[-2])
+        if pet_id == "missing":
+            return httpx.Response(404)
+        if pet_id == "broken":
+            return httpx.Response(500)
+        return httpx.Response(200, json={"id": pet_id})
+
+    downstream.handler = handler
+    client = PetClient(fanout=2)
+
+    found, missing, broken, other_user = await asyncio.gather(
+        client.get("p/1", HEADERS),
+        client.get("missing", HEADERS),
+        client.get("broken", HEADERS),
+        client.get("p/1", {"Authorization": "Bearer b"}),
+        return_exceptions=True,
+    )
+
+    assert found == other_user == {"id": "p/1"}
+    assert missing is None
+    assert isinstance(broken, httpx.HTTPStatusError)
+    assert downstream.requests[0].url.raw_path == b"/api/v1/pets/p%2F1/"
+    assert sorted(r.headers["Authorization"] for r in downstream.requests) == [
+        "Bearer a", "Bearer a", "Bearer a", "Bearer b"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_composite_list_queries_are_url_encoded(api_client, auth_headers, downstream):
+    downstream.handler = lambda request: httpx.Response(200, json={"data": []})
+
+    await api_client.get(
+        "/api/v1/composites/",
+        params={"breeder_city": "Paris & Lyon", "type": "dog"},
+        headers=auth_headers,
+    )
+
+    breeder_request, pet_request = downstream.requests
+    assert breeder_request.url.params["breeder_city"] == "Paris & Lyon"
+    assert pet_request.url.params["type"] == "dog"
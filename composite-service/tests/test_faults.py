@@ -0,0 +1,104 @@
+import asyncio
+import random
+import time
+
+import httpx
+import pytest
+
+from app.api import faults
+from app.api.faults import FaultInjectionTransport, FaultProfile, InjectedFault, Scenario
+from app.api.service import downstream_name
+from app.scripts.loadtest import percentile
+
+
+def test_latency_distributions_and_bundled_scenarios():
+    rng = random.Random(0)
+    profile = FaultProfile(latency_ms={"p50": 40, "p99": 2000})
+    samples = sorted(profile.latency(rng) for _ in range(20000))
+
+    assert percentile(samples, 50) == pytest.approx(0.040, rel=0.1)
+    assert percentile(samples, 99) == pytest.approx(2.0, rel=0.15)
+    assert FaultProfile(latency_ms={"min": 10, "max": 10}).latency(rng) == 0.010
+
+    for name in ("pet-slow-p99", "breeder-503s", "degraded-dependencies"):
+        assert faults.load_scenario(name).name == name
+
+
+@pytest.mark.asyncio
+async def test_transport_injects_errors_timeouts_resets_and_slow_bodies():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, content=b"x" * 200)
+
+    scenario = Scenario.from_dict({
+        "services": {
+            "breeder": {"error_rate": 1, "error_status": 503},
+            "pet": {"latency_ms": 500},
+            "customer": {"reset_rate": 1},
+            "lambda": {"slow_body": {"rate": 1, "bytes_per_second": 2000}},
+        }
+    })
+    transport = FaultInjectionTransport(
+        httpx.MockTransport(handler), scenario, service_name=downstream_name
+    )
+    async with httpx.AsyncClient(transport=transport, timeout=0.05) as client:
+        response = await client.get("http://breeder.test/api/v1/breeders/b1/")
+        assert response.status_code == 503
+        assert calls == []
+
+        with pytest.raises(httpx.ReadTimeout):
+            await client.get("http://pet.test/api/v1/pets/p1/")
+        with pytest.raises(httpx.ReadError):
+            await client.get("http://customer.test/api/v1/customers/c1/")
+
+        started = time.perf_counter()
+        response = await client.get("http://lambda/", timeout=5)
+        assert len(response.content) == 200
+        assert time.perf_counter() - started >= 0.09
+
+    assert faults.faults_injected_total.get(service="breeder", fault="error") >= 1
+
+
+@pytest.mark.asyncio
+async def test_sdk_clients_are_wrapped_only_when_the_scenario_covers_them(monkeypatch):
+    class Client:
+        def invoke(self, **kwargs):
+            return "sent"
+
+        async def create_execution(self, request=None):
+            return "created"
+
+    scenario = Scenario.from_dict({
+        "services": {"lambda": {"error_rate": 1}, "workflows": {"latency_ms": 1}}
+    })
+    monkeypatch.setattr(faults, "active_scenario", lambda: scenario)
+
+    with pytest.raises(InjectedFault):
+        faults.wrap(Client(), "lambda", ("invoke",)).invoke(FunctionName="f")
+    workflows = faults.wrap(Client(), "workflows", ("create_execution",))
+    assert await workflows.create_execution(request={}) == "created"
+    client = Client()
+    assert faults.wrap(client, "pubsub", ("publish",)) is client
+
+
+@pytest.mark.asyncio
+async def test_blocking_sdk_latency_never_stalls_the_loop(monkeypatch):
+    """Latency is injected in the worker thread, and skipped on the loop"""
+
+    class Client:
+        def invoke(self, **kwargs):
+            return "sent"
+
+    scenario = Scenario.from_dict({"services": {"lambda": {"latency_ms": 200}}})
+    monkeypatch.setattr(faults, "active_scenario", lambda: scenario)
+    client = faults.wrap(Client(), "lambda", ("invoke",))
+
+    started = time.perf_counter()
+    assert client.invoke(FunctionName="f") == "sent"
+    assert time.perf_counter() - started < 0.1
+
+    started = time.perf_counter()
+    assert await asyncio.to_thread(client.invoke, FunctionName="f") == "sent"
+    assert time.perf_counter() - started >= 0.2
@@ -0,0 +1,63 @@
+import httpx
+import pytest
+
+from app.api import graphql_cache
+from app.api.auth import create_jwt_token
+from app.api.cache import LRUCache
+
+QUERY = """
+query Dashboard($id: String!) {
+  breederPetsWithWaitlist(breederId: $id) { id name pets { id waitlist { id } } }
+}
+"""
+PROFILE = """
+query Profile($id: String!) {
+  breederPetsWithWaitlist(breederId: $id) { id name pets { id name } }
+}
+"""
+
+
+def test_selection_max_age_is_the_smallest_hint():
+    from graphql import parse
+
+    from app.api.graphql import schema
+
+    assert graphql_cache.selection_max_age(schema._schema, parse(QUERY)) == 10
+    assert graphql_cache.selection_max_age(schema._schema, parse(PROFILE)) == 300
+
+
+@pytest.mark.asyncio
+async def test_repeated_queries_are_served_from_cache(
+    api_client, auth_headers, downstream, monkeypatch
+):
+    monkeypatch.setattr(graphql_cache, "responses", LRUCache())
+
+    def handler(request):
+        if request.url.path.endswith("/waitlist"):
+            return httpx.Response(200, json=[])
+        if request.url.host == "pet.test":
+            return httpx.Response(200, json={"data": [
+                {"id": "p1", "name": "Rex", "type": "dog", "breeder_id": "b1"}
+            ]})
+        return httpx.Response(200, json={
+            "id": "b1", "name": "Kennel", "email": "k@example.com",
+            "breeder_city": "Paris", "breeder_country": "France",
+        })
+
+    downstream.handler = handler
+    body = {"query": QUERY, "variables": {"id": "b1"}}
+
+    first = await api_client.post("/api/v1/graphql", json=body, headers=auth_headers)
+    second = await api_client.post("/api/v1/graphql", json=body, headers=auth_headers)
+
+    assert first.json() == second.json()
+    assert first.json()["data"]["breederPetsWithWaitlist"]["pets"][0]["id"] == "p1"
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("miss", "hit")
+    assert first.headers["Cache-Control"] == "private, max-age=10"
+    assert len(downstream.requests) == 3
+
+    # Another user, or other variables, is a separate entry
+    other = {"Authorization": f"Bearer {create_jwt_token({'tokenId': 'u2'})['access_token']}"}
+    response = await api_client.post("/api/v1/graphql", json=body, headers=other)
+    assert response.headers["X-Cache"] == "miss"
+    assert len(downstream.requests) == 6
@@ -0,0 +1,45 @@
+import httpx
+import pytest
+
+from app.scripts.loadtest import percentile, summarize
+from app.scripts.standins import StandinConfig, StandinStore, create_standin_app
+
+
+def test_summarize_percentiles():
+    """Nearest-rank percentiles, RPS and error counts"""
+    latencies = [i / 1000 for i in range(1, 101)]
+    result = summarize(latencies, {"200": 98, "503": 2}, elapsed=2.0)
+
+    assert percentile(sorted(latencies), 50) == 0.05
+    # Ranks round up, never to the nearest (or even) value
+    assert percentile(list(range(1, 11)), 25) == 3
+    assert percentile(list(range(1, 11)), 7) == 1
+    assert percentile(list(range(1, 8)), 50) == 4
+    assert result["latency_ms"]["p95"] == 95.0
+    assert result["latency_ms"]["p99"] == 99.0
+    assert result["rps"] == 50.0
+    assert result["errors"] == 2
+
+
+@pytest.mark.asyncio
+async def test_standin_services():
+    """The stand-in app serves seeded breeders, pets and waitlists"""
+    config = StandinConfig(
+        latency_ms={}, breeders=3, pets_per_breeder=2, payload_bytes=16
+    )
+    store = StandinStore(config)
+    transport = httpx.ASGITransport(app=create_standin_app(store))
+    async with httpx.AsyncClient(transport=transport, base_url="http://standin") as client:
+        breeders = await client.get("/api/v1/breeders/", params={"limit": 2})
+        assert len(breeders.json()["data"]) == 2
+        assert len(breeders.json()["data"][0]["description"]) == 16
+
+        pets = await client.get("/api/v1/pets/", params={"breeder_id": "b1"})
+        assert {p["breeder_id"] for p in pets.json()["data"]} == {"b1"}
+
+        waitlist = await client.get("/api/v1/customers/breeder/b1/waitlist")
+        assert len(waitlist.json()) == 4
+
+        created = await client.post("/api/v1/breeders/", json={"name": "New"})
+        assert created.status_code == 201
+        assert created.json()["id"] in store.breeders
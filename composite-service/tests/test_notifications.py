@@ -0,0 +1,107 @@
+import asyncio
+import io
+import json
+import time
+
+import httpx
+import pytest
+
+from app.api import notifications, sdk
+from app.api.notifications import InMemoryTransport, NotificationAggregator
+
+
+def email(customer: str, breeder_email: str = "b@x.io") -> dict:
+    return {"breeder_email": breeder_email, "customer_name": customer,
+            "customer_email": f"{customer}@x.io", "pet_name": "Rex", "pet_id": "p1"}
+
+
+@pytest.mark.asyncio
+async def test_batches_per_breeder():
+    """Events close together go out as one body per breeder; lone ones unchanged"""
+    transport = InMemoryTransport()
+    aggregator = NotificationAggregator(transport, window=0.02, max_delay=1, max_batch=10)
+
+    for customer in ("ann", "bob", "cy"):
+        assert (await aggregator.notify("b1", email(customer)))["status"] == "queued"
+    await aggregator.notify("b2", email("dee", "other@x.io"))
+    assert transport.sent == []
+
+    await asyncio.sleep(0.05)
+    by_breeder = {body["breeder_email"]: body for body in transport.sent}
+    assert len(transport.sent) == 2
+    assert [n["customer_name"] for n in by_breeder["b@x.io"]["notifications"]] == [
+        "ann", "bob", "cy"
+    ]
+    assert by_breeder["other@x.io"] == email("dee", "other@x.io")
+    assert notifications.notification_batches_total.get(outcome="sent") >= 2
+
+
+@pytest.mark.asyncio
+async def test_size_and_delay_limits():
+    transport = InMemoryTransport()
+    aggregator = NotificationAggregator(transport, window=0.1, max_delay=0.16, max_batch=2)
+
+    # A full batch is sent without waiting for the window
+    await aggregator.notify("b1", email("ann"))
+    await aggregator.notify("b1", email("bob"))
+    await asyncio.sleep(0)
+    assert len(transport.sent) == 1
+
+    # A steady trickle is still sent once the first event has waited max_delay
+    aggregator.max_batch = 100
+    for customer in ("cy", "dee", "eve", "fay"):
+        await aggregator.notify("b1", email(customer))
+        await asyncio.sleep(0.06)
+    assert len(transport.sent) == 2
+    assert len(transport.sent[1]["notifications"]) == 3
+
+    await aggregator.close()
+    assert transport.sent[2]["customer_name"] == "fay"
+
+
+@pytest.mark.asyncio
+async def test_webhook_queues_notification(api_client, auth_headers, downstream, monkeypatch):
+    transport = InMemoryTransport()
+    aggregator = NotificationAggregator(transport, window=10)
+    monkeypatch.setattr(notifications, "get_notifier", lambda: aggregator)
+
+    def handler(request: httpx.Request):
+        if request.url.host == "customer.test":
+            return httpx.Response(200, json={"id": "c1", "name": "Ann", "email": "a@x.io"})
+        if request.url.host == "breeder.test":
+            return httpx.Response(200, json={"id": "b1", "email": "b@x.io"})
+        return httpx.Response(200, json={"id": "p1", "name": "Rex"})
+
+    downstream.handler = handler
+    for _ in range(2):
+        response = await api_client.post(
+            "/api/v1/composites/webhook",
+            json={"breeder_id": "b1", "pet_id": "p1", "consumer_id": "c1"},
+            headers=auth_headers,
+        )
+        assert response.json()["status"] == "queued"
+
+    await aggregator.close()
+    assert len(transport.sent) == 1
+    assert len(transport.sent[0]["notifications"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_lambda_does_not_block_other_requests(api_client, monkeypatch):
+    """The boto3 round trip runs in a thread while the worker keeps serving"""
+
+    class SlowLambda:
+        def invoke(self, **kwargs):
+            time.sleep(0.5)
+            return {"Payload": io.BytesIO(json.dumps({"statusCode": 200}).encode())}
+
+    monkeypatch.setattr(sdk, "lambda_client", lambda: SlowLambda())
+    sending = asyncio.create_task(notifications.LambdaTransport().send(email("ann")))
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    response = await api_client.get("/api/v1/health/ready")
+    assert response.status_code in (200, 503)
+    assert time.perf_counter() - started < 0.3
+    assert not sending.done()
+    assert (await sending)["statusCode"] == 200
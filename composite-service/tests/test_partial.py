@@ -0,0 +1,125 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.api import composites
+
+BREEDER = {
+    "id": "b1",
+    "name": "Breeder 1",
+    "breeder_city": "New York",
+    "breeder_country": "USA",
+    "price_level": "$$",
+    "breeder_address": "1 Test Street",
+    "email": "b1@example.com",
+}
+PET = {"id": "p1", "name": "Rex", "type": "dog", "price": 100.0, "breeder_id": "b1"}
+
+
+@pytest.fixture(autouse=True)
+def empty_section_cache():
+    composites.section_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_partial_response_keeps_successful_sections(
+    api_client, auth_headers, downstream, monkeypatch
+):
+    monkeypatch.setattr(composites, "COMPOSITE_SECTION_BUDGET_MS", 100)
+    pets_up = True
+
+    async def handler(request):
+        if request.url.host == "breeder.test":
+            return httpx.Response(200, json={"data": [BREEDER]})
+        if not pets_up:
+            await asyncio.sleep(1)
+        return httpx.Response(200, json={"data": [PET]})
+
+    downstream.handler = handler
+    headers = {**auth_headers, composites.PARTIAL_HEADER: "true"}
+
+    response = await api_client.get("/api/v1/composites/", headers=headers)
+    assert response.json()["partial"] is False
+    assert response.headers["X-Composite-Partial"] == "false"
+
+    # Pets time out: breeders are still served and the last pets are stale
+    pets_up = False
+    response = await api_client.get("/api/v1/composites/", headers=headers)
+    body = response.json()
+    assert response.status_code == 200
+    assert body["partial"] is True
+    assert body["breeders"]["data"][0]["id"] == "b1"
+    assert body["sections"]["breeders"]["status"] == "ok"
+    assert body["sections"]["pets"]["status"] == "timeout"
+    assert body["sections"]["pets"]["stale"] is True
+    assert body["pets"]["data"][0]["id"] == "p1"
+
+    # Without a cached copy the failed section is null
+    composites.section_cache.clear()
+    response = await api_client.get(
+        "/api/v1/composites/", params={"type": "cat"}, headers=headers
+    )
+    body = response.json()
+    assert body["pets"] is None
+    assert body["sections"]["pets"]["stale"] is False
+
+
+@pytest.mark.asyncio
+async def test_all_sections_failing_is_502(api_client, auth_headers, downstream):
+    downstream.handler = lambda request: httpx.Response(500, json={"detail": "down"})
+
+    response = await api_client.get(
+        "/api/v1/composites/",
+        headers={**auth_headers, composites.PARTIAL_HEADER: "true"},
+    )
+
+    assert response.status_code == 502
+    assert {s["status"] for s in response.json()["sections"].values()} == {"error"}
+
+
+@pytest.mark.asyncio
+async def test_stale_sections_are_not_shared_between_callers(
+    api_client, auth_headers, downstream, monkeypatch
+):
+    from app.api import auth
+
+    monkeypatch.setattr(composites, "COMPOSITE_SECTION_BUDGET_MS", 100)
+    other = auth.create_jwt_token({"tokenId": "other-user"})["access_token"]
+    other_headers = {"Authorization": f"Bearer {other}"}
+    pets_up = True
+
+    async def handler(request):
+        if request.url.host == "breeder.test":
+            return httpx.Response(200, json={"data": [BREEDER]})
+        if not pets_up:
+            await asyncio.sleep(1)
+        # Each caller is shown only the pets it may see
+        pet_id = "p2" if request.headers["Authorization"].endswith(other) else "p1"
+        return httpx.Response(200, json={"data": [{**PET, "id": pet_id}]})
+
+    downstream.handler = handler
+
+    for headers in (auth_headers, other_headers):
+        await api_client.get(
+            "/api/v1/composites/", headers={**headers, composites.PARTIAL_HEADER: "true"}
+        )
+
+    pets_up = False
+    for headers, pet_id in ((auth_headers, "p1"), (other_headers, "p2")):
+        response = await api_client.get(
+            "/api/v1/composites/", headers={**headers, composites.PARTIAL_HEADER: "true"}
+        )
+        body = response.json()
+        assert body["sections"]["pets"]["stale"] is True
+        assert [pet["id"] for pet in body["pets"]["data"]] == [pet_id]
+
+    # A caller with nothing cached of its own gets no one else's copy
+    third = auth.create_jwt_token({"tokenId": "third-user"})["access_token"]
+    response = await api_client.get(
+        "/api/v1/composites/",
+        headers={"Authorization": f"Bearer {third}", composites.PARTIAL_HEADER: "true"},
+    )
+    body = response.json()
+    assert body["pets"] is None
+    assert body["sections"]["pets"]["stale"] is False
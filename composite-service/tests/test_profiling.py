@@ -0,0 +1,122 @@
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import auth, profiling
+
+
+@pytest.fixture(autouse=True)
+def profile_nonces(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_NONCE_DB", str(tmp_path / "nonces.db"))
+
+
+@pytest.fixture
+def admin_headers(monkeypatch):
+    monkeypatch.setattr(auth, "ADMIN_TOKEN_IDS", {"admin-user"})
+    token = auth.create_jwt_token({"tokenId": "admin-user"})["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.asyncio
+async def test_admin_routes_require_admin(api_client, auth_headers):
+    """Profiling routes are behind JWT and the admin allow-list"""
+    response = await api_client.get("/api/v1/admin/profile/requests")
+    assert response.status_code == 401
+
+    response = await api_client.get("/api/v1/admin/profile/requests", headers=auth_headers)
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_cpu_profile_formats(api_client, admin_headers):
+    """The sampler returns collapsed stacks or a speedscope profile"""
+    response = await api_client.get(
+        "/api/v1/admin/profile/cpu",
+        params={"seconds": 0.2, "interval_ms": 5},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    line = response.text.splitlines()[0]
+    assert line.startswith("MainThread;") and line.rsplit(" ", 1)[1].isdigit()
+
+    response = await api_client.get(
+        "/api/v1/admin/profile/cpu",
+        params={"seconds": 0.1, "format": "speedscope"},
+        headers=admin_headers,
+    )
+    profile = response.json()
+    assert profile["profiles"][0]["type"] == "sampled"
+    assert profile["shared"]["frames"]
+
+
+def test_signed_profile_header():
+    """Only unexpired values signed for this request with the secret are accepted"""
+    expires = int(time.time()) + 60
+    value = profiling.sign_profile_request("GET", "/items/1", expires, "secret")
+    assert profiling.verify_profile_request(value, "GET", "/items/1", "secret")
+    assert not profiling.verify_profile_request(value, "GET", "/items/1", "other-secret")
+    assert not profiling.verify_profile_request(value, "POST", "/items/1", "secret")
+    assert not profiling.verify_profile_request(value, "GET", "/items/2", "secret")
+    assert not profiling.verify_profile_request(
+        profiling.sign_profile_request("GET", "/items/1", int(time.time()) - 1, "secret"),
+        "GET",
+        "/items/1",
+        "secret",
+    )
+    # Long-lived values would keep their nonces around too
+    far_future = int(time.time()) + profiling.PROFILE_HEADER_MAX_TTL + 60
+    assert not profiling.verify_profile_request(
+        profiling.sign_profile_request("GET", "/items/1", far_future, "secret"),
+        "GET",
+        "/items/1",
+        "secret",
+    )
+
+
+def test_signed_profile_header_is_single_use():
+    value = profiling.sign_profile_request("GET", "/items/1", int(time.time()) + 60, "secret")
+    assert profiling.claim_profile_request(value)
+    assert not profiling.claim_profile_request(value)
+    other = profiling.sign_profile_request("GET", "/items/1", int(time.time()) + 60, "secret")
+    assert profiling.claim_profile_request(other)
+
+
+@pytest.mark.asyncio
+async def test_request_profile_and_route_allocations(monkeypatch):
+    """The middleware profiles signed requests and tracks growth per route"""
+    monkeypatch.setattr(profiling, "PROFILING_SECRET", "secret")
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware)
+    retained = []
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        retained.append(bytearray(100_000))
+        return {"id": item_id}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        header = profiling.sign_profile_request("GET", "/items/1", int(time.time()) + 60)
+        response = await client.get("/items/1", headers={profiling.PROFILE_HEADER: header})
+        profile_id = response.headers["X-Profile-Id"]
+        assert "function calls" in profiling.request_profiles[profile_id]["stats"]
+
+        # Replayed, or sent with another request, the header profiles nothing
+        response = await client.get("/items/1", headers={profiling.PROFILE_HEADER: header})
+        assert "X-Profile-Id" not in response.headers
+        response = await client.get("/items/3", headers={profiling.PROFILE_HEADER: header})
+        assert "X-Profile-Id" not in response.headers
+
+        profiling.start_allocation_tracking()
+        try:
+            await client.get("/items/2")
+            diff = profiling.allocation_diff()
+        finally:
+            profiling.stop_allocation_tracking()
+
+    route = next(r for r in diff["routes"] if r["route"] == "GET /items/{item_id}")
+    assert route["requests"] == 1
+    assert route["net_bytes"] >= 100_000
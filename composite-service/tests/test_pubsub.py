@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+
+from app.api import deadline, pubsub
+from app.api.pubsub import BreederLookup, InMemoryPubSubTransport
+
+BREEDERS = {"b1": {"id": "b1", "name": "One"}, "b2": {"id": "b2", "name": "Two"}}
+
+
+def respond(request):
+    """Answer like the breeder service; "slow" never gets a reply"""
+    ids = request.get("breeder_ids") or [request["breeder_id"]]
+    return [
+        {
+            "correlation_id": request["correlation_id"],
+            "breeder_id": breeder_id,
+            "breeder_data": BREEDERS.get(breeder_id),
+        }
+        for breeder_id in ids
+        if breeder_id != "slow"
+    ]
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    transport = InMemoryPubSubTransport(respond, delay=0.01)
+    monkeypatch.setattr(pubsub, "build_transport", lambda: transport)
+    monkeypatch.setattr(pubsub, "_lookup", None)
+    return transport
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_message(transport):
+    lookup = BreederLookup(transport, window=0.01, reply_timeout=1)
+
+    results = await asyncio.gather(
+        lookup.get("b1"), lookup.get("b2"), lookup.get("b1"), lookup.get("nope")
+    )
+
+    assert results == [BREEDERS["b1"], BREEDERS["b2"], BREEDERS["b1"], None]
+    assert len(transport.published) == 1
+    assert sorted(transport.published[0]["data"]["breeder_ids"]) == ["b1", "b2", "nope"]
+    await lookup.close()
+
+
+@pytest.mark.asyncio
+async def test_other_workers_replies_are_redelivered(transport):
+    lookup = BreederLookup(transport, window=0.001, reply_timeout=1)
+    transport.deliver({"correlation_id": "someone-else", "breeder_id": "b9"})
+
+    assert await lookup.get("b1") == BREEDERS["b1"]
+    assert transport._replies.qsize() + len(transport._unacked) == 1
+    await lookup.close()
+
+
+@pytest.mark.asyncio
+async def test_batch_outlives_the_deadline_of_the_caller_that_opened_it(transport):
+    """A short deadline ends its own caller's wait, not everyone's in the batch"""
+    transport.delay = 0.1
+    lookup = BreederLookup(transport, window=0.01, reply_timeout=1)
+
+    async def hurried():
+        deadline._deadline.set(time.monotonic() + 0.05)
+        return await lookup.get("b1")
+
+    first = asyncio.create_task(hurried())
+    await asyncio.sleep(0)  # opens the batch with its deadline
+    second = asyncio.create_task(lookup.get("b2"))
+
+    with pytest.raises(pubsub.ReplyTimeout):
+        await first
+    assert await second == BREEDERS["b2"]
+    assert len(transport.published) == 1
+    await lookup.close()
+
+
+@pytest.fixture
+async def lookup(transport, monkeypatch):
+    """Lookup used by the routes, with a short reply timeout"""
+    lookup = BreederLookup(transport, window=0.005, reply_timeout=0.2)
+    monkeypatch.setattr(pubsub, "_lookup", lookup)
+    monkeypatch.setattr(pubsub, "_lookup_loop", asyncio.get_running_loop())
+    yield lookup
+    await lookup.close()
+
+
+@pytest.mark.asyncio
+async def test_batch_route(api_client, auth_headers, transport, lookup):
+    response = await api_client.get(
+        "/api/v1/composites/breeders/ids",
+        params={"ids": "b1,b2,nope,slow,b1"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "data": [BREEDERS["b1"], BREEDERS["b2"]],
+        "missing": ["nope", "slow"],
+    }
+    assert len(transport.published) == 1
+
+    response = await api_client.get(
+        "/api/v1/composites/breeders/id/slow/", headers=auth_headers
+    )
+    assert response.status_code == 504
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from app.api import replica as replica_module
+from app.api.replica import ChangeEvent, InMemoryEventSource, Replica
+
+
+BREEDERS = [
+    {
+        "id": "b1",
+        "name": "Alpha Kennels",
+        "breeder_city": "Paris",
+        "breeder_country": "France",
+        "price_level": "$$",
+        "breeder_address": "1 Rue Test",
+        "email": "alpha@example.com",
+    },
+    {
+        "id": "b2",
+        "name": "Beta Cattery",
+        "breeder_city": "Tokyo",
+        "breeder_country": "Japan",
+        "price_level": "$$$",
+        "breeder_address": "2 Test Dori",
+        "email": "beta@example.com",
+    },
+]
+
+PETS = [
+    {"id": "p1", "name": "Rex", "type": "dog", "price": 100.0, "breeder_id": "b1"},
+    {"id": "p2", "name": "Tom", "type": "cat", "price": 80.0, "breeder_id": "b2"},
+]
+
+
+@pytest.fixture
+def fake_downstream(monkeypatch):
+    """Serve resync snapshots from memory instead of the breeder/pet services"""
+
+    async def fetch_all(url, headers, page_size=500):
+        return list(BREEDERS) if "breeder" in url else list(PETS)
+
+    monkeypatch.setattr(replica_module, "fetch_all", fetch_all)
+    monkeypatch.setattr(replica_module, "BREEDER_SERVICE_URL", "http://breeder")
+    monkeypatch.setattr(replica_module, "PET_SERVICE_URL", "http://pet")
+
+
+@pytest.mark.asyncio
+async def test_resync_and_events(fake_downstream):
+    """Resync loads a snapshot and change events are applied on top of it"""
+    replica = Replica(InMemoryEventSource())
+    assert not replica.is_fresh()
+
+    await replica.resync()
+    assert replica.is_fresh()
+
+    await replica.apply(
+        ChangeEvent(entity="pet", op="upsert", id="p3", data={**PETS[0], "name": "Fido"})
+    )
+    await replica.apply(ChangeEvent(entity="breeder", op="delete", id="b2"))
+
+    from app.api import db_manager
+
+    breeders = await db_manager.get_all_breeders(None, None, None)
+    assert [row.id for row in breeders] == ["b1"]
+    dogs = await db_manager.get_all_pets("dog", None, None)
+    assert sorted(row.name for row in dogs) == ["Fido", "Rex"]
+
+
+@pytest.mark.asyncio
+async def test_replica_goes_stale_on_lag(fake_downstream):
+    """A lagging change feed makes the replica fall back to live fan-out"""
+    replica = Replica(InMemoryEventSource(), max_lag=5)
+    await replica.resync()
+
+    await replica.apply(
+        ChangeEvent(entity="pet", op="delete", id="p1", timestamp=time.time() - 60)
+    )
+    assert not replica.is_fresh()
+
+
+@pytest.mark.asyncio
+async def test_get_composites_from_replica(
+    api_client, auth_headers, fake_downstream, monkeypatch
+):
+    """get_composites filters and paginates locally while the replica is fresh"""
+    replica = Replica(InMemoryEventSource())
+    await replica.resync()
+    monkeypatch.setattr(replica_module, "replica", replica)
+
+    response = await api_client.get(
+        "/api/v1/composites/?breeder_city=Tokyo&type=dog", headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Composite-Source"] == "replica"
+    body = response.json()
+    assert [b["id"] for b in body["breeders"]["data"]] == ["b2"]
+    assert [p["id"] for p in body["pets"]["data"]] == ["p1"]
+
+
+class StalledEventSource(replica_module.EventSource):
+    """A feed whose pull hangs: no events, and no completed polls either"""
+
+    async def events(self):
+        await asyncio.Event().wait()
+        yield  # pragma: no cover
+
+
+@pytest.mark.asyncio
+async def test_replica_goes_stale_when_feed_stalls(fake_downstream):
+    """A feed that stops polling is caught long before the resync age limit"""
+    stalled = Replica(StalledEventSource(), stale_after=0.05)
+    quiet = Replica(InMemoryEventSource(poll_interval=0.01), stale_after=0.05)
+    for replica in (stalled, quiet):
+        replica.start()
+        await replica.resync()
+    await asyncio.sleep(0.1)
+
+    assert not stalled.is_fresh()
+    assert stalled.status()["feed_silence"] > 0.05
+    assert quiet.is_fresh()
+    for replica in (stalled, quiet):
+        await replica.stop()
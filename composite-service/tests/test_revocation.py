@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import pytest
+
+from app.api import auth
+from app.api.revocation import RevocationList
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_access_and_refresh_tokens(api_client):
+    tokens = (await api_client.post("/api/v1/auth/login", json={"tokenId": "u1"})).json()
+    access = {"Authorization": f"Bearer {tokens['access_token']}"}
+    refresh = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+
+    assert (await api_client.get("/api/v1/auth/protected", headers=access)).status_code == 200
+    assert (await api_client.post("/api/v1/auth/logout", headers=access)).status_code == 200
+
+    response = await api_client.get("/api/v1/auth/protected", headers=access)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+    assert (await api_client.post("/api/v1/auth/refresh", headers=refresh)).status_code == 401
+
+    # Logging in again issues tokens the revocation does not cover
+    await asyncio.sleep(0.01)
+    tokens = (await api_client.post("/api/v1/auth/login", json={"tokenId": "u1"})).json()
+    access = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert (await api_client.get("/api/v1/auth/protected", headers=access)).status_code == 200
+
+
+def test_revocations_reach_other_workers_until_they_expire(tmp_path):
+    path = str(tmp_path / "revocations.db")
+    worker_a, worker_b = RevocationList(path), RevocationList(path)
+    now = time.time()
+
+    worker_a.revoke("u1", expires_at=now + 60, revoked_at=now)
+    worker_a.revoke("u2", expires_at=now - 1, revoked_at=now - 10)
+    assert not worker_b.is_revoked({"tokenId": "u1", "iat": now - 1})
+
+    worker_b.sync()
+    assert worker_b.is_revoked({"tokenId": "u1", "iat": now - 1})
+    assert not worker_b.is_revoked({"tokenId": "u1", "iat": now + 1})
+    # Already expired when it was synced, so every token it matched is dead anyway
+    assert "u2" not in worker_b.cutoffs
+
+    worker_a.sync()
+    assert "u2" not in worker_a.cutoffs
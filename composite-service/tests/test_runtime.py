@@ -0,0 +1,32 @@
+from app import runtime
+from app.api import sdk, service
+
+
+def test_worker_count_follows_cgroup_quota(tmp_path, monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.setattr(runtime.os, "sched_getaffinity", lambda pid: set(range(16)))
+
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert runtime.cgroup_cpu_limit(str(tmp_path)) == 1.5
+    assert runtime.available_cpus(str(tmp_path)) == 2
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert runtime.available_cpus(str(tmp_path)) == 16
+
+    monkeypatch.setattr(runtime, "WORKERS_PER_CPU", 2)
+    monkeypatch.setattr(runtime, "MAX_WORKERS", 8)
+    assert runtime.worker_count(cpus=2) == 4
+    assert runtime.worker_count(cpus=16) == 8
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    assert runtime.worker_count(cpus=16) == 3
+
+
+def test_post_fork_drops_inherited_clients(monkeypatch):
+    monkeypatch.setattr(service, "_http_client", object())
+    monkeypatch.setattr(sdk, "_clients", {("lambda.client",): object()})
+
+    runtime.post_fork()
+
+    assert service._http_client is None
+    assert sdk._clients == {}
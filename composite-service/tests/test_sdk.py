@@ -0,0 +1,34 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+
+from app.api import sdk
+
+
+def test_app_import_does_not_load_cloud_sdks():
+    """Importing the app must not pay for the Google Cloud or AWS SDKs"""
+    code = (
+        "import sys, app.main; "
+        "print([m for m in ('boto3', 'grpc', 'google.cloud.pubsub_v1', "
+        "'google.cloud.workflows_v1', 'google.oauth2.service_account') if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_clients_are_built_once_and_timed(monkeypatch):
+    monkeypatch.setattr(sdk, "_modules", {})
+    monkeypatch.setattr(sdk, "_clients", {})
+    monkeypatch.setattr(sdk, "timings", [])
+    built = []
+    sdk.provide("boto3", SimpleNamespace(client=lambda *args, **kwargs: built.append(args) or object()))
+
+    assert sdk.lambda_client() is sdk.lambda_client()
+    assert built == [("lambda",)]
+    assert [t["name"] for t in sdk.startup_report()["sdk"]] == ["lambda.client"]
+
+    sdk.reset()
+    sdk.lambda_client()
+    assert len(built) == 2
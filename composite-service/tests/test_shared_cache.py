@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+import jwt
+import pytest
+
+from app.api import auth, shared_cache
+from app.api.cache import SWRCache
+
+
+def test_sqlite_file_is_private(tmp_path):
+    path = tmp_path / "cache" / "shared.db"
+    shared_cache.SQLiteSharedCache(str(path)).set("breeder", "b1", {"id": "b1"}, ttl=60)
+    assert path.parent.stat().st_mode & 0o777 == 0o700
+    assert path.stat().st_mode & 0o077 == 0
+
+
+def test_sqlite_tier_is_shared(tmp_path, monkeypatch):
+    """Two workers' handles see each other's entries, in LRU order"""
+    monkeypatch.setattr(shared_cache, "EVICT_EVERY", 1)
+    path = str(tmp_path / "shared.db")
+    worker_a = shared_cache.SQLiteSharedCache(path, max_entries=3, touch_interval=0)
+    worker_b = shared_cache.SQLiteSharedCache(path, max_entries=3, touch_interval=0)
+
+    big = {"pets": [{"id": f"p{i}", "name": "x" * 20} for i in range(200)]}
+    worker_a.set("breeder_pets", "b1", big, ttl=60)
+    value, stored_at = worker_b.get("breeder_pets", "b1")
+    assert value == big
+    assert stored_at <= time.time()
+
+    worker_a.set("breeder", "b2", {"id": "b2"}, ttl=60)
+    worker_a.set("breeder", "b3", {"id": "b3"}, ttl=-1)  # already expired
+    assert worker_b.get("breeder", "b3") is None
+
+    time.sleep(0.01)
+    worker_b.get("breeder_pets", "b1")  # now used more recently than b2
+    worker_a.set("breeder", "b4", {"id": "b4"}, ttl=60)
+    worker_a.set("breeder", "b5", {"id": "b5"}, ttl=60)
+    assert worker_b.get("breeder", "b2") is None
+    assert worker_b.get("breeder_pets", "b1") is not None
+    assert worker_b.get("breeder", "b5")[0] == {"id": "b5"}
+
+
+@pytest.mark.asyncio
+async def test_swr_cache_reads_through_shared_tier():
+    """A value loaded by one worker serves another, keeping its age"""
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return {"id": "c1"}
+
+    worker_a = SWRCache("customer", ttl=60, stale_ttl=60, shared=True)
+    worker_b = SWRCache("customer", ttl=60, stale_ttl=60, shared=True)
+    assert await worker_a.get("c1", loader) == ({"id": "c1"}, "miss")
+    await asyncio.sleep(0.05)
+    assert await worker_b.get("c1", loader) == ({"id": "c1"}, "hit")
+    assert loads == [1]
+    assert worker_b.entries.get("c1").age >= 0.05
+
+    worker_b.invalidate("c1")
+    assert shared_cache.cache.get("customer", "c1") is None
+
+
+def test_verified_tokens_are_decoded_once(monkeypatch, fresh_revocations):
+    """Cached tokens skip the signature check but not expiry or revocation"""
+    token = auth.create_jwt_token({"tokenId": "cached-user"})["access_token"]
+    decodes = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(
+        jwt, "decode", lambda *args, **kwargs: decodes.append(1) or real_decode(*args, **kwargs)
+    )
+
+    assert auth.verify_jwt_token(token)["tokenId"] == "cached-user"
+    auth.verified_tokens.clear()  # another worker: only the shared tier has it
+    assert auth.verify_jwt_token(token)["tokenId"] == "cached-user"
+    assert auth.verify_jwt_token(token)["tokenId"] == "cached-user"
+    assert decodes == [1]
+
+    auth.revoke_token_id("cached-user")
+    with pytest.raises(auth.HTTPException) as e:
+        auth.verify_jwt_token(token)
+    assert e.value.detail == "Token has been revoked"
+
+
+def test_forged_token_entries_are_ignored(fresh_shared_cache):
+    """An entry someone else wrote to the shared tier is not taken as verified"""
+    token = auth.create_jwt_token({"tokenId": "real-user"})["access_token"]
+    assert auth.verify_jwt_token(token)["tokenId"] == "real-user"
+    key = f"access:{hashlib.sha256(token.encode()).hexdigest()}"
+    entry, _ = fresh_shared_cache.get("token", key)
+    entry["payload"]["tokenId"] = "admin"
+    fresh_shared_cache.set("token", key, entry, ttl=60)
+
+    auth.verified_tokens.clear()
+    assert auth.verify_jwt_token(token)["tokenId"] == "real-user"
+
+
+def test_entries_are_visible_to_another_process(fresh_shared_cache):
+    """A value one worker writes is read by a separate interpreter"""
+    fresh_shared_cache.set("breeder", ("b1", "user:u1"), {"id": "b1"}, ttl=60)
+    reader = (
+        "import json, sys\n"
+        "from app.api import shared_cache\n"
+        "found = shared_cache.SQLiteSharedCache(sys.argv[1]).get('breeder', ('b1', 'user:u1'))\n"
+        "print(json.dumps(found[0]))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", reader, fresh_shared_cache.path],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    assert json.loads(output) == {"id": "b1"}
+
+
+def test_default_backend_is_shared_across_processes():
+    env = {k: v for k, v in os.environ.items() if k != "SHARED_CACHE_BACKEND"}
+    output = subprocess.run(
+        [sys.executable, "-c",
+         "from app.api import shared_cache; print(type(shared_cache.cache).__name__)"],
+        capture_output=True, text=True, check=True, env=env,
+    ).stdout
+    assert output.strip() == "SQLiteSharedCache"
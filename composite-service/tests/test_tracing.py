@@ -0,0 +1,79 @@
+import httpx
+import pytest
+
+from app.api import sdk, tracing
+from app.scripts.standins import FakeLambdaClient, StandinConfig, StandinStore
+
+
+@pytest.fixture
+def spans():
+    """Collect finished spans in memory"""
+    exporter = tracing.InMemoryExporter()
+    previous = tracing.exporter
+    tracing.set_exporter(exporter)
+    yield exporter.spans
+    tracing.set_exporter(previous)
+
+
+@pytest.fixture
+def services(downstream):
+    def handler(request: httpx.Request):
+        if request.url.host == "customer.test":
+            return httpx.Response(200, json={"id": "c1", "name": "Ann", "email": "a@x.io"})
+        if request.url.path.endswith("/"):
+            if request.url.host == "breeder.test":
+                return httpx.Response(200, json={"data": [], "email": "b@x.io"})
+            return httpx.Response(200, json={"data": [], "name": "Rex"})
+        return httpx.Response(404)
+
+    downstream.handler = handler
+    return downstream
+
+
+@pytest.mark.asyncio
+async def test_request_and_downstream_spans(api_client, auth_headers, services, spans):
+    """Downstream calls are child spans and carry the inbound trace context"""
+    inbound_trace = "0af7651916cd43dd8448eb211c80319c"
+    response = await api_client.get(
+        "/api/v1/composites/",
+        headers={
+            **auth_headers,
+            "X-Correlation-ID": "corr-123",
+            "traceparent": f"00-{inbound_trace}-b7ad6b7169203331-01",
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Trace-ID"] == inbound_trace
+
+    server = next(s for s in spans if s.kind == "server")
+    clients = [s for s in spans if s.kind == "client"]
+    assert len(clients) == 2
+    assert {s.attributes["peer.service"] for s in clients} == {"breeder", "pet"}
+    assert all(s.parent_id == server.span_id for s in clients)
+    assert all(s.duration_ms is not None for s in clients)
+
+    for request, span in zip(services.requests, clients):
+        assert request.headers["X-Correlation-ID"] == "corr-123"
+        assert request.headers["traceparent"] == f"00-{inbound_trace}-{span.span_id}-01"
+
+
+@pytest.mark.asyncio
+async def test_webhook_propagates_correlation_id(
+    api_client, auth_headers, services, spans, monkeypatch
+):
+    """The email lookups and the Lambda invoke join the webhook's trace"""
+    lambda_client = FakeLambdaClient(StandinStore(StandinConfig(latency_ms={}, breeders=0)))
+    monkeypatch.setattr(sdk, "lambda_client", lambda: lambda_client)
+
+    response = await api_client.post(
+        "/api/v1/composites/webhook",
+        json={"breeder_id": "b1", "pet_id": "p1", "consumer_id": "c1"},
+        headers={**auth_headers, "X-Correlation-ID": "corr-456"},
+    )
+    assert response.json()["status"] == "success"
+
+    assert [r.headers["X-Correlation-ID"] for r in services.requests] == ["corr-456"] * 3
+    assert lambda_client.invocations[0]["X-Correlation-ID"] == "corr-456"
+    lambda_span = next(s for s in spans if s.name == "lambda.invoke")
+    server = next(s for s in spans if s.kind == "server")
+    assert lambda_span.trace_id == server.trace_id
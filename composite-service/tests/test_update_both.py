@@ -0,0 +1,163 @@
+import json
+
+import httpx
+import pytest
+
+from app.api import downstream as downstream_clients
+
+BREEDER = {"id": "b1", "name": "Acme", "breeder_city": "Paris", "breeder_country": "France",
+           "price_level": "$", "breeder_address": "1 Rue", "email": "a@x.io",
+           "version": 3, "links": []}
+PET = {"id": "p1", "name": "Rex", "type": "dog", "price": 80.0, "breeder_id": "b1",
+       "version": 7, "links": []}
+URL = "/api/v1/composites/both/b1/p1/"
+
+
+@pytest.fixture
+def records(downstream, monkeypatch):
+    """Breeder b1 and pet p1 with versions, updated in place by PUTs"""
+    monkeypatch.setenv("BREEDER_VERSION_FIELD", "version")
+    monkeypatch.setenv("PET_VERSION_FIELD", "version")
+    monkeypatch.setattr(downstream_clients, "_clients_loop", None)
+    stored = {"breeders": dict(BREEDER), "pets": dict(PET)}
+    downstream.fail = {}
+
+    def handler(request: httpx.Request):
+        service = request.url.path.split("/")[3]
+        record = stored[service]
+        if request.method == "GET":
+            return httpx.Response(200, json=record)
+        if service in downstream.fail:
+            return httpx.Response(downstream.fail[service])
+        if request.headers.get("If-Match") != f'"{record["version"]}"':
+            return httpx.Response(412)
+        record.update(json.loads(request.content), version=record["version"] + 1)
+        return httpx.Response(200, json=record)
+
+    downstream.handler = handler
+    return stored
+
+
+@pytest.mark.asyncio
+async def test_conditional_puts(api_client, auth_headers, downstream, records):
+    """Both records are read once and updated against the version read"""
+    response = await api_client.put(
+        URL,
+        json={"breeder": {"price_level": "$$"}, "pet": {"price": 120.0}},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["breeders"]["data"][0]["price_level"] == "$$"
+    assert response.json()["pets"]["data"][0]["price"] == 120.0
+
+    puts = [r for r in downstream.requests if r.method == "PUT"]
+    assert [r.method for r in downstream.requests].count("GET") == 2
+    assert {r.headers["If-Match"] for r in puts} == {'"3"', '"7"'}
+    assert records["breeders"]["version"] == 4
+
+
+@pytest.mark.asyncio
+async def test_failed_update_rolls_back(api_client, auth_headers, downstream, records):
+    """When the pet update fails, the breeder gets its previous values back"""
+    downstream.fail["pets"] = 503
+    response = await api_client.put(
+        URL,
+        json={"breeder": {"price_level": "$$", "name": "New"}, "pet": {"price": 1.0}},
+        headers=auth_headers,
+    )
+    assert response.status_code == 503
+    assert records["breeders"]["price_level"] == "$"
+    assert records["breeders"]["name"] == "Acme"
+    # The rollback was conditional on the version the update left behind
+    rollback = [r for r in downstream.requests if r.method == "PUT"][-1]
+    assert rollback.headers["If-Match"] == '"4"'
+
+
+@pytest.mark.asyncio
+async def test_concurrent_modification(api_client, auth_headers, downstream, records):
+    """A version mismatch is a 409, and the other side is rolled back"""
+    records["pets"]["version"] = 8  # changed after it was read
+    original_handler = downstream.handler
+
+    def stale_reads(request: httpx.Request):
+        if request.method == "GET" and "/pets/" in request.url.path:
+            return httpx.Response(200, json={**records["pets"], "version": 7})
+        return original_handler(request)
+
+    downstream.handler = stale_reads
+    response = await api_client.put(
+        URL,
+        json={"breeder": {"price_level": "$$"}, "pet": {"price": 1.0}},
+        headers=auth_headers,
+    )
+    assert response.status_code == 409
+    assert records["breeders"]["price_level"] == "$"
+    assert records["pets"]["price"] == 80.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "failure, status",
+    [
+        (httpx.Response(503), 503),
+        (httpx.Response(500), 502),
+        (httpx.ConnectError("refused"), 502),
+        (httpx.ReadTimeout("slow"), 504),
+    ],
+)
+async def test_failed_lookup_is_not_a_404(
+    api_client, auth_headers, downstream, records, failure, status
+):
+    """A pet service outage is reported as such, and nothing is updated"""
+    original_handler = downstream.handler
+
+    def failing_reads(request: httpx.Request):
+        if request.method == "GET" and "/pets/" in request.url.path:
+            if isinstance(failure, Exception):
+                raise failure
+            return failure
+        return original_handler(request)
+
+    downstream.handler = failing_reads
+    response = await api_client.put(
+        URL, json={"breeder": {"price_level": "$$"}}, headers=auth_headers
+    )
+    assert response.status_code == status
+    assert not [r for r in downstream.requests if r.method == "PUT"]
+
+
+@pytest.mark.asyncio
+async def test_missing_pet_is_a_404(api_client, auth_headers, downstream, records):
+    original_handler = downstream.handler
+
+    def missing_pet(request: httpx.Request):
+        if request.method == "GET" and "/pets/" in request.url.path:
+            return httpx.Response(404)
+        return original_handler(request)
+
+    downstream.handler = missing_pet
+    response = await api_client.put(
+        URL, json={"breeder": {"price_level": "$$"}}, headers=auth_headers
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Pet not found"
+
+
+@pytest.mark.asyncio
+async def test_update_timeout_is_a_504(api_client, auth_headers, downstream, records):
+    """A PUT that times out is the pet service's failure, and is rolled back"""
+    original_handler = downstream.handler
+
+    def slow_pet_put(request: httpx.Request):
+        if request.method == "PUT" and "/pets/" in request.url.path:
+            raise httpx.ReadTimeout("slow")
+        return original_handler(request)
+
+    downstream.handler = slow_pet_put
+    response = await api_client.put(
+        URL,
+        json={"breeder": {"price_level": "$$"}, "pet": {"price": 1.0}},
+        headers=auth_headers,
+    )
+    assert response.status_code == 504
+    assert records["breeders"]["price_level"] == "$"
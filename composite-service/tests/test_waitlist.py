@@ -0,0 +1,105 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import waitlist
+from app.api.auth import verify_jwt_token
+from app.api.waitlist import (
+    InMemoryWaitlistSource,
+    WaitlistChange,
+    WaitlistHub,
+    WaitlistUnauthorized,
+)
+
+SUBSCRIPTION = """
+subscription {
+  waitlistChanges(breederId: "b1") { kind entry { id petId consumer { email } } }
+}
+"""
+
+
+@pytest.mark.asyncio
+async def test_subscribers_of_a_breeder_share_one_watcher():
+    source = InMemoryWaitlistSource()
+    hub = WaitlistHub(source)
+    first = hub.subscribe("b1", {})
+    second = hub.subscribe("b1", {})
+    first_next = asyncio.ensure_future(first.__anext__())
+    second_next = asyncio.ensure_future(second.__anext__())
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    entry = {"id": "c1", "name": "Ann", "email": "ann@example.com", "pet_id": "p1"}
+    source.publish("b1", [WaitlistChange("added", entry)])
+
+    assert (await first_next).entry == entry
+    assert (await second_next).kind == "added"
+    assert source.watches_started == 1
+    assert hub.subscriber_counts() == {"b1": 2}
+
+    await first.aclose()
+    assert hub.subscriber_counts() == {"b1": 1}
+    await second.aclose()
+    assert hub.subscriber_counts() == {}
+
+
+def test_subscription_pushes_polled_waitlist_deltas(test_app, auth_headers, downstream, monkeypatch):
+    entry = {"id": "c1", "name": "Ann", "email": "ann@example.com", "pet_id": "p1"}
+    polls = []
+
+    def handler(request):
+        polls.append(request)
+        # The subscriber's access check, then the watcher's baseline
+        return httpx.Response(200, json=[] if len(polls) <= 2 else [entry])
+
+    downstream.handler = handler
+    monkeypatch.setattr(
+        waitlist, "build_source", lambda: waitlist.PollingWaitlistSource(interval=0.01)
+    )
+    client = TestClient(test_app)
+
+    with client.websocket_connect(
+        "/api/v1/graphql", subprotocols=["graphql-transport-ws"], headers=auth_headers
+    ) as ws:
+        ws.send_json({"type": "connection_init"})
+        assert ws.receive_json()["type"] == "connection_ack"
+        ws.send_json({"id": "1", "type": "subscribe", "payload": {"query": SUBSCRIPTION}})
+        message = ws.receive_json()
+
+    assert message["type"] == "next"
+    assert message["payload"]["data"]["waitlistChanges"] == {
+        "kind": "added",
+        "entry": {"id": "c1", "petId": "p1", "consumer": {"email": "ann@example.com"}},
+    }
+    assert polls[0].url.path == "/api/v1/customers/breeder/b1/waitlist"
+    assert polls[0].headers["Authorization"] == auth_headers["Authorization"]
+    service_token = polls[1].headers["Authorization"].split(" ", 1)[1]
+    assert verify_jwt_token(service_token)["tokenId"] == "composite-waitlist"
+
+
+@pytest.mark.asyncio
+async def test_subscriber_without_access_is_refused(downstream):
+    downstream.handler = lambda request: httpx.Response(403, json={"detail": "Forbidden"})
+    hub = WaitlistHub(waitlist.PollingWaitlistSource(interval=0.01))
+
+    with pytest.raises(WaitlistUnauthorized):
+        await hub.subscribe("b1", {"Authorization": "Bearer revoked"}).__anext__()
+    assert hub.subscriber_counts() == {}
+
+
+@pytest.mark.asyncio
+async def test_refused_watcher_ends_its_subscriptions(auth_headers, downstream):
+    def handler(request):
+        # The subscriber may read the waitlist; the service credential may not
+        if request.headers["Authorization"] == auth_headers["Authorization"]:
+            return httpx.Response(200, json=[])
+        return httpx.Response(401, json={"detail": "Token has expired"})
+
+    downstream.handler = handler
+    hub = WaitlistHub(waitlist.PollingWaitlistSource(interval=0.01))
+
+    with pytest.raises(WaitlistUnauthorized):
+        await asyncio.wait_for(hub.subscribe("b1", auth_headers).__anext__(), timeout=1)
+    assert hub.subscriber_counts() == {}
@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.api import warmup
+
+
+@pytest.fixture
+def readiness(monkeypatch):
+    resolved = []
+
+    async def resolve(host, port):
+        resolved.append((host, port))
+
+    monkeypatch.setattr(warmup, "resolve", resolve)
+    readiness = warmup.Readiness(connections=3, timeout=1, sdk_warm_up=False)
+    monkeypatch.setattr(warmup, "readiness", readiness)
+    readiness.resolved = resolved
+    return readiness
+
+
+@pytest.mark.asyncio
+async def test_ready_after_warm_up(api_client, downstream, readiness):
+    """Unready until each service has its pooled connections; no token needed"""
+    downstream.handler = lambda request: httpx.Response(200, json={})
+
+    response = await api_client.get("/api/v1/health/ready")
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
+
+    await readiness.run()
+    response = await api_client.get("/api/v1/health/ready")
+    assert response.status_code == 200
+    assert response.json()["unavailable"] == []
+    assert sorted(readiness.resolved) == [
+        ("breeder.test", 80), ("customer.test", 80), ("pet.test", 80)
+    ]
+    warm_ups = [r for r in downstream.requests if r.url.path.endswith("openapi.json")]
+    assert len(warm_ups) == 9
+    assert all(r.headers["Authorization"].startswith("Bearer ") for r in warm_ups)
+
+
+@pytest.mark.asyncio
+async def test_ready_when_warm_up_times_out(api_client, downstream, readiness):
+    """A service that never answers delays readiness only until the timeout"""
+    readiness.timeout = 0.05
+
+    async def handler(request: httpx.Request):
+        if request.url.host == "customer.test":
+            await asyncio.sleep(10)
+        return httpx.Response(200, json={})
+
+    downstream.handler = handler
+    task = asyncio.create_task(readiness.run())
+    await asyncio.sleep(0.1)
+
+    response = await api_client.get("/api/v1/health/ready")
+    assert response.status_code == 200
+    assert response.json()["timed_out"] is True
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)